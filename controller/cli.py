@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+Run saved queries without QGIS Desktop, for instance from cron:
+
+    python -m QuickOSM.controller.cli --output-dir /data --bbox \\
+        1.3,43.5,1.5,43.7 ~/.qgis2/QuickOSM/queries/amenity.ini
+
+QGIS_PREFIX_PATH must be set if QGIS is not installed in /usr.
+"""
+
+import argparse
+import logging
+import sys
+from multiprocessing import Pool
+from os import environ
+from os.path import abspath, basename, splitext
+
+from qgis.core import QgsApplication, QgsRectangle
+
+from QuickOSM.core.custom_logging import METRICS_ENVIRONMENT, setup_logger
+from QuickOSM.core.exceptions import QuickOsmException
+from QuickOSM.core.file_query import FileQuery
+from QuickOSM.core.parser.osm_parser import OsmParser
+from QuickOSM.controller.process import prepare_layers
+from QuickOSM.controller.progress import LoggingProgress
+
+LOGGER = logging.getLogger('QuickOSM')
+
+LAYERS = ['points', 'lines', 'multilinestrings', 'multipolygons']
+
+
+def init_qgis():
+    """
+    Start QGIS without GUI, once per process.
+    """
+    if QgsApplication.instance() is None:
+        app = QgsApplication([], False)
+        QgsApplication.setPrefixPath(
+            environ.get('QGIS_PREFIX_PATH', '/usr'), True)
+        QgsApplication.initQgis()
+        # Keep a reference until the end of the process
+        init_qgis.app = app
+
+
+def parse_bbox(text):
+    """
+    Read an extent in WGS84
+
+    @param text: xmin,ymin,xmax,ymax
+    @type text: str
+
+    @return: the coordinates, a QgsRectangle can't be sent to a process
+    @rtype: tuple
+    """
+    try:
+        x_min, y_min, x_max, y_max = [float(i) for i in text.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'the extent must be xmin,ymin,xmax,ymax')
+    return x_min, y_min, x_max, y_max
+
+
+def query_name(query_file):
+    """
+    Name of a query, from its file
+
+    @param query_file: an ini file or a file with the XML or OQL query
+    @type query_file: str
+
+    @return: the name of the file without its extension
+    @rtype: str
+    """
+    return splitext(basename(query_file))[0]
+
+
+def read_query_file(query_file):
+    """
+    Read a saved query, with the configuration of its layers if it's an ini.
+
+    @param query_file: an ini file or a file with the XML or OQL query
+    @type query_file: str
+
+    @return: the parameters of prepare_layers about the query
+    @rtype: dict
+    """
+    name = query_name(query_file)
+    if not query_file.endswith('.ini'):
+        with open(query_file) as f:
+            query = f.read().decode('utf-8')
+        return {
+            'query': query,
+            'layer_name': name,
+            'output_geometry_types': LAYERS,
+            'white_list_values': {}}
+
+    file_query = FileQuery(query_file)
+    if not file_query.isValid():
+        raise ValueError('%s is not a valid query file' % query_file)
+
+    config = file_query.getContent()
+    layers = config['layers']
+    output_geometry_types = [l for l in LAYERS if layers[l]['load']]
+    white_list_values = dict(
+        (l, layers[l]['columns']) for l in output_geometry_types)
+    return {
+        'query': config['metadata']['query'],
+        'layer_name': name,
+        'output_geometry_types': output_geometry_types,
+        'white_list_values': white_list_values,
+        'config_outputs': layers,
+        'query_file': query_file}
+
+
+def run_query_file(job):
+    """
+    Run a saved query and write its layers, in a worker process.
+
+    @param job: query_file, bbox, place, output_format, output_dir, prefix,
+        engine
+    @type job: tuple
+
+    @return: query_file, the files written or None, the error or None
+    @rtype: tuple
+    """
+    query_file, bbox, place, output_format, output_dir, prefix, engine = job
+    init_qgis()
+    try:
+        parameters = read_query_file(query_file)
+        if bbox:
+            bbox = QgsRectangle(*bbox)
+        result = prepare_layers(
+            dialog=LoggingProgress(),
+            nominatim=place,
+            bbox=bbox,
+            output_dir=output_dir,
+            prefix_file=prefix or parameters['layer_name'],
+            output_format=output_format,
+            engine=engine,
+            **parameters)
+        files = [f['file'] for f in result['vector_files']]
+        return query_file, files, None
+    except QuickOsmException as e:
+        return query_file, None, unicode(e.msg)
+    except Exception as e:  # pylint: disable=broad-except
+        LOGGER.exception(e)
+        return query_file, None, unicode(e)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Run QuickOSM queries without QGIS Desktop.')
+    parser.add_argument(
+        'query_files', nargs='+', metavar='QUERY',
+        help='ini file of a saved query, or a file with an XML/OQL query')
+    parser.add_argument(
+        '-o', '--output-dir', required=True,
+        help='directory of the vector files')
+    parser.add_argument(
+        '-f', '--format', choices=['geojson', 'shape'], default='geojson',
+        help='format of the vector files')
+    parser.add_argument(
+        '--prefix', help='prefix of the files, followed by the name of the '
+                         'query if there are several queries, the name of '
+                         'the query by default')
+    extent = parser.add_mutually_exclusive_group()
+    extent.add_argument(
+        '--bbox', type=parse_bbox, help='xmin,ymin,xmax,ymax in WGS84')
+    extent.add_argument('--place', help='place used by the query')
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=1,
+        help='number of queries running at the same time')
+    parser.add_argument(
+        '--engine', choices=OsmParser.ENGINES,
+        help='parser of the OSM files, OGR or Python, from the settings by '
+             'default and Python for the queries that OGR can\'t read')
+    parser.add_argument(
+        '--metrics', metavar='FILE',
+        help='append the timings and counters of each query as JSON lines')
+    args = parser.parse_args(argv)
+
+    names = [query_name(query_file) for query_file in args.query_files]
+    if len(set(names)) < len(names):
+        parser.error('the queries write files with the same names')
+
+    setup_logger('QuickOSM')
+    if args.metrics:
+        # Inherited by the worker processes
+        environ[METRICS_ENVIRONMENT] = abspath(args.metrics)
+
+    jobs = []
+    for query_file in args.query_files:
+        prefix = args.prefix
+        if prefix and len(args.query_files) > 1:
+            # Each query writes its own files
+            prefix = '%s_%s' % (prefix, query_name(query_file))
+        jobs.append(
+            (query_file, args.bbox, args.place, args.format, args.output_dir,
+             prefix, args.engine))
+
+    if args.jobs > 1 and len(jobs) > 1:
+        pool = Pool(min(args.jobs, len(jobs)))
+        results = pool.map(run_query_file, jobs)
+        pool.close()
+        pool.join()
+    else:
+        results = [run_query_file(job) for job in jobs]
+
+    errors = 0
+    for query_file, files, error in results:
+        if error:
+            errors += 1
+            sys.stderr.write(
+                (u'%s: %s\n' % (query_file, error)).encode('utf-8'))
+        elif not files:
+            sys.stdout.write('%s: no result\n' % query_file)
+        else:
+            for output in files:
+                sys.stdout.write('%s: %s\n' % (query_file, output))
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -23,21 +23,76 @@
 
 import tempfile
 from os.path import dirname, abspath, join, isfile
-from PyQt4.QtGui import QApplication
-from qgis.core import \
-    QGis, QgsVectorLayer, QgsVectorFileWriter, QgsAction, QgsMapLayerRegistry
+from qgis.core import (
+    QGis,
+    QgsVectorLayer,
+    QgsVectorFileWriter,
+    QgsAction,
+    QgsMapLayerRegistry,
+    QgsFeature,
+    QgsFeatureRequest,
+    QgsVectorDataProvider)
 
 from QuickOSM.core.query_factory import QueryFactory
 from QuickOSM.core.utilities.tools import tr
-from QuickOSM.core.exceptions import \
-    FileOutPutException, OsmDriverNotFound, GDALVersion
+from QuickOSM.core.exceptions import (
+    FileOutPutException,
+    OsmDriverNotFound,
+    GDALVersion,
+    NotEditableLayerException,
+    QueryCancelledException)
 from QuickOSM.core.api.connexion_oapi import ConnexionOAPI
 from QuickOSM.core.parser.osm_parser import OsmParser
+from QuickOSM.core.parser.osm_diff_parser import OsmDiffParser
 from QuickOSM.core.utilities.operating_system import get_default_encoding
 from QuickOSM.core.utilities.utilities_qgis import \
     is_osm_driver_enabled, is_ogr_version_ok
 from QuickOSM.core.utilities.tools import get_setting
-from QuickOSM.core.query_parser import prepare_query
+from QuickOSM.core.query_parser import (
+    prepare_query, add_diff_to_query, is_compatible)
+from QuickOSM.core.custom_logging import measured, span, count
+from QuickOSM.core.profiling import profiled
+from QuickOSM.controller.progress import NullProgress
+
+
+def query_key(dialog=None, query=None, **kwargs):
+    """Key of a run for the profiling, the query."""
+    return query
+
+
+def osm_file_key(dialog=None, osm_file=None, **kwargs):
+    """Key of a run for the profiling, the OSM file."""
+    return osm_file
+
+
+def check_cancelled(dialog):
+    """
+    Stop the process between two stages if the dialog has been cancelled.
+
+    @raise QueryCancelledException
+    """
+    if getattr(dialog, 'cancelled', False):
+        raise QueryCancelledException
+
+
+def get_engine(query):
+    """
+    Parser engine of a query, from the settings
+
+    The Python engine is used for the queries that OGR can't read, like
+    "out geom" or "out center".
+
+    @param query: the query, in XML or OQL
+    @type query: str
+
+    @return: 'ogr' or 'python', see OsmParser
+    @rtype: str
+    """
+    engine = get_setting('parserEngine') or 'ogr'
+    if not is_compatible(query, engine)[0] and \
+            is_compatible(query, 'python')[0]:
+        engine = 'python'
+    return engine
 
 
 def get_outputs(output_dir, output_format, prefix_file, layer_name):
@@ -75,7 +130,8 @@ def get_outputs(output_dir, output_format, prefix_file, layer_name):
     return outputs
 
 
-def open_file(
+@measured('write_layers')
+def write_layers(
         dialog=None,
         osm_file=None,
         output_geom_types=None,
@@ -84,37 +140,74 @@ def open_file(
         layer_name="OsmFile",
         config_outputs=None,
         output_dir=None,
-        prefix_file=None):
+        prefix_file=None,
+        engine=None):
     """
-    open an osm file
+    Parse an osm file and write the final vector files.
+
+    It can run in a worker thread, the layers are loaded by load_layers.
+    The parser engine is read in the settings if it's not given, OGR by
+    default.
+
+    @param dialog: observer of the progress, see controller.progress
+    @type dialog: NullProgress
+
+    @param engine: 'ogr' or 'python', see OsmParser
+    @type engine: str
+
+    @return: the vector files to load, with their name and style
+    @rtype: list
     """
+    if dialog is None:
+        dialog = NullProgress()
+
     outputs = get_outputs(output_dir, output_format, prefix_file, layer_name)
 
+    if not engine:
+        engine = get_setting('parserEngine') or 'ogr'
+
+    # Columns of the layers, capped if set in the ini file
+    column_limits = {}
+    if config_outputs:
+        for layer, config in config_outputs.iteritems():
+            limits = dict(
+                (key, config.get(key))
+                for key in ['max_columns', 'min_fill_rate']
+                if config.get(key) is not None)
+            if limits:
+                column_limits[layer] = limits
+
     # Parsing the file
     osm_parser = OsmParser(
         osm_file=osm_file,
         layers=output_geom_types,
-        white_list_column=white_list_column)
+        white_list_column=white_list_column,
+        column_limits=column_limits,
+        engine=engine)
 
     osm_parser.signalText.connect(dialog.set_progress_text)
     osm_parser.signalPercentage.connect(dialog.set_progress_percentage)
-    layers = osm_parser.parse()
+    with span('parse'):
+        layers = osm_parser.parse()
+    check_cancelled(dialog)
 
     # Finishing the process with geojson or shapefile
-    num_layers = 0
     if output_format == "shape":
         dialog.set_progress_text(tr("QuickOSM", u"From GeoJSON to Shapefile"))
 
+    vector_files = []
     for i, (layer, item) in enumerate(layers.iteritems()):
         dialog.set_progress_percentage(i / len(layers) * 100)
-        QApplication.processEvents()
+        check_cancelled(dialog)
         if item['featureCount'] and layer in output_geom_types:
 
             final_layer_name = layer_name
+            style = None
             # If configOutputs is not None (from My Queries)
             if config_outputs:
                 if config_outputs[layer]['namelayer']:
                     final_layer_name = config_outputs[layer]['namelayer']
+                style = config_outputs[layer]['style']
 
             # Transforming the vector file
             osm_geometries = {
@@ -142,76 +235,147 @@ def open_file(
                     geojson_layer.crs(),
                     "GeoJSON")
 
-            for f in geojson_layer.getFeatures():
-                writer.addFeature(f)
+            with span('write'):
+                for f in geojson_layer.getFeatures():
+                    writer.addFeature(f)
 
-            del writer
+                del writer
+            count('features_written/' + layer, item['featureCount'])
 
-            # Loading the final vector file
-            new_layer = QgsVectorLayer(outputs[layer], final_layer_name, "ogr")
+            vector_files.append({
+                'layer': layer,
+                'file': outputs[layer],
+                'name': final_layer_name,
+                'style': style,
+                'tags': list(item['tags'])})
+
+    return vector_files
 
-            # Try to set styling if defined
-            if config_outputs and config_outputs[layer]['style']:
-                new_layer.loadNamedStyle(config_outputs[layer]['style'])
-            else:
-                # Loading default styles
-                if layer == "multilinestrings" or layer == "lines":
-                    if "colour" in item['tags']:
-                        new_layer.loadNamedStyle(
-                            join(dirname(dirname(abspath(__file__))),
-                                 "styles",
-                                 layer + "_colour.qml"))
-
-            # Add action about OpenStreetMap
-            actions = new_layer.actions()
-            actions.addAction(
-                QgsAction.OpenUrl,
-                "OpenStreetMap Browser",
-                'http://www.openstreetmap.org/browse/'
-                '[% "osm_type" %]/[% "osm_id" %]',
-                False)
-            actions.addAction(
-                QgsAction.GenericPython,
-                'JOSM',
-                'from QuickOSM.CoreQuickOSM.Actions import Actions;'
-                'Actions.run("josm","[% "full_id" %]")',
-                False)
-            actions.addAction(
-                QgsAction.OpenUrl,
-                "User default editor",
-                'http://www.openstreetmap.org/edit?'
-                '[% "osm_type" %]=[% "osm_id" %]',
-                False)
 
-            for link in ['url', 'website', 'wikipedia', 'ref:UAI']:
-                if link in item['tags']:
-                    link = link.replace(":", "_")
-                    actions.addAction(
-                        QgsAction.GenericPython,
-                        link,
-                        'from QuickOSM.core.actions import Actions;'
-                        'Actions.run("' + link + '","[% "' + link + '" %]")',
-                        False)
-
-            if 'network' in item['tags'] and 'ref' in item['tags']:
+def load_layers(vector_files, output_format=None, layer_source=None):
+    """
+    Load the vector files in QGIS, in the main thread.
+
+    layer_source is a dict saved in the custom properties of each layer,
+    with the query and its osm_base, to update the layer later.
+
+    @param vector_files: from write_layers
+    @type vector_files: list
+
+    @return: number of layers loaded
+    @rtype: int
+    """
+    num_layers = 0
+    for vector_file in vector_files:
+        layer = vector_file['layer']
+        tags = vector_file['tags']
+
+        # Loading the final vector file
+        new_layer = QgsVectorLayer(
+            vector_file['file'], vector_file['name'], "ogr")
+
+        # Try to set styling if defined
+        if vector_file['style']:
+            new_layer.loadNamedStyle(vector_file['style'])
+        else:
+            # Loading default styles
+            if layer == "multilinestrings" or layer == "lines":
+                if "colour" in tags:
+                    new_layer.loadNamedStyle(
+                        join(dirname(dirname(abspath(__file__))),
+                             "styles",
+                             layer + "_colour.qml"))
+
+        # Add action about OpenStreetMap
+        actions = new_layer.actions()
+        actions.addAction(
+            QgsAction.OpenUrl,
+            "OpenStreetMap Browser",
+            'http://www.openstreetmap.org/browse/'
+            '[% "osm_type" %]/[% "osm_id" %]',
+            False)
+        actions.addAction(
+            QgsAction.GenericPython,
+            'JOSM',
+            'from QuickOSM.CoreQuickOSM.Actions import Actions;'
+            'Actions.run("josm","[% "full_id" %]")',
+            False)
+        actions.addAction(
+            QgsAction.OpenUrl,
+            "User default editor",
+            'http://www.openstreetmap.org/edit?'
+            '[% "osm_type" %]=[% "osm_id" %]',
+            False)
+
+        for link in ['url', 'website', 'wikipedia', 'ref:UAI']:
+            if link in tags:
+                link = link.replace(":", "_")
                 actions.addAction(
                     QgsAction.GenericPython,
-                    "Sketchline",
+                    link,
                     'from QuickOSM.core.actions import Actions;'
-                    'Actions.run_sketch_line("[% "network" %]","[% "ref" %]")',
+                    'Actions.run("' + link + '","[% "' + link + '" %]")',
                     False)
 
-            # Add index if possible
-            if output_format == "shape":
-                new_layer.dataProvider().createSpatialIndex()
+        if 'network' in tags and 'ref' in tags:
+            actions.addAction(
+                QgsAction.GenericPython,
+                "Sketchline",
+                'from QuickOSM.core.actions import Actions;'
+                'Actions.run_sketch_line("[% "network" %]","[% "ref" %]")',
+                False)
+
+        # Add index if possible
+        if output_format == "shape":
+            new_layer.dataProvider().createSpatialIndex()
+
+        # Keep the source of the layer, used by the update mode
+        if layer_source:
+            for key, value in layer_source.iteritems():
+                if value:
+                    new_layer.setCustomProperty('QuickOSM/' + key, value)
+            new_layer.setCustomProperty('QuickOSM/layer', layer)
 
-            QgsMapLayerRegistry.instance().addMapLayer(new_layer)
-            num_layers += 1
+        QgsMapLayerRegistry.instance().addMapLayer(new_layer)
+        num_layers += 1
 
     return num_layers
 
 
-def process_query(
+@profiled('open_file', osm_file_key)
+def open_file(
+        dialog=None,
+        osm_file=None,
+        output_geom_types=None,
+        white_list_column=None,
+        output_format=None,
+        layer_name="OsmFile",
+        config_outputs=None,
+        output_dir=None,
+        prefix_file=None,
+        layer_source=None):
+    """
+    open an osm file
+
+    layer_source is a dict saved in the custom properties of each layer,
+    with the query and its osm_base, to update the layer later.
+    """
+    vector_files = write_layers(
+        dialog=dialog,
+        osm_file=osm_file,
+        output_geom_types=output_geom_types,
+        white_list_column=white_list_column,
+        output_format=output_format,
+        layer_name=layer_name,
+        config_outputs=config_outputs,
+        output_dir=output_dir,
+        prefix_file=prefix_file)
+    return load_layers(vector_files, output_format, layer_source)
+
+
+@profiled('query', query_key)
+@measured('query')
+def prepare_layers(
         dialog=None,
         query=None,
         nominatim=None,
@@ -221,8 +385,24 @@ def process_query(
         output_geometry_types=None,
         layer_name="OsmQuery",
         white_list_values=None,
-        config_outputs=None):
-    """execute a query and send the result file to open_file."""
+        config_outputs=None,
+        query_file=None,
+        output_format=None,
+        engine=None):
+    """
+    Execute a query and write the vector files, without loading them.
+
+    It can run in a worker thread or without QGIS Desktop.
+    The output format and the parser engine are read in the settings if
+    they are not given. The Python engine is used for the queries that
+    OGR can't read, like "out geom".
+
+    @return: the parameters of load_layers
+    @rtype: dict
+    """
+
+    if dialog is None:
+        dialog = NullProgress()
 
     # Check OGR
     if not is_ogr_version_ok():
@@ -232,22 +412,32 @@ def process_query(
         raise OsmDriverNotFound
 
     # Get output's format
-    output_format = get_setting('outputFormat')
+    if not output_format:
+        output_format = get_setting('outputFormat')
+
+    if not engine:
+        engine = get_engine(query)
 
     # Prepare outputs
     dialog.set_progress_text(tr("QuickOSM", u"Prepare outputs"))
 
     # Replace Nominatim or BBOX
-    query = prepare_query(query=query, nominatim_name=nominatim, extent=bbox)
-
-    # Getting the default overpass api and running the query
+    with span('prepare_query'):
+        query = prepare_query(
+            query=query, nominatim_name=nominatim, extent=bbox,
+            engine=engine)
+    check_cancelled(dialog)
+
+    # Getting the default overpass api and running the query.
+    # OGR reads only XML, JSON is faster with the Python engine.
     server = get_setting('defaultOAPI')
     dialog.set_progress_text(tr("QuickOSM", u"Downloading data from Overpass"))
-    QApplication.processEvents()
-    connexion_overpass_api = ConnexionOAPI(url=server, output="xml")
+    output = 'json' if engine == 'python' else 'xml'
+    connexion_overpass_api = ConnexionOAPI(url=server, output=output)
     osm_file = connexion_overpass_api.get_file_from_query(query)
+    check_cancelled(dialog)
 
-    return open_file(
+    vector_files = write_layers(
         dialog=dialog,
         osm_file=osm_file,
         output_geom_types=output_geometry_types,
@@ -256,11 +446,235 @@ def process_query(
         output_format=output_format,
         output_dir=output_dir,
         prefix_file=prefix_file,
-        config_outputs=config_outputs)
+        config_outputs=config_outputs,
+        engine=engine)
 
+    return {
+        'vector_files': vector_files,
+        'output_format': output_format,
+        'layer_source': {
+            'query': query,
+            'osm_base': connexion_overpass_api.osm_base,
+            'query_file': query_file}}
 
-def process_quick_query(
-        dialog=None,
+
+def process_query(dialog=None, **kwargs):
+    """execute a query and load the result in QGIS."""
+    return load_layers(**prepare_layers(dialog=dialog, **kwargs))
+
+
+def get_updatable_layers(query_file=None):
+    """
+    Get the loaded layers which can be updated with a diff.
+
+    @param query_file: only the layers made by this query file
+    @type query_file: str
+
+    @return: list of layers
+    @rtype: list
+    """
+    layers = []
+    for layer in QgsMapLayerRegistry.instance().mapLayers().itervalues():
+        if not layer.customProperty('QuickOSM/osm_base'):
+            continue
+        if query_file and \
+                layer.customProperty('QuickOSM/query_file') != query_file:
+            continue
+        layers.append(layer)
+    return layers
+
+
+def update_layer(layer, removed_ids, geojson_file=None):
+    """
+    Apply a diff on a layer, in place.
+
+    @param layer: the layer to update
+    @type layer: QgsVectorLayer
+
+    @param removed_ids: full_id of the deleted and modified objects
+    @type removed_ids: set
+
+    @param geojson_file: the new version of created and modified objects
+    @type geojson_file: str
+
+    @return: number of deleted and added features
+    @rtype: int
+    """
+    provider = layer.dataProvider()
+    capabilities = provider.capabilities()
+    if not capabilities & QgsVectorDataProvider.DeleteFeatures or \
+            not capabilities & QgsVectorDataProvider.AddFeatures:
+        raise NotEditableLayerException(suffix=layer.name())
+
+    fields = layer.pendingFields()
+    full_id_index = fields.indexFromName('full_id')
+
+    request = QgsFeatureRequest()
+    request.setFlags(QgsFeatureRequest.NoGeometry)
+    request.setSubsetOfAttributes([full_id_index])
+    deleted = [
+        feature.id() for feature in layer.getFeatures(request)
+        if feature.attributes()[full_id_index] in removed_ids]
+    if deleted:
+        provider.deleteFeatures(deleted)
+
+    added = []
+    if geojson_file:
+        geojson_layer = QgsVectorLayer(geojson_file, "diff", "ogr")
+        source_fields = geojson_layer.pendingFields()
+        # Columns which are not in the layer yet are dropped.
+        mapping = [
+            source_fields.indexFromName(field.name()) for field in fields]
+        for source in geojson_layer.getFeatures():
+            attributes = source.attributes()
+            feature = QgsFeature(fields)
+            feature.setGeometry(source.geometry())
+            feature.setAttributes(
+                [attributes[i] if i >= 0 else None for i in mapping])
+            added.append(feature)
+        if added:
+            provider.addFeatures(added)
+
+    layer.updateExtents()
+    layer.triggerRepaint()
+    return len(deleted) + len(added)
+
+
+def update_key(layer):
+    """
+    Layers made by the same query are updated with one diff
+
+    @param layer: a layer from get_updatable_layers
+    @type layer: QgsVectorLayer
+
+    @return: query and osm_base of the layer
+    @rtype: tuple
+    """
+    return (
+        layer.customProperty('QuickOSM/query'),
+        layer.customProperty('QuickOSM/osm_base'))
+
+
+def get_update_queries(layers):
+    """
+    Get the queries to download for the update of some layers, in the
+    main thread.
+
+    @param layers: layers from get_updatable_layers
+    @type layers: list
+
+    @return: names of the layers, by update_key
+    @rtype: dict
+    """
+    queries = {}
+    for layer in layers:
+        queries.setdefault(update_key(layer), []).append(
+            layer.customProperty('QuickOSM/layer'))
+    return queries
+
+
+@measured('update')
+def prepare_update(dialog=None, queries=None):
+    """
+    Download and parse the changes on OSM since the last download of the
+    layers. The layers are not read nor edited, so it can run in a worker
+    thread.
+
+    Only an augmented diff is downloaded for each query. It is parsed by
+    the engine of the query, see get_engine.
+
+    @param queries: names of the layers, from get_update_queries
+    @type queries: dict
+
+    @return: parameters of apply_update
+    @rtype: dict
+    """
+    if dialog is None:
+        dialog = NullProgress()
+
+    if not is_ogr_version_ok():
+        raise GDALVersion
+
+    if not is_osm_driver_enabled():
+        raise OsmDriverNotFound
+
+    server = get_setting('defaultOAPI')
+    diffs = {}
+    for (query, osm_base), layer_names in queries.iteritems():
+        dialog.set_progress_text(
+            tr("QuickOSM", u"Downloading changes from Overpass"))
+        connexion_overpass_api = ConnexionOAPI(url=server, output="xml")
+        diff_file = connexion_overpass_api.get_file_from_query(
+            add_diff_to_query(query, osm_base))
+        check_cancelled(dialog)
+
+        diff_parser = OsmDiffParser(diff_file)
+        osm_file = diff_parser.parse()
+
+        geojson_files = {}
+        if osm_file:
+            osm_parser = OsmParser(
+                osm_file=osm_file,
+                layers=layer_names,
+                engine=get_engine(query))
+            osm_parser.signalText.connect(dialog.set_progress_text)
+            osm_parser.signalPercentage.connect(
+                dialog.set_progress_percentage)
+            for layer, item in osm_parser.parse().iteritems():
+                if item['featureCount']:
+                    geojson_files[layer] = item['geojsonFile']
+
+        diffs[(query, osm_base)] = {
+            'removed_ids': diff_parser.deleted | diff_parser.changed,
+            'geojson_files': geojson_files,
+            'osm_base':
+                diff_parser.osm_base or connexion_overpass_api.osm_base}
+
+    return {'diffs': diffs}
+
+
+def apply_update(layers, diffs):
+    """
+    Apply the diffs from prepare_update on the layers, in the main thread.
+
+    @param layers: layers from get_updatable_layers
+    @type layers: list
+
+    @param diffs: the changes, by update_key
+    @type diffs: dict
+
+    @return: number of deleted and added features
+    @rtype: int
+    """
+    num_changes = 0
+    for layer in layers:
+        diff = diffs.get(update_key(layer))
+        if diff is None:
+            continue
+        geojson_file = diff['geojson_files'].get(
+            layer.customProperty('QuickOSM/layer'))
+        num_changes += update_layer(layer, diff['removed_ids'], geojson_file)
+        if diff['osm_base']:
+            layer.setCustomProperty('QuickOSM/osm_base', diff['osm_base'])
+    return num_changes
+
+
+def process_update(dialog=None, layers=None):
+    """
+    Update layers with the changes on OSM since their last download.
+
+    @param layers: layers from get_updatable_layers
+    @type layers: list
+
+    @return: number of deleted and added features
+    @rtype: int
+    """
+    result = prepare_update(
+        dialog=dialog, queries=get_update_queries(layers))
+    return apply_update(layers=layers, **result)
+
+
+def make_quick_query(
         key=None,
         value=None,
         bbox=None,
@@ -269,11 +683,14 @@ def process_quick_query(
         distance=None,
         osm_objects=None,
         timeout=25,
-        output_directory=None,
-        prefix_file=None,
-        output_geometry_types=None):
+        order='id',
+        skeleton=False,
+        geometry=None):
     """
-    generate a query and send it to process_query
+    generate a query and the name of its layers
+
+    @return: query, layer_name
+    @rtype: tuple
     """
     # Set the layer name
     layer_name = u''
@@ -296,8 +713,44 @@ def process_quick_query(
         is_around=is_around,
         distance=distance,
         nominatim=nominatim,
-        osm_objects=osm_objects)
-    query = query_factory.make()
+        osm_objects=osm_objects,
+        order=order,
+        skeleton=skeleton,
+        geometry=geometry)
+    return query_factory.make(), layer_name
+
+
+def process_quick_query(
+        dialog=None,
+        key=None,
+        value=None,
+        bbox=None,
+        nominatim=None,
+        is_around=None,
+        distance=None,
+        osm_objects=None,
+        timeout=25,
+        output_directory=None,
+        prefix_file=None,
+        output_geometry_types=None,
+        order='id',
+        skeleton=False,
+        geometry=None):
+    """
+    generate a query and send it to process_query
+    """
+    query, layer_name = make_quick_query(
+        key=key,
+        value=value,
+        bbox=bbox,
+        nominatim=nominatim,
+        is_around=is_around,
+        distance=distance,
+        osm_objects=osm_objects,
+        timeout=timeout,
+        order=order,
+        skeleton=skeleton,
+        geometry=geometry)
 
     # Call process_query with the new query
     return process_query(
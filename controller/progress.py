@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+Observers of the progress of the process.
+
+The functions of controller.process only call set_progress_text and
+set_progress_percentage on their dialog parameter, and stop between two
+stages if its cancelled attribute is True.
+"""
+
+import logging
+from time import time
+
+from PyQt4.QtCore import QObject, pyqtSignal
+
+LOGGER = logging.getLogger('QuickOSM')
+
+
+class NullProgress(object):
+    """
+    Ignore the progress, for tests and batches.
+    """
+
+    cancelled = False
+
+    def set_progress_percentage(self, percent):
+        pass
+
+    def set_progress_text(self, text):
+        pass
+
+
+class LoggingProgress(NullProgress):
+    """
+    Write the progress in a logger.
+    """
+
+    def __init__(self, logger=LOGGER, step=10):
+        """
+        Constructor
+
+        @param logger: the logger
+        @type logger: logging.Logger
+
+        @param step: log the percentage each time it increases by step
+        @type step: int
+        """
+        self.logger = logger
+        self.step = step
+        self.percent = None
+
+    def set_progress_percentage(self, percent):
+        percent = int(percent)
+        if self.percent is None or percent < self.percent or \
+                percent - self.percent >= self.step:
+            self.percent = percent
+            self.logger.debug('%s%%', percent)
+
+    def set_progress_text(self, text):
+        self.percent = None
+        self.logger.info(text)
+
+
+class QtProgress(QObject):
+    """
+    Send the progress with signals, at most every INTERVAL seconds.
+
+    The parsers send a percentage for each feature, updating a widget so
+    often slows down the process. 0 and 100 are always sent.
+    """
+
+    INTERVAL = 0.1
+
+    signalPercentage = pyqtSignal(int, name='signalPercentage')
+    signalText = pyqtSignal(str, name='signalText')
+
+    def __init__(self, interval=None):
+        QObject.__init__(self)
+        self.cancelled = False
+        self.interval = self.INTERVAL if interval is None else interval
+        self.percent = None
+        self.time = 0
+
+    def set_progress_percentage(self, percent):
+        percent = int(percent)
+        if percent == self.percent:
+            return
+
+        now = time()
+        if 0 < percent < 100 and now - self.time < self.interval:
+            return
+
+        self.percent = percent
+        self.time = now
+        self.signalPercentage.emit(percent)
+
+    def set_progress_text(self, text):
+        self.signalText.emit(text)
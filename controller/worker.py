@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import traceback
+
+from PyQt4.QtCore import QThread, pyqtSignal
+
+from QuickOSM.controller.progress import QtProgress
+
+
+class QueryWorker(QThread):
+    """
+    Run a function of the process in a separate thread.
+
+    The result is given by signalFinished. The layers must be loaded in the
+    main thread, so the function must not add them to the registry.
+    """
+
+    signalFinished = pyqtSignal(object, name='signalFinished')
+    signalError = pyqtSignal(object, name='signalError')
+
+    # Keep a reference on running workers, until they are finished
+    WORKERS = set()
+
+    def __init__(self, function, parent=None, **kwargs):
+        """
+        Constructor
+
+        @param function: the function to run, with a dialog parameter
+        @type function: function
+
+        @param kwargs: other parameters of the function
+        @type kwargs: dict
+        """
+        QThread.__init__(self, parent)
+        self.function = function
+        self.kwargs = kwargs
+        self.progress = QtProgress()
+        self.traceback = None
+        self.finished.connect(self._release)
+
+    def start(self):
+        QueryWorker.WORKERS.add(self)
+        QThread.start(self)
+
+    def _release(self):
+        QueryWorker.WORKERS.discard(self)
+
+    def cancel(self):
+        """
+        Ask the process to stop at the end of the current stage.
+        """
+        self.progress.cancelled = True
+
+    def is_cancelled(self):
+        return self.progress.cancelled
+
+    def run(self):
+        try:
+            result = self.function(dialog=self.progress, **self.kwargs)
+        except Exception as e:
+            self.traceback = traceback.format_exc()
+            self.signalError.emit(e)
+        else:
+            self.signalFinished.emit(result)
@@ -28,6 +28,8 @@ from PyQt4.QtNetwork import QNetworkRequest, QNetworkReply
 from PyQt4.QtCore import QUrl, QEventLoop
 from qgis.core import QgsNetworkAccessManager
 
+from QuickOSM.core.custom_logging import span, count
+
 from QuickOSM.core.exceptions import (
     OutPutFormatException,
     OverpassTimeoutException,
@@ -65,6 +67,7 @@ class ConnexionOAPI(object):
         self.network = QgsNetworkAccessManager.instance()
         self.network_reply = None
         self.loop = None
+        self.osm_base = None
 
     def query(self, query):
         """
@@ -96,17 +99,24 @@ class ConnexionOAPI(object):
 
         request = QNetworkRequest(url_query)
         request.setRawHeader("User-Agent", "QuickOSM")
-        self.network_reply = self.network.get(request)
-        self.loop = QEventLoop()
-        self.network.finished.connect(self._end_of_request)
-        self.loop.exec_()
+        with span('download'):
+            self.network_reply = self.network.get(request)
+            self.loop = QEventLoop()
+            # The network manager is shared, only this reply is read
+            self.network_reply.finished.connect(self._end_of_request)
+            self.loop.exec_()
+
+        if self.data is not None:
+            count('download_bytes', len(self.data))
 
         if self.network_reply.error() == QNetworkReply.NoError:
-            timeout = '<remark> runtime error: Query timed out in "[a-z]+" ' \
-                      'at line [\d]+ after ([\d]+) seconds. </remark>'
+            # The remark is in a XML tag or in a JSON string
+            timeout = 'runtime error: Query timed out in \\\\?"[a-z]+\\\\?" ' \
+                      'at line [\d]+ after ([\d]+) seconds.'
             if re.search(timeout, self.data):
                 raise OverpassTimeoutException
             else:
+                self.osm_base = self.get_osm_base(str(self.data.left(1024)))
                 return self.data
 
         elif self.network_reply.error() == QNetworkReply.UnknownContentError:
@@ -136,6 +146,24 @@ class ConnexionOAPI(object):
         tf.close()
         return name_file
 
+    @staticmethod
+    def get_osm_base(data):
+        """
+        Read the osm_base timestamp in the header of an Overpass result
+
+        @param data:Beginning of the result, XML or JSON
+        @type data:str
+
+        @return: the timestamp or None if not found
+        @rtype: str
+        """
+        match = re.search(r'osm_base="([^"]+)"', data)
+        if not match:
+            match = re.search(r'"timestamp_osm_base":\s*"([^"]+)"', data)
+        if match:
+            return match.group(1)
+        return None
+
     def get_timestamp(self):
         """
         Get the timestamp of the OSM data on the server
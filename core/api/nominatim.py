@@ -47,6 +47,17 @@ class Nominatim(object):
         self.network_reply = None
         self.loop = None
 
+    def _request(self, query):
+        url_query = QUrl(self.__url)
+
+        query = QUrl.toPercentEncoding(query)
+        url_query.addEncodedQueryItem('q', query)
+        url_query.addQueryItem('info', 'QgisQuickOSMPlugin')
+
+        request = QNetworkRequest(url_query)
+        request.setRawHeader("User-Agent", "QuickOSM")
+        return request
+
     def query(self, query):
         """
         Perform a nominatim query
@@ -59,16 +70,7 @@ class Nominatim(object):
         @return: the result of the query
         @rtype: str
         """
-
-        url_query = QUrl(self.__url)
-
-        query = QUrl.toPercentEncoding(query)
-        url_query.addEncodedQueryItem('q', query)
-        url_query.addQueryItem('info', 'QgisQuickOSMPlugin')
-
-        request = QNetworkRequest(url_query)
-        request.setRawHeader("User-Agent", "QuickOSM")
-        self.network_reply = self.network.get(request)
+        self.network_reply = self.network.get(self._request(query))
         self.loop = QEventLoop()
         self.network.finished.connect(self._end_of_request)
         self.loop.exec_()
@@ -78,6 +80,52 @@ class Nominatim(object):
         else:
             raise NetWorkErrorException(suffix="Nominatim API")
 
+    def query_many(self, queries, max_requests=4):
+        """
+        Perform several nominatim queries at the same time
+
+        @param queries: Queries to execute, without duplicate
+        @type queries: list
+
+        @param max_requests: Number of requests running at the same time
+        @type max_requests: int
+
+        @raise NetWorkErrorException
+
+        @return: the result of each query
+        @rtype: dict
+        """
+        results = {}
+        pending = list(queries)
+        replies = {}
+        loop = QEventLoop()
+
+        def start_next():
+            search = pending.pop(0)
+            reply = self.network.get(self._request(search))
+            replies[reply] = search
+            reply.finished.connect(lambda: finished(reply))
+
+        def finished(reply):
+            search = replies.pop(reply)
+            if reply.error() == QNetworkReply.NoError:
+                results[search] = json.loads(
+                    reply.readAll().data().decode('utf-8'))
+            reply.deleteLater()
+            if pending:
+                start_next()
+            elif not replies:
+                loop.quit()
+
+        while pending and len(replies) < max_requests:
+            start_next()
+        if replies:
+            loop.exec_()
+
+        if len(results) != len(queries):
+            raise NetWorkErrorException(suffix="Nominatim API")
+        return results
+
     def _end_of_request(self):
         self.data = self.network_reply.readAll().data().decode('utf-8')
         self.loop.quit()
@@ -94,13 +142,7 @@ class Nominatim(object):
         @return: First relation's osm_id
         @rtype: str
         """
-        data = self.query(query)
-        for result in data:
-            if result['osm_type'] == "relation":
-                return result['osm_id']
-
-        # If no result has been return
-        raise NominatimAreaException
+        return self.get_first_polygon(self.query(query))
 
     def get_first_point_from_query(self, query):
         """
@@ -114,7 +156,29 @@ class Nominatim(object):
         @return: First relation's osm_id
         @rtype: str
         """
-        data = self.query(query)
+        return self.get_first_point(self.query(query))
+
+    @staticmethod
+    def get_first_polygon(data):
+        """
+        Get first OSM_ID of an area in a Nominatim result
+
+        @raise NominatimAreaException:
+        """
+        for result in data:
+            if result['osm_type'] == "relation":
+                return result['osm_id']
+
+        # If no result has been return
+        raise NominatimAreaException
+
+    @staticmethod
+    def get_first_point(data):
+        """
+        Get first longitude, latitude of a point in a Nominatim result
+
+        @raise NominatimAreaException:
+        """
         for result in data:
             if result['osm_type'] == "node":
                 return result['lon'], result['lat']
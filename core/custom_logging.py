@@ -21,7 +21,14 @@
  ***************************************************************************/
 """
 
+import json
 import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from os import environ
+from time import time
 
 from qgis.core import QgsMessageLog
 from QuickOSM.core.utilities.tools import tr
@@ -33,6 +40,13 @@ __copyright__ = 'Copyright 2016, Cadasta'
 
 LOGGER = logging.getLogger('QuickOSM')
 
+# Runs are measured per thread, several queries can run at the same time
+_LOCAL = threading.local()
+_DUMP_LOCK = threading.Lock()
+
+# File where each run is appended as a JSON line, if set
+METRICS_ENVIRONMENT = 'QUICKOSM_METRICS'
+
 
 class QgsLogHandler(logging.Handler):
 
@@ -112,3 +126,210 @@ def setup_logger(logger_name):
     # add the handlers to the logger
     add_logging_handler_once(logger, console_handler)
     add_logging_handler_once(logger, qgis_handler)
+
+
+class Metrics(object):
+
+    """Timing spans and counters of one run of the process."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time()
+        self.seconds = None
+        self.spans = OrderedDict()
+        self.counters = OrderedDict()
+        self.stack = []
+
+    @contextmanager
+    def span(self, name):
+        """Measure a stage, spans can be nested.
+
+        :param name: Name of the stage, the full name of a nested span is
+            the path of its parents, like "query/download".
+        :type name: str
+        """
+        self.stack.append(name)
+        path = '/'.join(self.stack)
+        start = time()
+        try:
+            yield self
+        finally:
+            self.add_time(path, time() - start)
+            self.stack.pop()
+
+    def add_time(self, path, seconds, calls=1):
+        """Add some time to a span, without a context manager.
+
+        :param path: Full name of the span.
+        :type path: str
+
+        :param seconds: Time to add.
+        :type seconds: float
+
+        :param calls: Number of calls measured.
+        :type calls: int
+        """
+        span = self.spans.get(path)
+        if span is None:
+            span = self.spans[path] = {'seconds': 0.0, 'calls': 0}
+        span['seconds'] += seconds
+        span['calls'] += calls
+
+    def count(self, name, value=1):
+        """Increase a counter, like bytes or features.
+
+        :param name: Name of the counter.
+        :type name: str
+
+        :param value: Value to add.
+        :type value: int
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def stop(self):
+        self.seconds = time() - self.started
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'started': self.started,
+            'seconds': self.seconds,
+            'spans': self.spans,
+            'counters': self.counters,
+        }
+
+    def to_json(self):
+        return json.dumps(self.as_dict())
+
+    def summary(self):
+        """Readable summary of the run.
+
+        :rtype: str
+        """
+        lines = ['%s: %.3f s' % (self.name, self.seconds or 0)]
+        for path, span in self.spans.iteritems():
+            indent = '  ' * path.count('/')
+            calls = ' (%s calls)' % span['calls'] if span['calls'] > 1 else ''
+            lines.append('  %s%s: %.3f s%s' % (
+                indent, path.rsplit('/', 1)[-1], span['seconds'], calls))
+        for name, value in self.counters.iteritems():
+            lines.append('  %s: %s' % (name, value))
+        return '\n'.join(lines)
+
+    def dump(self, path):
+        """Append the run as a JSON line in a file.
+
+        :param path: Path of the file.
+        :type path: str
+        """
+        with _DUMP_LOCK:
+            with open(path, 'a') as f:
+                f.write(self.to_json() + '\n')
+
+
+def current_metrics():
+    """The run measured in this thread, None if there is none.
+
+    :rtype: Metrics
+    """
+    return getattr(_LOCAL, 'metrics', None)
+
+
+@contextmanager
+def measure(name):
+    """Measure a run, or a span if a run is already measured.
+
+    At the end of the run, the summary is logged and the run is appended
+    to the file given by the QUICKOSM_METRICS environment variable.
+
+    :param name: Name of the run or of the span.
+    :type name: str
+    """
+    metrics = current_metrics()
+    if metrics is not None:
+        with metrics.span(name):
+            yield metrics
+        return
+
+    metrics = _LOCAL.metrics = Metrics(name)
+    try:
+        with metrics.span(name):
+            yield metrics
+    finally:
+        _LOCAL.metrics = None
+        metrics.stop()
+        LOGGER.info(metrics.summary())
+        path = environ.get(METRICS_ENVIRONMENT)
+        if path:
+            try:
+                metrics.dump(path)
+            except IOError as e:
+                LOGGER.warning('Metrics not saved in %s: %s', path, e)
+
+
+def measured(name):
+    """Decorator measuring each call of a function with measure.
+
+    :param name: Name of the run or of the span.
+    :type name: str
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with measure(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def span(name):
+    """Measure a stage of the current run, nothing if there is no run.
+
+    :param name: Name of the stage.
+    :type name: str
+    """
+    metrics = current_metrics()
+    if metrics is None:
+        yield None
+    else:
+        with metrics.span(name):
+            yield metrics
+
+
+def count(name, value=1):
+    """Increase a counter of the current run, if any."""
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.count(name, value)
+
+
+def timed(name, function):
+    """Measure each call of a function called many times.
+
+    The calls are summed in one span. Without run, the function is
+    returned as it is, so it costs nothing.
+
+    :param name: Name of the span, in the current span.
+    :type name: str
+
+    :param function: The function to measure.
+    :type function: function
+
+    :return: The function measured.
+    :rtype: function
+    """
+    metrics = current_metrics()
+    if metrics is None:
+        return function
+
+    path = '/'.join(metrics.stack + [name])
+
+    def wrapper(*args, **kwargs):
+        start = time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            metrics.add_time(path, time() - start)
+
+    return wrapper
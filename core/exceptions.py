@@ -132,6 +132,15 @@ class NoLayerException(QuickOsmException):
         QuickOsmException.__init__(self, msg)
 
 
+class NotEditableLayerException(QuickOsmException):
+    def __init__(self, msg=None, suffix=None):
+        if not msg:
+            msg = tr("Exception", u"The layer can't be updated in place :")
+        if suffix:
+            msg = msg + " " + suffix
+        QuickOsmException.__init__(self, msg)
+
+
 class WrongOrderOSMException(QuickOsmException):
     def __init__(self, msg=None, suffix=None):
         if not msg:
@@ -213,3 +222,16 @@ class OutPutGeomTypesException(QuickOsmException):
         if not msg:
             msg = tr('Exception', u'No outputs selected')
         QuickOsmException.__init__(self, msg)
+
+'''
+Process
+'''
+
+
+class QueryCancelledException(QuickOsmException):
+    def __init__(self, msg=None):
+        if not msg:
+            msg = tr('Exception', u'The query has been cancelled')
+        QuickOsmException.__init__(self, msg)
+        self.level = QgsMessageBar.INFO
+        self.duration = 5
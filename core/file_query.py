@@ -23,9 +23,11 @@
 
 import ntpath
 import ConfigParser
+import json
 import re
-from os.path import dirname, join, isfile
-from os import listdir
+from os.path import dirname, join, isfile, basename, getmtime
+from os import listdir, stat
+from stat import S_ISREG
 
 
 class FileQuery(object):
@@ -37,18 +39,54 @@ class FileQuery(object):
     QUERY_EXTENSIONS = ['oql', 'xml']
     FILES = {}
 
+    BBOX_TEMPLATE = re.compile(r'{{bbox}}')
+    NOMINATIM_TEMPLATE = re.compile(r'{{nominatim}}')
+    GEOCODE_AREA_TEMPLATE = re.compile(
+        r'{{(?:nominatimArea|geocodeArea):(.*?)}}')
+
     @staticmethod
     def get_ini_files_from_folder(folder, force=False):
-        if force:
-            FileQuery.FILES = {}
-        if not FileQuery.FILES:
-            files = [join(folder, f) for f in listdir(folder) if isfile(join(
-                folder, f))]
-            for filePath in files:
-                ini = FileQuery(filePath)
-                ini.isValid()
+        """
+        Get the valid queries of a folder, from its catalogue.
+
+        @param folder: the folder
+        @type folder: str
+        @param force: check the files which changed since the last call
+        @type force: bool
+        @return: list of FileQuery by category
+        @rtype: dict
+        """
+        if force or not FileQuery.FILES:
+            FileQuery.FILES = FileQueryCatalogue.get(folder).scan()
         return FileQuery.FILES
 
+    @staticmethod
+    def from_catalogue(file_path, name, category, query_file, words=None):
+        """
+        A query already validated, without reading the INI file
+
+        @param file_path: path of the INI file
+        @type file_path: str
+        @param name: name of the query
+        @type name: str
+        @param category: category of the query
+        @type category: str
+        @param query_file: path of the query file
+        @type query_file: str
+        @param words: words indexed for the search
+        @type words: list
+        @rtype: FileQuery
+        """
+        ini = FileQuery(file_path)
+        ini._directory = dirname(file_path)
+        ini._name = name
+        ini._category = category
+        ini._queryFile = query_file
+        ini._queryExtension = query_file.split('.')[-1]
+        if words is not None:
+            ini._words = set(words)
+        return ini
+
     def __init__(self, file_path):
         self._directory = None
         self._queryExtension = None
@@ -60,6 +98,17 @@ class FileQuery(object):
         self._nominatimTemplate = None
         self._icon = None
 
+        # Words for the search, from the catalogue
+        self._words = None
+
+        # Model of the files, loaded lazily and again if a file changed
+        self.__sections = None
+        self.__ini_mtime = None
+        self.__query = None
+        self.__query_mtime = None
+        self.__template = None
+        self.__dic = None
+
     def getName(self):
         return self._name
 
@@ -69,12 +118,51 @@ class FileQuery(object):
     def getIcon(self):
         return self._icon
 
+    def getWords(self):
+        return self._words
+
     def getQueryFile(self):
         return self._queryFile
 
     def getFilePath(self):
         return self._filePath
 
+    @staticmethod
+    def __mtime(file_path):
+        try:
+            return getmtime(file_path)
+        except (OSError, TypeError):
+            return None
+
+    def __read(self):
+        """
+        Read the files which changed since the last call
+
+        @return: the sections of the INI file, with their options
+        @rtype: dict
+        """
+        ini_mtime = self.__mtime(self._filePath)
+        if self.__sections is None or ini_mtime != self.__ini_mtime:
+            config_parser = ConfigParser.ConfigParser()
+            config_parser.read(self._filePath)
+            self.__sections = {}
+            for section in config_parser.sections():
+                self.__sections[section] = self.__config_section_map(
+                    config_parser, section)
+            self.__ini_mtime = ini_mtime
+            self.__dic = None
+
+        if self._queryFile:
+            query_mtime = self.__mtime(self._queryFile)
+            if self.__query is None or query_mtime != self.__query_mtime:
+                with open(self._queryFile, 'r') as f:
+                    self.__query = unicode(f.read(), "utf-8")
+                self.__query_mtime = query_mtime
+                self.__template = None
+                self.__dic = None
+
+        return self.__sections
+
     def isValid(self):
         # Is it an ini file ?
         tab = (ntpath.basename(self._filePath)).split('.')
@@ -85,25 +173,19 @@ class FileQuery(object):
         if tab[1] != "ini":
             return False
 
-        # Get the ini parser
-        try:
-            self.__configParser
-        except AttributeError:
-            self.__configParser = ConfigParser.ConfigParser()
-            self.__configParser.read(self._filePath)
-
         # Set the name
         try:
+            sections = self.__read()
+
             # metadata-name and
             # metadata-category and
             # (layers)-load (bool) are compulsory
-            self._name = self.__config_section_map('metadata')['name']
-            self._category = self.__config_section_map('metadata')['category']
+            self._name = sections['metadata']['name']
+            self._category = sections['metadata']['category']
 
             # Check if layers are presents in the ini file
             for layer in FileQuery.LAYERS:
-                if not isinstance(
-                        self.__config_section_map(layer)['load'], bool):
+                if not isinstance(sections[layer]['load'], bool):
                     return False
 
             # Is there another file with the query ?
@@ -117,56 +199,47 @@ class FileQuery(object):
             if not self._queryExtension and not self._queryFile:
                 return False
 
-            # Test OK, so add it to the list
-            if self._category not in FileQuery.FILES:
-                FileQuery.FILES[self._category] = []
-
-            FileQuery.FILES[self._category].append(self)
             return True
         except Exception:
             return False
 
     def isTemplate(self):
-        self._bboxTemplate = False
-        self._nominatimTemplate = False
-        self.__nominatimDefaultValue = None
-
-        # If XML, check for templates
-        if self._queryExtension == 'xml':
-            query = unicode(open(self._queryFile, 'r').read(), "utf-8")
-
-            # Check if there is a BBOX template
-            if re.search('{{bbox}}', query):
-                self._bboxTemplate = True
-
-            # Check if there is a Nominatim template
-            if re.search('{{nominatim}}', query):
-                self._nominatimTemplate = True
-                self.__nominatimDefaultValue = False
-            m = re.search('{{(nominatimArea|geocodeArea):(.*)}}', query)
-            if m:
-                self._nominatimTemplate = True
-                self.__nominatimDefaultValue = m.groups(1)[1]
-
-        return {
-            "nominatim": self._nominatimTemplate,
-            "nominatimDefaultValue": self.__nominatimDefaultValue,
-            "bbox": self._bboxTemplate}
+        self.__read()
+        if self.__template is None:
+            self._bboxTemplate = False
+            self._nominatimTemplate = False
+            nominatim_default_value = None
+
+            # If XML, check for templates
+            if self._queryExtension == 'xml':
+                query = self.__query
+
+                # Check if there is a BBOX template
+                if FileQuery.BBOX_TEMPLATE.search(query):
+                    self._bboxTemplate = True
+
+                # Check if there is a Nominatim template
+                if FileQuery.NOMINATIM_TEMPLATE.search(query):
+                    self._nominatimTemplate = True
+                    nominatim_default_value = False
+                m = FileQuery.GEOCODE_AREA_TEMPLATE.search(query)
+                if m:
+                    self._nominatimTemplate = True
+                    nominatim_default_value = m.group(1)
+
+            self.__template = {
+                "nominatim": self._nominatimTemplate,
+                "nominatimDefaultValue": nominatim_default_value,
+                "bbox": self._bboxTemplate}
+
+        return self.__template
 
     def getContent(self):
-        try:
-            return self.__dic
-        except AttributeError:
-            try:
-                self.__configParser
-            except AttributeError:
-                self.__configParser = ConfigParser.ConfigParser()
-                self.__configParser.read(self._filePath)
-
+        sections = self.__read()
+        if self.__dic is None:
             dic = {}
             dic['metadata'] = {}
-            dic['metadata']['query'] = unicode(
-                open(self._queryFile, 'r').read(), "utf-8")
+            dic['metadata']['query'] = self.__query
 
             dic['metadata']['name'] = self._name
 
@@ -174,8 +247,7 @@ class FileQuery(object):
             for layer in FileQuery.LAYERS:
                 dic['layers'][layer] = {}
                 for item in ['namelayer', 'columns', 'style', 'load']:
-                    dic['layers'][layer][item] = self.__config_section_map(
-                        layer)[item]
+                    dic['layers'][layer][item] = sections[layer][item]
 
                     if item == 'style':
                         qml_file = dic['layers'][layer][item]
@@ -184,38 +256,36 @@ class FileQuery(object):
                                 self._directory, qml_file)
                         else:
                             dic['layers'][layer][item] = None
+
+                # Optional, to cap the number of columns of the layer
+                dic['layers'][layer]['max_columns'] = self.__number(
+                    sections[layer].get('max_columns'), int)
+                dic['layers'][layer]['min_fill_rate'] = self.__number(
+                    sections[layer].get('min_fill_rate'), float)
             self.__dic = dic
-            return self.__dic
+        return self.__dic
 
     def getValue(self, section, item):
-        try:
-            self.__configParser
-        except AttributeError:
-            self.__configParser = ConfigParser.ConfigParser()
-            self.__configParser.read(self._filePath)
+        value = self.__read().get(section, {}).get(item)
+        if value is None:
+            return False
+        return value
 
-        for var in self.__configParser.options(section):
-            if var == item:
-                try:
-                    value = unicode(
-                        self.__configParser.get(section, var), "utf-8")
-                    if value == u"True":
-                        return True
-                    elif value == u"False":
-                        return False
-                    else:
-                        return value
-                except:
-                    return False
-        return False
+    @staticmethod
+    def __number(value, number_type):
+        """Read an optional number of the ini file, None if it's empty."""
+        try:
+            return number_type(value)
+        except (TypeError, ValueError):
+            return None
 
-    def __config_section_map(self, section):
+    @staticmethod
+    def __config_section_map(config_parser, section):
 
         ini_dict = {}
-        for option in self.__configParser.options(section):
+        for option in config_parser.options(section):
             try:
-                value = unicode(
-                    self.__configParser.get(section, option), "utf-8")
+                value = unicode(config_parser.get(section, option), "utf-8")
                 if value == u"True":
                     ini_dict[option] = True
                 elif value == u"False":
@@ -225,3 +295,142 @@ class FileQuery(object):
             except:
                 ini_dict[option] = None
         return ini_dict
+
+
+class FileQueryCatalogue(object):
+    """
+    Index of the queries of a folder, saved in the folder.
+
+    An INI file is parsed again only if its modification time, its size or
+    its query file changed since the last scan. The words of the search
+    index are kept in the catalogue too.
+    """
+
+    INDEX_FILE = '.catalogue.json'
+    VERSION = 2
+    CATALOGUES = {}
+
+    @staticmethod
+    def get(folder):
+        """
+        The catalogue of a folder, created once per session
+
+        @param folder: the folder
+        @type folder: str
+        @rtype: FileQueryCatalogue
+        """
+        try:
+            return FileQueryCatalogue.CATALOGUES[folder]
+        except KeyError:
+            catalogue = FileQueryCatalogue(folder)
+            FileQueryCatalogue.CATALOGUES[folder] = catalogue
+            return catalogue
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.index_path = join(folder, FileQueryCatalogue.INDEX_FILE)
+        self.entries = self.read_index()
+
+        # FileQuery already built, by name of INI file
+        self.queries = {}
+
+    def read_index(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+        if index.get('version') != FileQueryCatalogue.VERSION:
+            return {}
+        return index.get('files', {})
+
+    def write_index(self):
+        index = {'version': FileQueryCatalogue.VERSION, 'files': self.entries}
+        try:
+            with open(self.index_path, 'w') as f:
+                json.dump(index, f)
+        except (IOError, OSError):
+            # The catalogue is only a cache
+            pass
+
+    def scan(self):
+        """
+        Update the catalogue with the files in the folder
+
+        @return: list of FileQuery by category
+        @rtype: dict
+        """
+        # The index of the search imports this module
+        from QuickOSM.core.file_query_index import FileQueryIndex
+
+        names = set(listdir(self.folder))
+        entries = {}
+
+        for name in sorted(names):
+            tab = name.split('.')
+            if len(tab) < 2 or tab[1] != 'ini':
+                continue
+
+            file_path = join(self.folder, name)
+            try:
+                file_stat = stat(file_path)
+            except OSError:
+                continue
+            if not S_ISREG(file_stat.st_mode):
+                continue
+
+            query_file = None
+            for ext in FileQuery.QUERY_EXTENSIONS:
+                if tab[0] + '.' + ext in names:
+                    query_file = tab[0] + '.' + ext
+
+            signature = [file_stat.st_mtime, file_stat.st_size, query_file]
+            if query_file:
+                # The words to search come from the query too
+                try:
+                    query_stat = stat(join(self.folder, query_file))
+                    signature += [query_stat.st_mtime, query_stat.st_size]
+                except OSError:
+                    pass
+
+            entry = self.entries.get(name)
+            if entry is None or entry['signature'] != signature:
+                entry = {'signature': signature}
+                ini = FileQuery(file_path)
+                if ini.isValid():
+                    entry['name'] = ini.getName()
+                    entry['category'] = ini.getCategory()
+                    entry['query_file'] = basename(ini.getQueryFile())
+                    ini._words = FileQueryIndex.file_words(ini)
+                    entry['words'] = sorted(ini._words)
+                    self.queries[name] = ini
+                else:
+                    self.queries.pop(name, None)
+            entries[name] = entry
+
+        if entries != self.entries:
+            self.entries = entries
+            self.write_index()
+
+        categories = {}
+        for name, entry in sorted(self.entries.iteritems()):
+            if 'name' not in entry:
+                continue
+
+            if name not in self.queries:
+                self.queries[name] = FileQuery.from_catalogue(
+                    join(self.folder, name),
+                    entry['name'],
+                    entry['category'],
+                    join(self.folder, entry['query_file']),
+                    entry.get('words'))
+
+            query = self.queries[name]
+            categories.setdefault(query.getCategory(), []).append(query)
+
+        for name in self.queries.keys():
+            if name not in self.entries:
+                del self.queries[name]
+
+        return categories
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import re
+from bisect import bisect_left, insort
+
+from QuickOSM.core.file_query import FileQuery
+
+
+class FileQueryIndex(object):
+    """
+    Inverted index to search saved queries.
+
+    The name, the category, the OSM keys and values used in the query and
+    the names of the layers are split in words. Every suffix of a word is
+    indexed, so a search is a prefix lookup in a sorted list which matches
+    any part of a word.
+    """
+
+    WORDS = re.compile(r'\w+', re.UNICODE)
+
+    # k="..." and v="..." in XML
+    XML_TAGS = re.compile(r'\b[kv]="([^"]*)"')
+
+    # ["key"="value"], [key], [key~value] ... in OQL
+    OQL_TAGS = re.compile(
+        r'\[\s*!?\s*("(?:[^"\\]|\\.)*"|\w+)\s*'
+        r'(?:!?[=~]\s*("(?:[^"\\]|\\.)*"|\w+)\s*(?:,\s*i\s*)?)?\]')
+
+    def __init__(self):
+        # FileQuery and its words, by path of the INI file
+        self.queries = {}
+        self.words = {}
+
+        # Paths of the INI files, by suffix of word
+        self.postings = {}
+        self.suffixes = []
+
+    @staticmethod
+    def query_words(query):
+        """
+        Words to index for a query
+
+        @param query: the saved query
+        @type query: FileQuery
+        @return: words in lower case
+        @rtype: set
+        """
+        texts = [query.getName() or u'', query.getCategory() or u'']
+
+        content = query.getContent()
+        body = content['metadata']['query'] or u''
+        for match in FileQueryIndex.XML_TAGS.finditer(body):
+            texts.append(match.group(1))
+        for match in FileQueryIndex.OQL_TAGS.finditer(body):
+            texts.extend(group for group in match.groups() if group)
+
+        for layer in FileQuery.LAYERS:
+            texts.append(content['layers'][layer]['namelayer'] or u'')
+
+        words = set()
+        for text in texts:
+            words.update(FileQueryIndex.WORDS.findall(text.lower()))
+        return words
+
+    @staticmethod
+    def file_words(query):
+        """
+        Words to index for a query, only its name if a file can't be read
+
+        @param query: the saved query
+        @type query: FileQuery
+        @return: words in lower case
+        @rtype: set
+        """
+        try:
+            return FileQueryIndex.query_words(query)
+        except (IOError, KeyError):
+            return set(FileQueryIndex.WORDS.findall(
+                (query.getName() or u'').lower()))
+
+    def add(self, query):
+        file_path = query.getFilePath()
+        if file_path in self.queries:
+            self.remove(file_path)
+
+        # The catalogue keeps the words, the files are not read again
+        words = query.getWords()
+        if words is None:
+            words = self.file_words(query)
+
+        self.queries[file_path] = query
+        self.words[file_path] = words
+        for word in words:
+            for i in xrange(len(word)):
+                suffix = word[i:]
+                if suffix not in self.postings:
+                    self.postings[suffix] = set()
+                    insort(self.suffixes, suffix)
+                self.postings[suffix].add(file_path)
+
+    def remove(self, file_path):
+        del self.queries[file_path]
+        for word in self.words.pop(file_path):
+            for i in xrange(len(word)):
+                suffix = word[i:]
+                paths = self.postings.get(suffix)
+                if paths is None:
+                    continue
+                paths.discard(file_path)
+                if not paths:
+                    del self.postings[suffix]
+                    del self.suffixes[bisect_left(self.suffixes, suffix)]
+
+    def update(self, categories):
+        """
+        Index the queries of the catalogue which are new or changed
+
+        @param categories: list of FileQuery by category
+        @type categories: dict
+        """
+        queries = {}
+        for files in categories.itervalues():
+            for query in files:
+                queries[query.getFilePath()] = query
+
+        for file_path in self.queries.keys():
+            if file_path not in queries:
+                self.remove(file_path)
+
+        for file_path, query in queries.iteritems():
+            # The catalogue gives the same object if the file did not change
+            if self.queries.get(file_path) is not query:
+                self.add(query)
+
+    def search(self, text):
+        """
+        Search queries, all the words of the text must match
+
+        @param text: the text to search
+        @type text: str
+        @return: paths of the INI files or None if there is no word
+        @rtype: set
+        """
+        result = None
+        for word in self.WORDS.findall(text.lower()):
+            paths = set()
+            i = bisect_left(self.suffixes, word)
+            while i < len(self.suffixes) and \
+                    self.suffixes[i].startswith(word):
+                paths.update(self.postings[self.suffixes[i]])
+                i += 1
+
+            if result is None:
+                result = paths
+            else:
+                result &= paths
+
+            if not result:
+                break
+        return result
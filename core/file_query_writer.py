@@ -94,6 +94,8 @@ class FileQueryWriter:
                 "load": load,
                 "namelayer": "",
                 "columns": csv,
+                "max_columns": "",
+                "min_fill_rate": "",
                 "style": ""}
 
             for key in info_layer.keys():
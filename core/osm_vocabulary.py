@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import json
+from bisect import bisect_left, insort
+from heapq import nsmallest
+from os.path import dirname, abspath, join, isfile
+
+
+class PrefixIndex(object):
+    """
+    Words ranked by usage, then alphabetically, for autocompletion.
+
+    Words are kept sorted, so the words starting with a prefix are a
+    contiguous range, like the subtree of a trie, found by bisection.
+    The best completions of each prefix typed are cached, so typing one
+    more character costs a dictionary lookup once the list is known.
+    """
+
+    TOP_SIZE = 50
+
+    def __init__(self, words=None):
+        self.counts = dict.fromkeys(words or [], 0)
+        self.words = sorted(self.counts)
+
+        # Best completions, by prefix
+        self.top = {}
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.counts
+
+    def add(self, word, count=0):
+        """
+        Add a word or increase its count
+
+        @param word: the word
+        @type word: str
+        @param count: usage to add
+        @type count: int
+        """
+        if word in self.counts:
+            self.counts[word] += count
+        else:
+            self.counts[word] = count
+            insort(self.words, word)
+
+        for i in xrange(len(word) + 1):
+            self.top.pop(word[:i], None)
+
+    def complete(self, prefix=u'', limit=TOP_SIZE):
+        """
+        Words starting with a prefix
+
+        @param prefix: the beginning of the words
+        @type prefix: str
+        @param limit: maximum number of words, all if None
+        @type limit: int
+        @return: the best words
+        @rtype: list
+        """
+        if limit is None or limit > PrefixIndex.TOP_SIZE:
+            return self._best(prefix, limit)
+
+        try:
+            top = self.top[prefix]
+        except KeyError:
+            top = self._best(prefix, PrefixIndex.TOP_SIZE)
+            self.top[prefix] = top
+        return top[:limit]
+
+    def _best(self, prefix, limit):
+        start = bisect_left(self.words, prefix)
+        end = bisect_left(self.words, prefix + u'\uffff', start)
+        words = self.words[start:end]
+        if not any(self.counts[word] for word in words):
+            return words[:limit]
+
+        ranked = [(-self.counts[word], word) for word in words]
+        if limit is None:
+            ranked.sort()
+        else:
+            ranked = nsmallest(limit, ranked)
+        return [word for count, word in ranked]
+
+
+class OsmVocabulary(object):
+    """
+    OSM keys and values for the autocompletion, shared by the widgets.
+
+    Keys and values come from mapFeatures.json and the usage of the keys
+    and values in the queries made by the user.
+    """
+
+    USAGE_FILE = 'tag_usage.json'
+    _instance = None
+
+    @staticmethod
+    def get():
+        """
+        The vocabulary of the plugin, loaded at the first call
+
+        @rtype: OsmVocabulary
+        """
+        if OsmVocabulary._instance is None:
+            from QuickOSM.core.utilities.tools import get_QuickOSM_folder
+            map_features = join(
+                dirname(dirname(abspath(__file__))), 'mapFeatures.json')
+            usage_file = join(get_QuickOSM_folder(), OsmVocabulary.USAGE_FILE)
+            OsmVocabulary._instance = OsmVocabulary(map_features, usage_file)
+        return OsmVocabulary._instance
+
+    def __init__(self, map_features_file=None, usage_file=None):
+        """
+        Constructor
+
+        @param map_features_file: JSON file with the values of each key
+        @type map_features_file: str
+        @param usage_file: JSON file with the count of each value of a key,
+        the count of the key itself is given by the empty value
+        @type usage_file: str
+        """
+        self.usage_file = usage_file
+        self.features = self.read(map_features_file)
+        self.usage = self.read(usage_file)
+
+        self.keys = PrefixIndex(self.features.iterkeys())
+        for key, values in self.usage.iteritems():
+            self.keys.add(key, values.get(u'', 0))
+
+        # Values, by key, indexed when the key is used
+        self.values = {}
+
+    @staticmethod
+    def read(json_file):
+        if not json_file or not isfile(json_file):
+            return {}
+        try:
+            with open(json_file) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def complete_key(self, prefix=u'', limit=PrefixIndex.TOP_SIZE):
+        return self.keys.complete(prefix, limit)
+
+    def value_index(self, key):
+        try:
+            return self.values[key]
+        except KeyError:
+            index = PrefixIndex(self.features.get(key, []))
+            for value, count in self.usage.get(key, {}).iteritems():
+                if value:
+                    index.add(value, count)
+            self.values[key] = index
+            return index
+
+    def complete_value(self, key, prefix=u'', limit=PrefixIndex.TOP_SIZE):
+        return self.value_index(key).complete(prefix, limit)
+
+    def record(self, key, value=None):
+        """
+        Count a key and a value used in a query and save the usage
+
+        @param key: the key
+        @type key: str
+        @param value: the value
+        @type value: str
+        """
+        if not key:
+            return
+
+        values = self.usage.setdefault(key, {})
+        values[u''] = values.get(u'', 0) + 1
+        self.keys.add(key, 1)
+        if value:
+            values[value] = values.get(value, 0) + 1
+            self.value_index(key).add(value, 1)
+
+        if self.usage_file:
+            try:
+                with open(self.usage_file, 'w') as f:
+                    json.dump(self.usage, f)
+            except (IOError, OSError):
+                pass
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def is_closed(ring):
+    return len(ring) > 3 and (ring[0] == ring[-1]).all()
+
+
+def build_rings(ways):
+    """
+    Join the ways of a relation into closed rings
+
+    The ways are joined by their endpoints, found in a hash of the
+    coordinates, and reversed if needed. The ways which can't be closed
+    are dropped, like OGR.
+
+    @param ways: coordinates of each way
+    @type ways: list of numpy.ndarray
+
+    @return: the closed rings
+    @rtype: list of numpy.ndarray
+    """
+    rings = []
+    open_ways = []
+    ends = {}
+    for way in ways:
+        if len(way) < 2:
+            continue
+        if is_closed(way):
+            rings.append(way)
+            continue
+        for end in (tuple(way[0]), tuple(way[-1])):
+            ends.setdefault(end, []).append(len(open_ways))
+        open_ways.append(way)
+
+    used = [False] * len(open_ways)
+    for i, way in enumerate(open_ways):
+        if used[i]:
+            continue
+        used[i] = True
+        parts = [way]
+        start = tuple(way[0])
+        end = tuple(way[-1])
+        while end != start:
+            following = None
+            for j in ends[end]:
+                if not used[j]:
+                    following = j
+                    break
+            if following is None:
+                break
+            used[following] = True
+            way = open_ways[following]
+            if tuple(way[0]) == end:
+                parts.append(way[1:])
+                end = tuple(way[-1])
+            else:
+                parts.append(way[-2::-1])
+                end = tuple(way[0])
+
+        if end == start:
+            ring = numpy.concatenate(parts)
+            if len(ring) > 3:
+                rings.append(ring)
+    return rings
+
+
+def ring_area(ring):
+    """
+    Area of a ring with the shoelace formula, in square degrees
+
+    @rtype: float
+    """
+    x = ring[:, 0]
+    y = ring[:, 1]
+    return abs(numpy.dot(x[:-1], y[1:]) - numpy.dot(x[1:], y[:-1])) / 2.0
+
+
+def ring_contains(ring, point):
+    """
+    If a point is inside a ring, by ray casting on all the edges at once
+
+    @rtype: bool
+    """
+    x, y = point
+    x1 = ring[:-1, 0]
+    y1 = ring[:-1, 1]
+    x2 = ring[1:, 0]
+    y2 = ring[1:, 1]
+    crossing = (y1 > y) != (y2 > y)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        intersections = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return bool((crossing & (x < intersections)).sum() % 2)
+
+
+def ring_inside(container, ring):
+    """
+    If a ring is inside another one, they can touch at some shared nodes
+
+    The first node of the ring which is not a node of the container is
+    tested, a shared node is on the edges of the container.
+
+    @rtype: bool
+    """
+    for point in ring[:-1]:
+        if not (container == point).all(axis=1).any():
+            return ring_contains(container, point)
+    # All the nodes are shared
+    return ring_contains(container, ring[:-1].mean(axis=0))
+
+
+class RingIndex(object):
+    """
+    Bounding boxes of rings in NumPy arrays
+
+    The rings around another one are found with a vectorized test on all
+    the boxes, before the exact test on their edges.
+    """
+
+    def __init__(self, rings):
+        """
+        Constructor
+
+        @param rings: closed rings
+        @type rings: list of numpy.ndarray
+        """
+        self.rings = rings
+        self.boxes = numpy.array([
+            (ring[:, 0].min(), ring[:, 1].min(),
+             ring[:, 0].max(), ring[:, 1].max())
+            for ring in rings]).reshape(-1, 4)
+        self.areas = numpy.array([ring_area(ring) for ring in rings])
+
+    def containers(self, ring):
+        """
+        The rings around a ring, the smallest first
+
+        @param ring: position of the ring in the index
+        @type ring: int
+
+        @rtype: list
+        """
+        boxes = self.boxes
+        x_min, y_min, x_max, y_max = boxes[ring]
+        candidates = numpy.nonzero(
+            (boxes[:, 0] <= x_min) & (boxes[:, 1] <= y_min) &
+            (boxes[:, 2] >= x_max) & (boxes[:, 3] >= y_max) &
+            (self.areas > self.areas[ring]))[0]
+        candidates = candidates[numpy.argsort(self.areas[candidates])]
+        return [
+            candidate for candidate in candidates.tolist()
+            if ring_inside(self.rings[candidate], self.rings[ring])]
+
+
+def build_multipolygon(ways):
+    """
+    Polygons of a multipolygon relation
+
+    The ways are joined into rings, then the outer and inner rings are
+    found from their containment, like OGR: the roles of the members are
+    often wrong. A ring in a hole is a new polygon.
+
+    @param ways: coordinates of the member ways
+    @type ways: list of numpy.ndarray
+
+    @return: the rings of each polygon, the outer ring first
+    @rtype: list
+    """
+    rings = build_rings(ways)
+    if not rings:
+        return []
+
+    index = RingIndex(rings)
+    polygons = []
+    # Polygon of each outer ring, None for an inner ring
+    polygon_of = {}
+    for ring in numpy.argsort(-index.areas, kind='mergesort').tolist():
+        containers = index.containers(ring)
+        if containers and polygon_of[containers[0]] is not None:
+            polygons[polygon_of[containers[0]]].append(rings[ring])
+            polygon_of[ring] = None
+        else:
+            polygon_of[ring] = len(polygons)
+            polygons.append([rings[ring]])
+    return polygons
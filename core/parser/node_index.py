@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import tempfile
+from array import array
+from os import close, remove
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def sort_ids(ids):
+    """
+    Sort some ids once, to search them with search_ids
+
+    @param ids: ids in their order of insertion
+    @type ids: numpy.ndarray
+
+    @return: the sorted ids, the position of each one before sorting or
+        None if they were already sorted
+    @rtype: tuple
+    """
+    if len(ids) < 2 or (ids[1:] >= ids[:-1]).all():
+        return ids, None
+    order = numpy.argsort(ids, kind='mergesort')
+    return ids[order], order
+
+
+def search_ids(ids, order, refs):
+    """
+    Find some ids in the result of sort_ids, all at once
+
+    @param refs: ids to find
+    @type refs: list
+
+    @return: the position of each ref before sorting, -1 if it's missing
+    @rtype: numpy.ndarray
+    """
+    refs = numpy.asarray(refs, dtype=numpy.int64)
+    if not len(ids):
+        return numpy.full(len(refs), -1, dtype=numpy.int64)
+    positions = numpy.searchsorted(ids, refs)
+    positions[positions == len(ids)] = 0
+    found = ids[positions] == refs
+    if order is not None:
+        positions = order[positions]
+    positions[~found] = -1
+    return positions
+
+
+class NodeIndex(object):
+    """
+    Coordinates of the nodes, by id
+
+    The ids and the coordinates are in parallel NumPy arrays of int64 and
+    float64, sorted once by id after adding the last node. The nodes of
+    a way are found with one searchsorted for the whole way. It costs 24
+    bytes by node, instead of about 100 bytes in a dict.
+
+    With memory_map, the nodes are written in temporary files while they
+    are added, then mapped in memory: the system keeps only the pages used
+    in RAM. Each chunk is sorted before being written, then the chunks
+    are merged block by block, so sorting needs about chunk_size nodes in
+    RAM. close must be called to remove the files.
+    """
+
+    # Number of nodes buffered before writing them in the files
+    CHUNK_SIZE = 1000000
+
+    def __init__(self, memory_map=False, chunk_size=CHUNK_SIZE):
+        """
+        Constructor
+
+        @param memory_map: if the arrays are in temporary files
+        @type memory_map: bool
+
+        @param chunk_size: number of nodes written at once in the files
+        @type chunk_size: int
+        """
+        self.memory_map = memory_map
+        self.chunk_size = chunk_size
+
+        # Nodes added, the ids are in doubles: exact for the OSM ids and
+        # 'l' is only 32 bits on Windows
+        self.buffers = (array('d'), array('d'), array('d'))
+
+        self.files = []
+        self.size = 0
+        if memory_map:
+            self.files = self.temporary_files()
+
+        # End of each sorted chunk in the files, and if the chunks follow
+        # each other, like in most OSM files
+        self.runs = []
+        self.ordered = True
+        self.last_id = None
+
+        # Set by sort
+        self.ids = None
+        self.lons = None
+        self.lats = None
+
+    @staticmethod
+    def temporary_files():
+        """
+        Paths of three new files, for the ids, the lons and the lats
+        """
+        paths = []
+        for _ in range(3):
+            handle, path = tempfile.mkstemp(suffix='.nodes')
+            close(handle)
+            paths.append(path)
+        return paths
+
+    def __len__(self):
+        return self.size
+
+    def is_sorted(self):
+        return self.ids is not None
+
+    def add(self, node_id, lon, lat):
+        """
+        Add a node, before sorting the index
+        """
+        ids, lons, lats = self.buffers
+        ids.append(node_id)
+        lons.append(lon)
+        lats.append(lat)
+        self.size += 1
+        if self.memory_map and len(ids) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Sort the buffered nodes and write them in the temporary files
+        """
+        ids, lons, lats = self.buffers
+        if not len(ids):
+            return
+        arrays = [
+            numpy.frombuffer(ids, dtype=numpy.float64).astype(numpy.int64),
+            numpy.frombuffer(lons, dtype=numpy.float64),
+            numpy.frombuffer(lats, dtype=numpy.float64)]
+        _, order = sort_ids(arrays[0])
+        if order is not None:
+            self.ordered = False
+            arrays = [values[order] for values in arrays]
+        if self.runs and self.ordered:
+            self.ordered = arrays[0][0] >= self.last_id
+        self.last_id = arrays[0][-1]
+
+        for path, values in zip(self.files, arrays):
+            with open(path, 'ab') as f:
+                values.tofile(f)
+        self.runs.append(self.size)
+        self.buffers = (array('d'), array('d'), array('d'))
+
+    def merge(self):
+        """
+        Merge the sorted chunks of the files into new files
+
+        A block of each chunk is read at a time. The nodes up to the
+        smallest last id of the blocks are sorted and written, the others
+        are read again with the next blocks.
+        """
+        dtypes = [numpy.int64, numpy.float64, numpy.float64]
+        sources = [
+            numpy.memmap(path, dtype=dtype, mode='r', shape=(self.size,))
+            for path, dtype in zip(self.files, dtypes)]
+        paths = self.temporary_files()
+        outputs = [
+            numpy.memmap(path, dtype=dtype, mode='w+', shape=(self.size,))
+            for path, dtype in zip(paths, dtypes)]
+
+        ids = sources[0]
+        starts = [0] + self.runs[:-1]
+        ends = list(self.runs)
+        block = max(self.chunk_size // len(self.runs), 1)
+        position = 0
+        while position < self.size:
+            runs = [i for i in range(len(starts)) if starts[i] < ends[i]]
+            last_id = min(
+                ids[min(starts[i] + block, ends[i]) - 1] for i in runs)
+            slices = []
+            for i in runs:
+                stop = min(starts[i] + block, ends[i])
+                stop = starts[i] + numpy.searchsorted(
+                    ids[starts[i]:stop], last_id, side='right')
+                slices.append(slice(starts[i], stop))
+                starts[i] = stop
+
+            merged = numpy.concatenate([ids[s] for s in slices])
+            order = numpy.argsort(merged, kind='mergesort')
+            end = position + len(merged)
+            for source, output in zip(sources, outputs):
+                output[position:end] = numpy.concatenate(
+                    [source[s] for s in slices])[order]
+            position = end
+
+        for output in outputs:
+            output.flush()
+        del sources, outputs
+        self.remove_files()
+        self.files = paths
+
+    def sort(self):
+        """
+        Sort the nodes by id, no node can be added after
+        """
+        if self.memory_map:
+            self.flush()
+            self.buffers = None
+            if not self.ordered:
+                self.merge()
+            self.ids, self.lons, self.lats = [
+                numpy.memmap(path, dtype=dtype, mode='r', shape=(self.size,))
+                if self.size else numpy.empty(0, dtype=dtype)
+                for path, dtype in zip(self.files, [
+                    numpy.int64, numpy.float64, numpy.float64])]
+            return
+
+        # In RAM, the sorted copy of the arrays is made at once
+        ids, lons, lats = self.buffers
+        arrays = [
+            numpy.frombuffer(ids, dtype=numpy.float64).astype(numpy.int64),
+            numpy.frombuffer(lons, dtype=numpy.float64),
+            numpy.frombuffer(lats, dtype=numpy.float64)]
+        self.buffers = None
+
+        _, order = sort_ids(arrays[0])
+        if order is not None:
+            arrays = [values[order] for values in arrays]
+        self.ids, self.lons, self.lats = arrays
+
+    def lookup(self, refs):
+        """
+        Positions of some nodes in the sorted arrays
+
+        @param refs: ids of the nodes, like the nodes of a way
+        @type refs: list
+
+        @return: the position of each node, -1 if it's missing
+        @rtype: numpy.ndarray
+        """
+        return search_ids(self.ids, None, refs)
+
+    def coordinates(self, refs):
+        """
+        Coordinates of some nodes, the missing nodes are skipped
+
+        @param refs: ids of the nodes, like the nodes of a way
+        @type refs: list
+
+        @return: lon, lat of each node found
+        @rtype: numpy.ndarray
+        """
+        positions = self.lookup(refs)
+        positions = positions[positions >= 0]
+        return numpy.column_stack(
+            (self.lons[positions], self.lats[positions]))
+
+    def close(self):
+        """
+        Free the arrays and remove the temporary files
+        """
+        self.ids = self.lons = self.lats = None
+        self.buffers = None
+        self.remove_files()
+
+    def remove_files(self):
+        for path in self.files:
+            try:
+                remove(path)
+            except OSError:
+                pass
+        self.files = []
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import tempfile
+from xml.sax import make_parser
+from xml.sax.handler import ContentHandler
+from xml.sax.saxutils import quoteattr
+
+
+class OsmDiffParser(object):
+    """
+    Read an augmented diff from Overpass with inlined coordinates.
+
+    The new version of created and modified objects is written in a plain
+    OSM file, ordered node-way-relation, so that it can be read by OGR.
+    The centers of the ways and the relations, with "out center", are
+    kept for the Python parser.
+    """
+
+    def __init__(self, osm_file):
+        """
+        Constructor
+
+        @param osm_file: the augmented diff
+        @type osm_file: str
+        """
+        self.osm_file = osm_file
+        self.osm_base = None
+        self.deleted = set()
+        self.changed = set()
+
+    def parse(self):
+        """
+        Parse the diff
+
+        @return: path to the OSM file with the new objects or None if there
+        is no object to create or to update
+        @rtype: str
+        """
+        sax_parser = make_parser()
+        handler = OsmDiffHandler()
+        sax_parser.setContentHandler(handler)
+        with open(self.osm_file) as f:
+            sax_parser.parse(f)
+
+        self.osm_base = handler.osm_base
+        self.deleted = handler.deleted
+        self.changed = handler.changed
+
+        if not handler.ways and not handler.relations and not [
+                n for n in handler.nodes.itervalues() if n[2]]:
+            return None
+
+        tf = tempfile.NamedTemporaryFile(
+            delete=False, suffix='_diff_quickosm.osm')
+        tf.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        tf.write('<osm version="0.6" generator="QuickOSM">\n')
+
+        for osm_id in sorted(handler.nodes):
+            lat, lon, tags = handler.nodes[osm_id]
+            tf.write('<node id="%s" lat="%s" lon="%s"' % (osm_id, lat, lon))
+            self._write_tags(tf, 'node', tags)
+
+        for osm_id, refs, tags, center in handler.ways:
+            tf.write('<way id="%s">' % osm_id)
+            self._write_center(tf, center)
+            for ref in refs:
+                tf.write('<nd ref="%s"/>' % ref)
+            self._write_tags(tf, 'way', tags, opened=True)
+
+        for osm_id, members, tags, center in handler.relations:
+            tf.write('<relation id="%s">' % osm_id)
+            self._write_center(tf, center)
+            for osm_type, ref, role in members:
+                tf.write('<member type="%s" ref="%s" role=%s/>' % (
+                    osm_type, ref, quoteattr(role).encode('utf-8')))
+            self._write_tags(tf, 'relation', tags, opened=True)
+
+        tf.write('</osm>\n')
+        tf.flush()
+        tf.close()
+        return tf.name
+
+    @staticmethod
+    def _write_center(f, center):
+        """Write the center of a way or a relation, if any."""
+        if center:
+            f.write('<center lat="%s" lon="%s"/>' % center)
+
+    @staticmethod
+    def _write_tags(f, osm_type, tags, opened=False):
+        """Write the tags and close the element.
+
+        opened is True if the start tag of the element is already closed.
+        """
+        if not tags:
+            f.write('</%s>\n' % osm_type if opened else '/>\n')
+            return
+        if not opened:
+            f.write('>')
+        for k, v in tags:
+            f.write('<tag k=%s v=%s/>' % (
+                quoteattr(k).encode('utf-8'), quoteattr(v).encode('utf-8')))
+        f.write('</%s>\n' % osm_type)
+
+
+class OsmDiffHandler(ContentHandler):
+
+    DIC_OSM_TYPE = {'node': 'n', 'way': 'w', 'relation': 'r'}
+
+    def __init__(self):
+        ContentHandler.__init__(self)
+        self.osm_base = None
+        self.deleted = set()
+        self.changed = set()
+
+        # Objects of the new OSM file
+        self.nodes = {}
+        self.ways = []
+        self.relations = []
+
+        self.action = None
+        self.in_old = False
+        self.element = None
+        self.tags = []
+        self.refs = []
+        self.members = []
+        self.member = None
+        self.center = None
+
+        # Ids given to the ways built from the geometry of the members
+        self.fake_id = 0
+
+    def _new_fake_id(self):
+        self.fake_id -= 1
+        return self.fake_id
+
+    def startElement(self, name, attributes):
+        if name == 'meta':
+            self.osm_base = attributes.get('osm_base')
+
+        elif name == 'action':
+            self.action = attributes.get('type')
+
+        elif name == 'old':
+            self.in_old = True
+
+        elif name == 'new':
+            self.in_old = False
+
+        elif self.in_old or not self.action:
+            return
+
+        elif name in self.DIC_OSM_TYPE and self.element is None:
+            self.element = (
+                name,
+                attributes.get('id'),
+                attributes.get('lat'),
+                attributes.get('lon'),
+                attributes.get('visible'))
+            self.tags = []
+            self.refs = []
+            self.members = []
+            self.center = None
+
+        elif name == 'center' and self.element:
+            self.center = (attributes.get('lat'), attributes.get('lon'))
+
+        elif name == 'tag' and self.element:
+            self.tags.append((attributes.get('k'), attributes.get('v')))
+
+        elif name == 'member' and self.element:
+            osm_type = attributes.get('type')
+            ref = attributes.get('ref')
+            role = attributes.get('role', '')
+            if osm_type == 'node' and attributes.get('lat'):
+                self.nodes.setdefault(
+                    ref, (attributes.get('lat'), attributes.get('lon'), []))
+            elif osm_type == 'way':
+                # The nodes of the member are only given by coordinates
+                self.member = (ref, role, [])
+            self.members.append([osm_type, ref, role])
+
+        elif name == 'nd' and self.element:
+            lat = attributes.get('lat')
+            lon = attributes.get('lon')
+            if self.member:
+                node_id = self._new_fake_id()
+                self.nodes[node_id] = (lat, lon, [])
+                self.member[2].append(node_id)
+            else:
+                ref = attributes.get('ref')
+                self.refs.append(ref)
+                if lat:
+                    self.nodes.setdefault(ref, (lat, lon, []))
+
+    def endElement(self, name):
+        if name == 'action':
+            self.action = None
+
+        elif name == 'old':
+            self.in_old = False
+
+        elif name == 'member' and self.member:
+            ref, role, refs = self.member
+            way_id = self._new_fake_id()
+            self.ways.append((way_id, refs, [], None))
+            self.members[-1] = ['way', way_id, role]
+            self.member = None
+
+        elif self.element and name == self.element[0]:
+            osm_type, osm_id, lat, lon, visible = self.element
+            full_id = self.DIC_OSM_TYPE[osm_type] + osm_id
+
+            if self.action == 'delete' or visible == 'false':
+                self.deleted.add(full_id)
+            else:
+                self.changed.add(full_id)
+                if osm_type == 'node':
+                    self.nodes[osm_id] = (lat, lon, self.tags)
+                elif osm_type == 'way':
+                    self.ways.append(
+                        (osm_id, self.refs, self.tags, self.center))
+                else:
+                    self.relations.append(
+                        (osm_id, self.members, self.tags, self.center))
+
+            self.element = None
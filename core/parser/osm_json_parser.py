@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import json
+import re
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from QuickOSM.core.parser.osm_stream_parser import OsmStreamParser
+
+# Beginning of the array of the elements, after the header
+ELEMENTS_PATTERN = re.compile(r'"elements"\s*:\s*\[')
+SEPARATOR_PATTERN = re.compile(r'[\s,]*')
+
+
+def is_json_file(osm_file):
+    """
+    If an OSM file is an Overpass JSON result, not XML
+
+    @rtype: bool
+    """
+    with open(osm_file, 'rb') as f:
+        return f.read(1024).lstrip().startswith('{')
+
+
+def iter_elements(f, chunk_size=65536):
+    """
+    Decode the elements of an Overpass JSON result one by one
+
+    The file is read by chunks, each element is decoded as soon as it is
+    complete in the buffer. The header and the remarks after the elements
+    are skipped.
+
+    @param f: the JSON file
+    @type f: file
+
+    @param chunk_size: number of bytes read at once
+    @type chunk_size: int
+
+    @return: the elements as dict
+    @rtype: generator
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        buffer += chunk
+        match = ELEMENTS_PATTERN.search(buffer)
+        if match:
+            break
+
+    position = match.end()
+    while True:
+        position = SEPARATOR_PATTERN.match(buffer, position).end()
+        if position < len(buffer) and buffer[position] == ']':
+            return
+
+        try:
+            if position == len(buffer):
+                raise ValueError('End of the buffer')
+            element, position = decoder.raw_decode(buffer, position)
+        except ValueError:
+            # The element is not complete, the buffer grows
+            chunk = f.read(max(chunk_size, len(buffer) - position))
+            if not chunk:
+                if position == len(buffer):
+                    return
+                raise
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+
+        yield element
+
+
+def json_coordinates(geometry):
+    """
+    Coordinates of a way with "out geom"
+
+    The nodes outside of the bbox of the query are null, they are
+    skipped.
+
+    @param geometry: lat, lon of each node
+    @type geometry: list of dict
+
+    @rtype: numpy.ndarray
+    """
+    return numpy.array(
+        [(point['lon'], point['lat']) for point in geometry if point],
+        dtype=numpy.float64).reshape(-1, 2)
+
+
+class OsmJsonParser(OsmStreamParser):
+    """
+    Parse an Overpass JSON result in Python
+
+    It builds the same layers as OsmStreamParser. The file is read with
+    iter_elements, never loaded at once. With "out geom", the ways and
+    the members of the relations carry their coordinates, the nodes are
+    not needed. With "out center", the center of a way or a relation is
+    a point, without its line or its polygon.
+    """
+
+    def read_file(self, size):
+        """
+        Read the elements of the JSON file
+
+        @param size: size of the file, for the progress
+        @type size: int
+        """
+        with open(self.osm_file, 'rb') as f:
+            for i, element in enumerate(iter_elements(f)):
+                self.read_element(element)
+                if not (i + 1) % self.PROGRESS_STEP:
+                    self.signalPercentage.emit(
+                        min(int(100 * f.tell() / size), 100))
+
+    def read_element(self, element):
+        osm_type = element.get('type')
+        tags = element.get('tags', {})
+        if osm_type == 'node':
+            # No coordinates with "out ids" or "out tags"
+            if 'lon' in element and 'lat' in element:
+                self.add_node(
+                    element['id'], element['lon'], element['lat'], tags)
+            return
+        if osm_type not in ('way', 'relation'):
+            return
+
+        center = element.get('center')
+        if center:
+            self.add_center(
+                '%s%s' % (osm_type[0], element['id']),
+                center['lon'],
+                center['lat'],
+                tags)
+            return
+
+        if osm_type == 'way':
+            geometry = element.get('geometry')
+            if geometry is not None:
+                geometry = json_coordinates(geometry)
+            self.add_way(
+                element['id'], tags, element.get('nodes') or [], geometry)
+        else:
+            members = element.get('members', [])
+            ways = None
+            if any('geometry' in member for member in members):
+                ways = [
+                    json_coordinates(member['geometry'])
+                    for member in members
+                    if member['type'] == 'way' and 'geometry' in member]
+            self.add_relation(
+                element['id'],
+                tags,
+                [(member['type'], member['ref'], member['role'])
+                 for member in members],
+                ways)
@@ -28,10 +28,15 @@ from os.path import dirname, realpath, join, isfile, basename
 from osgeo import gdal
 from PyQt4.QtCore import QObject, pyqtSignal, QVariant
 from qgis.core import \
-    QgsVectorLayer, QgsFields, QgsField, QgsVectorFileWriter, QgsFeature
+    QGis, QgsVectorLayer, QgsFields, QgsField, QgsVectorFileWriter, \
+    QgsFeature
 
 from QuickOSM.core.exceptions import \
     GeoAlgorithmExecutionException, WrongOrderOSMException
+from QuickOSM.core.custom_logging import timed, count
+from QuickOSM.core.parser.osm_json_parser import OsmJsonParser, is_json_file
+from QuickOSM.core.parser.osm_stream_parser import OsmStreamParser
+from QuickOSM.core.parser.tag_columns import TagColumns
 from QuickOSM.core.utilities.tools import tr
 from QuickOSM.core.utilities.operating_system import get_default_encoding
 
@@ -49,6 +54,9 @@ class OsmParser(QObject):
     # Layers available in the OGR, other_relations is useless.
     OSM_LAYERS = ['points', 'lines', 'multilinestrings', 'multipolygons']
 
+    # Parsers available, OGR or OsmStreamParser
+    ENGINES = ['ogr', 'python']
+
     # Dict to build the full ID of an object
     DIC_OSM_TYPE = {'node': 'n', 'way': 'w', 'relation': 'r'}
 
@@ -67,7 +75,20 @@ class OsmParser(QObject):
             white_list_column=WHITE_LIST,
             delete_empty_layers=False,
             load_only=False,
-            osm_conf=None):
+            osm_conf=None,
+            column_limits=None,
+            engine='ogr'):
+        """
+        Constructor
+
+        column_limits caps the number of columns of some layers, like
+        {'points': {'max_columns': 50, 'min_fill_rate': 0.01}}, the other
+        keys are kept in the other_tags column. See TagColumns.limit.
+
+        engine is 'ogr' for the OSM driver of OGR or 'python' for the
+        OsmStreamParser, without temporary files. The Python engine also
+        reads the JSON results of Overpass, with OsmJsonParser.
+        """
         self.__osmFile = osm_file
         self.__layers = layers
 
@@ -81,6 +102,12 @@ class OsmParser(QObject):
         self.__whiteListColumn = white_list_column
         self.__deleteEmptyLayers = delete_empty_layers
         self.__loadOnly = load_only
+        self.__columnLimits = column_limits or {}
+
+        if engine not in self.ENGINES:
+            raise GeoAlgorithmExecutionException(
+                "Unknown parser engine : " + engine)
+        self.__engine = engine
 
         # If an osm_conf is provided ?
         if not osm_conf:
@@ -119,6 +146,9 @@ class OsmParser(QObject):
 
             return layers
 
+        if self.__engine == 'python':
+            return self.parse_stream()
+
         # Check if the order is node before way,relation
         # We don't check way before relation,
         # because we can have only nodes and relations
@@ -129,6 +159,9 @@ class OsmParser(QObject):
                 if re.search(r'(way|relation)', line):
                     raise WrongOrderOSMException
 
+        # The decoding of the tags is summed in the metrics of the run
+        loads = timed('hstore_decode', pghstore.loads)
+
         # Foreach layers
         for layer in self.__layers:
             self.signalText.emit(tr("QuickOSM", u"Parsing layer : " + layer))
@@ -146,7 +179,9 @@ class OsmParser(QObject):
             layers[layer]['vectorLayer'].setProviderEncoding('UTF-8')
 
             # Set some default tags
-            layers[layer]['tags'] = ['full_id', 'osm_id', 'osm_type']
+            layers[layer]['tags'] = TagColumns(
+                ['full_id', 'osm_id', 'osm_type'],
+                self.__whiteListColumn[layer])
 
             # Save the geometry type of the layer
             layers[layer]['geomType'] = layers[layer]['vectorLayer'].wkbType()
@@ -159,32 +194,30 @@ class OsmParser(QObject):
             field_names = [field.name() for field in fields]
             other_tags_index = field_names.index('other_tags')
 
+            # Improve the parsing if comma in whitelist,
+            # we skip the parsing of tags, but featureCount is needed
+            skip_tags = self.__whiteListColumn[layer] == ','
+            tags = layers[layer]['tags']
+
             features = layers[layer]['vectorLayer'].getFeatures()
             for i, feature in enumerate(features):
                 layers[layer]['featureCount'] += 1
 
-                # Improve the parsing if comma in whitelist,
-                # we skip the parsing of tags, but featureCount is needed
-                if self.__whiteListColumn[layer] == ',':
-                    continue
-
                 # Get the "others_tags" field
                 attributes = feature.attributes()[other_tags_index]
 
-                if attributes:
-                    h_store = pghstore.loads(attributes)
-                    for key in h_store:
-                        if key not in layers[layer]['tags']:
-                            # If the key in OSM is not already in the table
-                            if self.__whiteListColumn[layer]:
-                                if key in self.__whiteListColumn[layer]:
-                                    layers[layer]['tags'].append(key)
-                            else:
-                                layers[layer]['tags'].append(key)
+                # The tags are decoded once, and kept for the GeoJSON file
+                if attributes and not skip_tags:
+                    tags.add_row(loads(attributes))
+                else:
+                    tags.add_row(None, bool(attributes))
 
                 percent = int(100 / len(self.__layers) * (i + 1))
                 self.signalPercentage.emit(percent)
 
+        for layer in self.__layers:
+            count('features/' + layer, layers[layer]['featureCount'])
+
         # Delete empty layers if this option is set to True
         if self.__deleteEmptyLayers:
             delete_layers = []
@@ -207,6 +240,10 @@ class OsmParser(QObject):
             tf.flush()
             tf.close()
 
+            # Keys less used are not columns if the layer is limited
+            if self.__columnLimits.get(layer):
+                layers[layer]['tags'].limit(**self.__columnLimits[layer])
+
             # Adding the attribute table
             fields = QgsFields()
             for key in layers[layer]['tags']:
@@ -222,12 +259,12 @@ class OsmParser(QObject):
                 'GeoJSON')
 
             # Foreach feature in the layer
+            tags = layers[layer]['tags']
             features = layers[layer]['vectorLayer'].getFeatures()
             for i, feature in enumerate(features):
                 fet = QgsFeature()
                 fet.setGeometry(feature.geometry())
 
-                new_attributes = []
                 attributes = feature.attributes()
 
                 if layer in ['points', 'lines', 'multilinestrings']:
@@ -238,41 +275,24 @@ class OsmParser(QObject):
                     elif layer == 'multilinestrings':
                         osm_type = 'relation'
 
-                    new_attributes.append(
-                        self.DIC_OSM_TYPE[osm_type] + str(attributes[0]))
-                    new_attributes.append(attributes[0])
-                    new_attributes.append(osm_type)
-
-                    if attributes[1]:
-                        h_store = pghstore.loads(attributes[1])
-                        for tag in layers[layer]['tags'][3:]:
-                            if unicode(tag) in h_store:
-                                new_attributes.append(h_store[tag])
-                            else:
-                                new_attributes.append("")
-                        fet.setAttributes(new_attributes)
+                    if tags.is_tagged(i):
+                        fet.setAttributes(tags.row(i, [
+                            self.DIC_OSM_TYPE[osm_type] + str(attributes[0]),
+                            attributes[0],
+                            osm_type]))
                         file_writer.addFeature(fet)
 
                 elif layer == 'multipolygons':
                     if attributes[0]:
                         osm_type = "relation"
-                        new_attributes.append(
-                            self.DIC_OSM_TYPE[osm_type] + str(attributes[0]))
-                        new_attributes.append(str(attributes[0]))
+                        osm_id = str(attributes[0])
                     else:
                         osm_type = "way"
-                        new_attributes.append(
-                            self.DIC_OSM_TYPE[osm_type] + str(attributes[1]))
-                        new_attributes.append(attributes[1])
-                    new_attributes.append(osm_type)
-
-                    h_store = pghstore.loads(attributes[2])
-                    for tag in layers[layer]['tags'][3:]:
-                        if unicode(tag) in h_store:
-                            new_attributes.append(h_store[tag])
-                        else:
-                            new_attributes.append("")
-                    fet.setAttributes(new_attributes)
+                        osm_id = attributes[1]
+                    fet.setAttributes(tags.row(i, [
+                        self.DIC_OSM_TYPE[osm_type] + str(osm_id),
+                        osm_id,
+                        osm_type]))
                     file_writer.addFeature(fet)
 
                     percentage = int(
@@ -280,5 +300,34 @@ class OsmParser(QObject):
                     self.signalPercentage.emit(percentage)
 
             del file_writer
+            tags.clear_rows()
 
         return layers
+
+    def parse_stream(self):
+        """
+        Parse the osm file in Python instead of OGR, XML or JSON
+        """
+        if is_json_file(self.__osmFile):
+            parser_class = OsmJsonParser
+        else:
+            parser_class = OsmStreamParser
+        stream_parser = parser_class(
+            self.__osmFile,
+            self.__layers,
+            self.__whiteListColumn,
+            self._osm_conf,
+            self.__deleteEmptyLayers,
+            self.__columnLimits)
+        stream_parser.signalText.connect(self.signalText.emit)
+        stream_parser.signalPercentage.connect(self.signalPercentage.emit)
+        layers = stream_parser.parse()
+
+        geometry_types = {
+            'points': QGis.WKBPoint,
+            'lines': QGis.WKBLineString,
+            'multilinestrings': QGis.WKBMultiLineString,
+            'multipolygons': QGis.WKBMultiPolygon}
+        for layer, values in layers.iteritems():
+            values['geomType'] = geometry_types[layer]
+        return layers
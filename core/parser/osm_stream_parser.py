@@ -0,0 +1,587 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import json
+import tempfile
+from array import array
+from ConfigParser import RawConfigParser
+from json.encoder import encode_basestring_ascii as encode_string
+from os import remove
+from os.path import isfile, getsize
+from StringIO import StringIO
+from xml.etree.cElementTree import iterparse
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from PyQt4.QtCore import QObject, pyqtSignal
+
+from QuickOSM.core.exceptions import \
+    GeoAlgorithmExecutionException, WrongOrderOSMException
+from QuickOSM.core.custom_logging import count
+from QuickOSM.core.parser.multipolygon import build_multipolygon, is_closed
+from QuickOSM.core.parser.node_index import NodeIndex, sort_ids, search_ids
+from QuickOSM.core.parser.tag_columns import TagColumns
+from QuickOSM.core.utilities.tools import tr
+
+
+def read_osm_conf(osm_conf):
+    """
+    Read the options of an osmconf.ini file used by this parser
+
+    The keys ending with ':' in the ignore lists are prefixes.
+
+    @param osm_conf: path of the osmconf.ini file
+    @type osm_conf: str
+
+    @return: closed_ways_are_polygons and the ignore/unsignificant keys
+        of each layer
+    @rtype: dict
+    """
+    # The first options are not in a section
+    with open(osm_conf) as f:
+        content = '[general]\n' + f.read()
+    config = RawConfigParser()
+    config.readfp(StringIO(content))
+
+    def keys(section, option):
+        if not config.has_option(section, option):
+            return frozenset()
+        return frozenset(
+            key.strip() for key in config.get(section, option).split(',')
+            if key.strip())
+
+    conf = {
+        'closed_ways_are_polygons': keys(
+            'general', 'closed_ways_are_polygons'),
+        'unsignificant': keys('points', 'unsignificant')}
+    for layer in ['points', 'lines', 'multilinestrings', 'multipolygons']:
+        ignore = keys(layer, 'ignore')
+        conf[layer] = (
+            frozenset(key for key in ignore if not key.endswith(':')),
+            tuple(key for key in ignore if key.endswith(':')))
+    return conf
+
+
+def format_coordinates(coordinates):
+    """
+    GeoJSON coordinates of a line or a ring
+
+    @param coordinates: lon, lat of each point
+    @type coordinates: numpy.ndarray
+
+    @rtype: str
+    """
+    return '[%s]' % ','.join(
+        ['[%r,%r]' % (x, y) for x, y in coordinates.tolist()])
+
+
+class OsmStreamParser(QObject):
+    """
+    Parse an OSM file in Python, without OGR
+
+    The XML is read as a stream with iterparse. The coordinates of the
+    nodes are kept in a NodeIndex, the ways are built with one vectorized
+    lookup each. The coordinates of the ways stay in RAM for the
+    relations, only if the multipolygons or multilinestrings are asked.
+    Each feature is written in the GeoJSON file of its layer as soon as it
+    is read, with only its own tags, without the temporary database of
+    OGR. Only the counts of the columns stay in memory.
+
+    The layers are the same as the OSM driver of OGR, with the same
+    osmconf.ini. The multipolygon relations are built by
+    build_multipolygon. With geometry="full", the coordinates of the ways
+    are read in the ways, the nodes are not needed. With
+    geometry="center", the ways and the relations are only points.
+    """
+
+    # Signal percentage
+    signalPercentage = pyqtSignal(int, name='signalPercentage')
+    # Signal text
+    signalText = pyqtSignal(str, name='signalText')
+
+    OSM_TYPES = {'n': 'node', 'w': 'way', 'r': 'relation'}
+
+    # One feature by line, the properties at the end for limit_layer
+    FEATURE = (
+        '{"type": "Feature", "geometry": {"type": "%s", "coordinates": %s}, '
+        '"properties": {%s}}')
+    PROPERTIES = '"properties": '
+
+    GEOMETRY_TYPES = {
+        'points': 'Point',
+        'lines': 'LineString',
+        'multilinestrings': 'MultiLineString',
+        'multipolygons': 'MultiPolygon'}
+
+    # Number of elements between two signals of progress
+    PROGRESS_STEP = 10000
+
+    # Size of the OSM files with the nodes in memory-mapped files
+    MEMORY_MAP_SIZE = 1024 ** 3
+
+    def __init__(
+            self,
+            osm_file,
+            layers,
+            white_list_column,
+            osm_conf,
+            delete_empty_layers=False,
+            column_limits=None):
+        """
+        Constructor, the parameters are the ones of OsmParser
+        """
+        self.osm_file = osm_file
+        self.layers = layers
+        self.white_list_column = white_list_column
+        self.conf = read_osm_conf(osm_conf)
+        self.delete_empty_layers = delete_empty_layers
+        self.column_limits = column_limits or {}
+
+        # Columns and GeoJSON files of the layers
+        self.features = {}
+
+        # Coordinates of the nodes, created by parse
+        self.nodes = None
+
+        # Geometries of the ways, used by the relations. The ids are in
+        # doubles, like in NodeIndex.
+        self.keep_ways = \
+            'multipolygons' in layers or 'multilinestrings' in layers
+        self.way_ids = array('d')
+        self.way_ends = array('l')
+        self.way_coordinates = array('d')
+        self.way_index = None
+
+        QObject.__init__(self)
+
+    def parse(self):
+        """
+        Start parsing the osm file
+
+        @return: the layers with the GeoJSON file, the tags and the number
+            of features
+        @rtype: dict
+        """
+        if numpy is None:
+            raise GeoAlgorithmExecutionException(
+                tr('QuickOSM', u'NumPy is needed by the Python parser'))
+
+        if not isfile(self.osm_file):
+            raise GeoAlgorithmExecutionException("File doesn't exist")
+
+        for layer in self.layers:
+            skip_tags = self.white_list_column[layer] == ','
+            geojson = tempfile.NamedTemporaryFile(
+                delete=False, suffix="_" + layer + ".geojson")
+            geojson.write('{"type": "FeatureCollection", "features": [\n')
+            self.features[layer] = {
+                'tags': TagColumns(
+                    ['full_id', 'osm_id', 'osm_type'],
+                    self.white_list_column[layer]),
+                'skip_tags': skip_tags,
+                'count': 0,
+                'geojson': geojson}
+
+        self.signalText.emit(tr("QuickOSM", u"Parsing the OSM file"))
+        size = max(getsize(self.osm_file), 1)
+        self.nodes = NodeIndex(memory_map=size > self.MEMORY_MAP_SIZE)
+        try:
+            self.read_file(size)
+            self.nodes.close()
+            for features in self.features.itervalues():
+                features['geojson'].write('\n]}\n')
+                features['geojson'].close()
+
+            layers = {}
+            for layer in self.layers:
+                layers[layer] = {
+                    'tags': self.features[layer]['tags'],
+                    'featureCount': self.features[layer]['count'],
+                    'geojsonFile': self.features[layer]['geojson'].name}
+                count('features/' + layer, layers[layer]['featureCount'])
+
+            # Delete empty layers if this option is set to True
+            if self.delete_empty_layers:
+                for layer in layers.keys():
+                    if layers[layer]['featureCount'] < 1:
+                        remove(layers[layer]['geojsonFile'])
+                        del layers[layer]
+
+            for layer in layers:
+                if self.column_limits.get(layer):
+                    layers[layer]['geojsonFile'] = self.limit_layer(layer)
+        except:
+            for features in self.features.itervalues():
+                features['geojson'].close()
+                if isfile(features['geojson'].name):
+                    remove(features['geojson'].name)
+            raise
+        finally:
+            self.nodes.close()
+
+        return layers
+
+    def read_file(self, size):
+        """
+        Read the elements of the osm file
+
+        @param size: size of the file, for the progress
+        @type size: int
+        """
+        with open(self.osm_file, 'rb') as f:
+            context = iterparse(f, events=('start', 'end'))
+            _, root = next(context)
+            elements = 0
+            for event, element in context:
+                if event != 'end':
+                    continue
+
+                if element.tag == 'node':
+                    self.read_node(element)
+                elif element.tag == 'way':
+                    self.read_way(element)
+                elif element.tag == 'relation':
+                    self.read_relation(element)
+                else:
+                    continue
+
+                # The elements already read are freed
+                root.clear()
+                elements += 1
+                if not elements % self.PROGRESS_STEP:
+                    self.signalPercentage.emit(
+                        min(int(100 * f.tell() / size), 100))
+
+    def limit_layer(self, layer):
+        """
+        Keep the most used keys as columns in a layer, see TagColumns.limit
+
+        The columns are known only at the end, so the GeoJSON file is
+        written again if some keys are not columns anymore.
+
+        @return: path of the GeoJSON file
+        @rtype: str
+        """
+        features = self.features[layer]
+        tags = features['tags']
+        path = features['geojson'].name
+        if not tags.limit(**self.column_limits[layer]):
+            return path
+
+        msg = tr("QuickOSM", u"Creating GeoJSON file : " + layer)
+        self.signalText.emit(msg)
+        self.signalPercentage.emit(0)
+
+        tf = tempfile.NamedTemporaryFile(
+            delete=False, suffix="_" + layer + ".geojson")
+        total = max(features['count'], 1)
+        with open(path) as source:
+            for i, line in enumerate(source):
+                start = line.find(self.PROPERTIES)
+                if start < 0:
+                    tf.write(line)
+                    continue
+                start += len(self.PROPERTIES)
+                end = line.rindex('}')
+                properties = json.loads(line[start:end])
+                tags.limit_properties(properties)
+                tf.write(line[:start])
+                tf.write(json.dumps(properties))
+                tf.write(line[end:])
+
+                if not i % self.PROGRESS_STEP:
+                    self.signalPercentage.emit(int(100 * i / total))
+        tf.close()
+        remove(path)
+        return tf.name
+
+    @staticmethod
+    def read_tags(element):
+        return dict(
+            (child.get('k'), child.get('v'))
+            for child in element if child.tag == 'tag')
+
+    def filter_tags(self, layer, tags):
+        """
+        Remove the tags ignored in the layer by osmconf.ini
+        """
+        ignore, prefixes = self.conf[layer]
+        return dict(
+            (key, value) for key, value in tags.iteritems()
+            if key not in ignore and not key.startswith(prefixes))
+
+    def add_feature(self, layer, full_id, tags, geometry):
+        """
+        Add a feature to a layer, if it has some tags
+
+        @param geometry: GeoJSON coordinates
+        @type geometry: str
+        """
+        tags = self.filter_tags(layer, tags)
+        if not tags:
+            return
+        features = self.features[layer]
+        columns = features['tags']
+        cells = columns.count_row(None if features['skip_tags'] else tags)
+
+        properties = [
+            '"full_id": "%s"' % full_id,
+            '"osm_id": "%s"' % full_id[1:],
+            '"osm_type": "%s"' % self.OSM_TYPES[full_id[0]]]
+        properties.extend([
+            encode_string(columns[column]) + ': ' + encode_string(value)
+            for column, value in cells])
+
+        geojson = features['geojson']
+        if features['count']:
+            geojson.write(',\n')
+        geojson.write(self.FEATURE % (
+            self.GEOMETRY_TYPES[layer], geometry, ', '.join(properties)))
+        features['count'] += 1
+
+    def read_node(self, element):
+        # No coordinates with "out ids" or "out tags"
+        if element.get('lon') is None or element.get('lat') is None:
+            return
+        tags = self.read_tags(element) if len(element) else None
+        self.add_node(
+            element.get('id'),
+            float(element.get('lon')),
+            float(element.get('lat')),
+            tags)
+
+    @staticmethod
+    def read_coordinates(nodes):
+        """
+        Coordinates of the nodes of a way with geometry="full"
+
+        @param nodes: nd elements, without lat and lon outside of the
+            bbox of the query
+        @type nodes: list
+
+        @return: lon, lat of each node or None without coordinates
+        @rtype: numpy.ndarray
+        """
+        coordinates = [
+            (float(node.get('lon')), float(node.get('lat')))
+            for node in nodes if node.get('lon') is not None]
+        if not coordinates:
+            return None
+        return numpy.array(coordinates, dtype=numpy.float64)
+
+    def read_way(self, element):
+        if self.read_center('w', element):
+            return
+        nodes = element.findall('nd')
+        refs = [int(node.get('ref')) for node in nodes]
+        self.add_way(
+            element.get('id'),
+            self.read_tags(element),
+            refs,
+            self.read_coordinates(nodes))
+
+    def read_relation(self, element):
+        if self.read_center('r', element):
+            return
+        members = element.findall('member')
+        ways = [
+            self.read_coordinates(member.findall('nd'))
+            for member in members if member.get('type') == 'way']
+        if not any(way is not None for way in ways):
+            ways = None
+        else:
+            ways = [way for way in ways if way is not None]
+        self.add_relation(
+            element.get('id'),
+            self.read_tags(element),
+            [(member.get('type'), int(member.get('ref')), member.get('role'))
+             for member in members],
+            ways)
+
+    def read_center(self, osm_type, element):
+        """
+        Center of a way or a relation, from the queries with "out center"
+
+        @return: if the element has a center, its geometry is not built
+        @rtype: bool
+        """
+        center = element.find('center')
+        if center is None:
+            return False
+        self.add_center(
+            osm_type + element.get('id'),
+            float(center.get('lon')),
+            float(center.get('lat')),
+            self.read_tags(element))
+        return True
+
+    def add_node(self, node_id, lon, lat, tags=None):
+        """
+        Add a node, and its point if it has some significant tags
+
+        @param node_id: id of the node
+        @type node_id: str or int
+        """
+        if self.nodes.is_sorted():
+            raise WrongOrderOSMException
+
+        self.nodes.add(int(node_id), lon, lat)
+
+        if tags and 'points' in self.features:
+            unsignificant = self.conf['unsignificant']
+            if any(key not in unsignificant for key in tags):
+                self.add_feature(
+                    'points', 'n%s' % node_id, tags, '[%r,%r]' % (lon, lat))
+
+    def add_center(self, full_id, lon, lat, tags):
+        """
+        Add the center of a way or a relation in the points, instead of
+        its line or its polygon
+
+        @param full_id: like w12 or r12
+        @type full_id: str
+        """
+        if 'points' in self.features:
+            self.add_feature('points', full_id, tags, '[%r,%r]' % (lon, lat))
+
+    def is_area(self, tags):
+        """
+        If a closed way is a polygon, like the OSM driver of OGR
+        """
+        area = tags.get('area')
+        if area == 'yes':
+            return True
+        if area == 'no':
+            return False
+        polygon_keys = self.conf['closed_ways_are_polygons']
+        return any(key in polygon_keys for key in tags)
+
+    def add_way(self, way_id, tags, refs, coordinates=None):
+        """
+        Add a way, in the lines or the polygons
+
+        @param way_id: id of the way
+        @type way_id: str or int
+
+        @param refs: ids of the nodes
+        @type refs: list
+
+        @param coordinates: lon, lat of the nodes if they are in the file,
+            like with "out geom", else they are found in the nodes
+        @type coordinates: numpy.ndarray
+        """
+        if self.way_index is not None:
+            raise WrongOrderOSMException
+
+        if coordinates is None:
+            if not self.nodes.is_sorted():
+                self.nodes.sort()
+            coordinates = self.nodes.coordinates(refs)
+
+        if self.keep_ways:
+            self.way_ids.append(int(way_id))
+            self.way_coordinates.fromstring(coordinates.tostring())
+            self.way_ends.append(len(self.way_coordinates) // 2)
+
+        if len(coordinates) < 2 or not tags:
+            return
+
+        # The nodes missing in the file are skipped
+        if is_closed(coordinates) and self.is_area(tags):
+            if 'multipolygons' in self.features:
+                self.add_feature(
+                    'multipolygons',
+                    'w%s' % way_id,
+                    tags,
+                    '[[%s]]' % format_coordinates(coordinates))
+        elif 'lines' in self.features:
+            self.add_feature(
+                'lines', 'w%s' % way_id, tags,
+                format_coordinates(coordinates))
+
+    def way_geometry(self, position):
+        """
+        Coordinates of a way from its position in the file
+
+        @rtype: numpy.ndarray
+        """
+        start = self.way_ends[position - 1] if position else 0
+        end = self.way_ends[position]
+        return numpy.frombuffer(
+            self.way_coordinates, dtype=numpy.float64)[
+            2 * start:2 * end].reshape(-1, 2)
+
+    def add_relation(self, relation_id, tags, members, ways=None):
+        """
+        Add a multipolygon or a multilinestring relation
+
+        @param relation_id: id of the relation
+        @type relation_id: str or int
+
+        @param members: type, ref and role of each member
+        @type members: list
+
+        @param ways: coordinates of the member ways if they are in the
+            file, like with "out geom", else they are found in the ways
+        @type ways: list of numpy.ndarray
+        """
+        relation_type = tags.get('type')
+        if relation_type in ('multipolygon', 'boundary'):
+            layer = 'multipolygons'
+        elif relation_type in ('multilinestring', 'route'):
+            layer = 'multilinestrings'
+        else:
+            return
+        if layer not in self.features:
+            return
+
+        if ways is None:
+            if self.way_index is None:
+                self.way_index = sort_ids(numpy.frombuffer(
+                    self.way_ids, dtype=numpy.float64).astype(numpy.int64))
+            refs = [ref for member_type, ref, _ in members
+                    if member_type == 'way']
+            positions = search_ids(
+                self.way_index[0], self.way_index[1], refs)
+            ways = [
+                self.way_geometry(position)
+                for position in positions.tolist() if position >= 0]
+        ways = [way for way in ways if len(way) > 1]
+        if not ways:
+            return
+
+        if layer == 'multilinestrings':
+            geometry = '[%s]' % ','.join(
+                format_coordinates(way) for way in ways)
+        else:
+            polygons = build_multipolygon(ways)
+            if not polygons:
+                return
+            geometry = '[%s]' % ','.join(
+                '[%s]' % ','.join(format_coordinates(ring) for ring in rings)
+                for rings in polygons)
+
+        self.add_feature(layer, 'r%s' % relation_id, tags, geometry)
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from array import array
+
+import pghstore
+
+
+class TagColumns(object):
+    """
+    Columns of a layer and the tags of its features.
+
+    The keys are an ordered set, each key is mapped to the index of its
+    column. The tags of the features are stored sparsely in flat arrays,
+    like a CSR matrix: for each feature, only the columns present and their
+    values. Building the attributes of a feature costs the number of its
+    tags, not the number of columns.
+
+    It can be used like the list of the columns: iteration, len, in.
+
+    On wide extracts, limit keeps the most used keys as columns and puts
+    the other tags in one other_tags column, in the hstore format.
+
+    With count_row, the tags are only counted: the caller writes the row
+    itself, for instance in a file, and limit_properties moves its tags
+    which are not columns anymore.
+    """
+
+    def __init__(self, columns=None, white_list=None):
+        """
+        Constructor
+
+        @param columns: first columns, not filled by the tags
+        @type columns: list
+
+        @param white_list: keys allowed as column, all if None
+        @type white_list: list or str
+        """
+        self.index = {}
+        self.columns = []
+        self.white_list = white_list
+
+        # Rows of the features: the cells of the row n are between
+        # row_ends[n - 1] and row_ends[n]
+        self.row_ends = array('l')
+        self.cell_columns = array('l')
+        self.cell_values = []
+        self.tagged = bytearray()
+        self.rows = 0
+
+        # Number of features using each column
+        self.counts = array('l')
+
+        # Set by limit: all the keys, their new column or -1
+        self.keys = None
+        self.remap = None
+        self.other_tags_index = None
+
+        for column in columns or []:
+            self.add(column)
+        self.fixed = len(self.columns)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def __getitem__(self, item):
+        return self.columns[item]
+
+    def add(self, key):
+        """
+        Add a column if it's not already in the set
+
+        @return: index of the column
+        @rtype: int
+        """
+        index = self.index.get(key)
+        if index is None:
+            index = self.index[key] = len(self.columns)
+            self.columns.append(key)
+            self.counts.append(0)
+        return index
+
+    def add_row(self, tags, tagged=True):
+        """
+        Add the tags of the next feature and the new columns
+
+        @param tags: tags of the feature
+        @type tags: dict
+
+        @param tagged: if the feature has some tags, even if they are not
+            parsed
+        @type tagged: bool
+        """
+        for column, value in self.count_row(tags):
+            self.cell_columns.append(column)
+            self.cell_values.append(value)
+
+        self.row_ends.append(len(self.cell_values))
+        self.tagged.append(1 if tagged else 0)
+
+    def count_row(self, tags):
+        """
+        Count the tags of the next feature and add the new columns, without
+        keeping the tags
+
+        @param tags: tags of the feature
+        @type tags: dict
+
+        @return: the column and the value of each tag in the columns
+        @rtype: list
+        """
+        self.rows += 1
+        cells = []
+        if tags:
+            index = self.index
+            fixed = self.fixed
+            white_list = self.white_list
+            for key, value in tags.iteritems():
+                column = index.get(key)
+                if column is None:
+                    if white_list and key not in white_list:
+                        continue
+                    column = self.add(key)
+                elif column < fixed:
+                    continue
+                self.counts[column] += 1
+                cells.append((column, value))
+        return cells
+
+    def limit(
+            self, max_columns=None, min_fill_rate=None,
+            other_tags='other_tags'):
+        """
+        Keep the most used keys as columns, the others go in other_tags
+
+        It must be called after adding all the rows.
+
+        @param max_columns: maximum number of columns made from the keys
+        @type max_columns: int
+
+        @param min_fill_rate: minimum ratio of features using a key to keep
+            it as a column, like 0.01
+        @type min_fill_rate: float
+
+        @param other_tags: name of the column with the other tags
+        @type other_tags: str
+
+        @return: if some keys are not columns anymore
+        @rtype: bool
+        """
+        rows = self.row_count()
+        counts = self.counts
+        kept = [
+            column for column in xrange(self.fixed, len(self.columns))
+            if self.columns[column] != other_tags]
+        if min_fill_rate is not None:
+            kept = [c for c in kept if counts[c] >= min_fill_rate * rows]
+        if max_columns is not None:
+            # The most used keys, in the order of discovery
+            kept.sort(key=lambda c: (-counts[c], c))
+            kept = sorted(kept[:max(max_columns, 0)])
+
+        if len(kept) == len(self.columns) - self.fixed:
+            return False
+
+        self.keys = self.columns
+        self.remap = array('l', [-1] * len(self.keys))
+        columns = range(self.fixed) + kept
+        for new, old in enumerate(columns):
+            self.remap[old] = new
+
+        self.columns = [self.keys[column] for column in columns]
+        self.columns.append(other_tags)
+        self.other_tags_index = len(self.columns) - 1
+        self.index = dict(
+            (key, column) for column, key in enumerate(self.columns))
+        return True
+
+    def clear_rows(self):
+        """
+        Free the tags of the features, the columns are kept
+        """
+        self.row_ends = array('l')
+        self.cell_columns = array('l')
+        self.cell_values = []
+        self.tagged = bytearray()
+        self.rows = 0
+
+    def row_count(self):
+        return self.rows
+
+    def is_tagged(self, row):
+        return bool(self.tagged[row])
+
+    def row(self, row, values=None):
+        """
+        Attributes of a feature, an empty string for a missing tag
+
+        @param row: number of the feature
+        @type row: int
+
+        @param values: values of the first columns
+        @type values: list
+
+        @rtype: list
+        """
+        attributes = list(values or [])
+        attributes.extend([""] * (len(self.columns) - len(attributes)))
+
+        start = self.row_ends[row - 1] if row else 0
+        cell_columns = self.cell_columns
+        cell_values = self.cell_values
+        if self.remap is None:
+            for cell in xrange(start, self.row_ends[row]):
+                attributes[cell_columns[cell]] = cell_values[cell]
+            return attributes
+
+        remap = self.remap
+        other_tags = []
+        for cell in xrange(start, self.row_ends[row]):
+            column = remap[cell_columns[cell]]
+            if column >= 0:
+                attributes[column] = cell_values[cell]
+            else:
+                other_tags.append(
+                    (self.keys[cell_columns[cell]], cell_values[cell]))
+        if other_tags:
+            attributes[self.other_tags_index] = pghstore.dumps(
+                other_tags, return_unicode=True)
+        return attributes
+
+    def limit_properties(self, properties):
+        """
+        Move the tags which are not columns anymore to other_tags, after
+        limit
+
+        @param properties: attributes of a feature by column, changed in
+            place
+        @type properties: dict
+        """
+        if self.remap is None:
+            return
+
+        other_tags = [
+            (key, value) for key, value in properties.iteritems()
+            if key not in self.index]
+        if other_tags:
+            for key, _ in other_tags:
+                del properties[key]
+            other_tags.sort()
+            properties[self.columns[self.other_tags_index]] = \
+                pghstore.dumps(other_tags, return_unicode=True)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import unittest
+
+import numpy
+
+# This import is to enable SIP API V2
+# noinspection PyUnresolvedReferences
+import qgis  # pylint: disable=unused-import
+from test.utilities import get_qgis_app
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+from QuickOSM.core.parser.multipolygon import build_rings, build_multipolygon
+
+
+def square(x, y, size):
+    """Closed square ring, counterclockwise."""
+    return numpy.array([
+        (x, y), (x + size, y), (x + size, y + size), (x, y + size), (x, y)],
+        dtype=numpy.float64)
+
+
+class TestMultipolygon(unittest.TestCase):
+
+    def test_rings(self):
+        """Test joining open ways, in any order and direction."""
+        ring = square(0, 0, 10)
+        ways = [ring[2:4], ring[:3][::-1], ring[3:], numpy.array([
+            (20, 20), (30, 30)], dtype=numpy.float64)]
+        rings = build_rings(ways)
+        self.assertEqual(len(rings), 1)
+        self.assertEqual(len(rings[0]), 5)
+        self.assertTrue((rings[0][0] == rings[0][-1]).all())
+        self.assertEqual(
+            sorted(map(tuple, rings[0][:-1].tolist())),
+            sorted(map(tuple, ring[:-1].tolist())))
+
+    def test_multipolygon(self):
+        """Test the outer and inner rings found by containment."""
+        outer = square(0, 0, 10)
+        hole = square(2, 2, 6)
+        island = square(4, 4, 2)
+        other = square(20, 0, 5)
+        polygons = build_multipolygon(
+            [island, other, outer[:3], outer[2:], hole])
+
+        self.assertEqual(len(polygons), 3)
+        self.assertListEqual([len(rings) for rings in polygons], [2, 1, 1])
+        self.assertTrue((polygons[0][1] == hole).all())
+        self.assertTrue((polygons[1][0] == other).all())
+        self.assertTrue((polygons[2][0] == island).all())
+
+        self.assertListEqual(build_multipolygon([outer[:3]]), [])
+
+    def test_touching_hole(self):
+        """Test a hole touching its outer ring at a shared node."""
+        outer = numpy.array([
+            (0, 0), (10, 0), (10, 5), (10, 10), (0, 10), (0, 0)],
+            dtype=numpy.float64)
+        hole = numpy.array(
+            [(10, 5), (5, 3), (5, 7), (10, 5)], dtype=numpy.float64)
+        polygons = build_multipolygon([outer, hole])
+        self.assertListEqual([len(rings) for rings in polygons], [2])
+
+if __name__ == '__main__':
+    suite = unittest.makeSuite(TestMultipolygon)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import random
+import unittest
+from os.path import isfile
+
+# This import is to enable SIP API V2
+# noinspection PyUnresolvedReferences
+import qgis  # pylint: disable=unused-import
+from test.utilities import get_qgis_app
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+from QuickOSM.core.parser.node_index import NodeIndex
+
+
+class TestNodeIndex(unittest.TestCase):
+
+    def check_index(self, index):
+        """Add unsorted nodes and look them up."""
+        for node_id in [5, 3, 9, 4294967296, 1]:
+            index.add(node_id, node_id / 10., -node_id / 10.)
+        index.sort()
+
+        self.assertEqual(len(index), 5)
+        self.assertListEqual(list(index.ids), [1, 3, 5, 9, 4294967296])
+        self.assertListEqual(
+            list(index.lookup([9, 2, 1, 10 ** 12])), [3, -1, 0, -1])
+        self.assertListEqual(
+            index.coordinates([3, 7, 4294967296]).tolist(),
+            [[0.3, -0.3], [429496729.6, -429496729.6]])
+
+    def test_memory(self):
+        """Test the index in memory."""
+        index = NodeIndex()
+        self.check_index(index)
+        index.close()
+
+    def test_memory_map(self):
+        """Test the index in temporary files."""
+        index = NodeIndex(memory_map=True, chunk_size=2)
+        files = list(index.files)
+        self.check_index(index)
+        index.close()
+        self.assertFalse([path for path in files if isfile(path)])
+
+    def test_merge(self):
+        """Test merging the sorted chunks of the files."""
+        node_ids = range(1, 200)
+        random.Random(0).shuffle(node_ids)
+        for ids in [node_ids, sorted(node_ids)]:
+            index = NodeIndex(memory_map=True, chunk_size=7)
+            for node_id in ids:
+                index.add(node_id, node_id / 10., -node_id / 10.)
+            index.sort()
+            self.assertListEqual(list(index.ids), range(1, 200))
+            self.assertListEqual(
+                list(index.lats), [-i / 10. for i in range(1, 200)])
+            index.close()
+
+if __name__ == '__main__':
+    suite = unittest.makeSuite(TestNodeIndex)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import unittest
+
+# This import is to enable SIP API V2
+# noinspection PyUnresolvedReferences
+import qgis  # pylint: disable=unused-import
+from test.utilities import get_qgis_app, test_data_path
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+from QuickOSM.core.parser.osm_diff_parser import OsmDiffParser
+
+
+class TestOsmDiffParser(unittest.TestCase):
+
+    def test_parse(self):
+        """Test reading an augmented diff."""
+        parser = OsmDiffParser(test_data_path('augmented_diff.osm'))
+        osm_file = parser.parse()
+
+        self.assertEqual(parser.osm_base, '2016-05-01T10:00:00Z')
+        self.assertSetEqual(parser.deleted, {'n11'})
+        self.assertSetEqual(parser.changed, {'n10', 'w20', 'r30'})
+
+        content = open(osm_file).read()
+        # Nodes must be before ways and relations for OGR.
+        self.assertLess(
+            content.rfind('<node '), content.find('<way '))
+        self.assertLess(
+            content.rfind('<way '), content.find('<relation '))
+        self.assertIn('<tag k="amenity" v="cafe &amp; bar"/>', content)
+        self.assertIn('<nd ref="1"/><nd ref="3"/>', content)
+        self.assertIn('<member type="way" ref="-5" role="outer"/>', content)
+
+    def test_center(self):
+        """Test keeping the centers of the ways, with "out center"."""
+        parser = OsmDiffParser(test_data_path('augmented_diff_center.osm'))
+        content = open(parser.parse()).read()
+        self.assertSetEqual(parser.changed, {'w20'})
+        self.assertIn(
+            '<way id="20"><center lat="43.605" lon="3.805"/><nd ref="1"/>',
+            content)
+
+if __name__ == '__main__':
+    suite = unittest.makeSuite(TestOsmDiffParser)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import json
+import tempfile
+import unittest
+from os import remove
+from os.path import join, dirname
+from StringIO import StringIO
+
+# This import is to enable SIP API V2
+# noinspection PyUnresolvedReferences
+import qgis  # pylint: disable=unused-import
+from test.utilities import get_qgis_app, test_data_path
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+from QuickOSM.core.parser.osm_json_parser import (
+    OsmJsonParser, is_json_file, iter_elements)
+
+LAYERS = ['points', 'lines', 'multilinestrings', 'multipolygons']
+OSM_CONF = join(dirname(dirname(__file__)), 'QuickOSMconf.ini')
+
+
+class TestOsmJsonParser(unittest.TestCase):
+
+    def test_iter_elements(self):
+        """Test decoding the elements with a small buffer."""
+        file_path = test_data_path('stream_parser.json')
+        self.assertTrue(is_json_file(file_path))
+        self.assertFalse(is_json_file(test_data_path('stream_parser.osm')))
+
+        with open(file_path) as f:
+            elements = list(iter_elements(f, chunk_size=16))
+        with open(file_path) as f:
+            self.assertListEqual(elements, json.load(f)['elements'])
+
+        elements = list(iter_elements(StringIO('{"elements": []}')))
+        self.assertListEqual(elements, [])
+
+    def test_layers(self):
+        """Test the features built from out geom and out center."""
+        parser = OsmJsonParser(
+            test_data_path('stream_parser.json'),
+            LAYERS,
+            dict.fromkeys(LAYERS),
+            OSM_CONF)
+        layers = parser.parse()
+
+        features = {}
+        for layer, values in layers.iteritems():
+            with open(values['geojsonFile']) as f:
+                features[layer] = json.load(f)['features']
+            remove(values['geojsonFile'])
+
+        points = features['points']
+        self.assertListEqual(
+            [f['properties']['full_id'] for f in points], ['n1', 'w2'])
+        self.assertEqual(points[0]['properties']['name'], u'École')
+        self.assertEqual(points[1]['properties']['osm_type'], 'way')
+        self.assertListEqual(
+            points[1]['geometry']['coordinates'], [3.805, 43.605])
+
+        # The node outside of the bbox is skipped
+        lines = features['lines']
+        self.assertEqual(len(lines), 1)
+        self.assertListEqual(
+            lines[0]['geometry']['coordinates'],
+            [[3.8, 43.6], [3.81, 43.6]])
+
+        polygons = features['multipolygons']
+        self.assertEqual(len(polygons), 1)
+        self.assertEqual(polygons[0]['properties']['full_id'], 'r1')
+        self.assertEqual(
+            len(polygons[0]['geometry']['coordinates'][0][0]), 5)
+        self.assertEqual(layers['multilinestrings']['featureCount'], 0)
+
+    def test_without_nodes(self):
+        """Test the elements without coordinates, like with "out tags"."""
+        _, file_path = tempfile.mkstemp(suffix='.json')
+        with open(file_path, 'w') as f:
+            json.dump({'elements': [
+                {'type': 'node', 'id': 1, 'tags': {'amenity': 'school'}},
+                {'type': 'node', 'id': 2},
+                {'type': 'way', 'id': 1, 'tags': {'highway': 'primary'}}]},
+                f)
+        try:
+            layers = OsmJsonParser(
+                file_path, LAYERS, dict.fromkeys(LAYERS), OSM_CONF).parse()
+        finally:
+            remove(file_path)
+
+        for values in layers.itervalues():
+            remove(values['geojsonFile'])
+            self.assertEqual(values['featureCount'], 0)
+
+if __name__ == '__main__':
+    suite = unittest.makeSuite(TestOsmJsonParser)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import json
+import unittest
+from os import remove
+from os.path import join, dirname
+
+# This import is to enable SIP API V2
+# noinspection PyUnresolvedReferences
+import qgis  # pylint: disable=unused-import
+from test.utilities import get_qgis_app, test_data_path
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+from QuickOSM.core.parser.osm_stream_parser import OsmStreamParser
+
+LAYERS = ['points', 'lines', 'multilinestrings', 'multipolygons']
+OSM_CONF = join(dirname(dirname(__file__)), 'QuickOSMconf.ini')
+
+
+class TestOsmStreamParser(unittest.TestCase):
+
+    def parse(
+            self, white_list=None, file_name='stream_parser.osm',
+            column_limits=None):
+        """Parse a test file and read the GeoJSON features.
+
+        :return: The features of each layer.
+        :rtype: dict
+        """
+        parser = OsmStreamParser(
+            test_data_path(file_name),
+            LAYERS,
+            dict.fromkeys(LAYERS, white_list),
+            OSM_CONF,
+            column_limits=column_limits)
+        layers = parser.parse()
+
+        features = {}
+        for layer, values in layers.iteritems():
+            with open(values['geojsonFile']) as f:
+                features[layer] = json.load(f)['features']
+            remove(values['geojsonFile'])
+            self.assertEqual(values['featureCount'], len(features[layer]))
+        return features
+
+    def test_layers(self):
+        """Test the features built in each layer."""
+        features = self.parse()
+
+        points = features['points']
+        self.assertEqual(len(points), 1)
+        self.assertDictEqual(points[0]['geometry'], {
+            'type': 'Point', 'coordinates': [3.8, 43.6]})
+        self.assertEqual(points[0]['properties']['name'], u'École')
+        self.assertEqual(points[0]['properties']['full_id'], 'n1')
+
+        # The way 4 has a missing node
+        lines = features['lines']
+        self.assertListEqual(
+            [f['properties']['osm_id'] for f in lines], ['1', '4'])
+        self.assertEqual(len(lines[1]['geometry']['coordinates']), 2)
+
+        # The source is ignored, the way 3 has no tag
+        polygons = features['multipolygons']
+        self.assertListEqual(
+            [f['properties']['full_id'] for f in polygons], ['w2', 'r1'])
+        self.assertNotIn('source', polygons[0]['properties'])
+        # Only the tags of the feature are written
+        self.assertNotIn('landuse', polygons[0]['properties'])
+        self.assertEqual(polygons[1]['properties']['osm_type'], 'relation')
+        rings = polygons[1]['geometry']['coordinates'][0]
+        self.assertEqual(len(rings), 2)
+        self.assertEqual(rings[1][0], [3.802, 43.602])
+
+        routes = features['multilinestrings']
+        self.assertEqual(len(routes), 1)
+        self.assertEqual(len(routes[0]['geometry']['coordinates']), 2)
+
+    def test_white_list(self):
+        """Test the columns of a white list."""
+        features = self.parse(['name'])
+        self.assertListEqual(
+            sorted(features['points'][0]['properties']),
+            ['full_id', 'name', 'osm_id', 'osm_type'])
+        self.assertEqual(len(features['lines']), 2)
+
+    def test_column_limits(self):
+        """Test the keys less used moved in other_tags."""
+        features = self.parse(column_limits={'points': {'max_columns': 0}})
+        properties = features['points'][0]['properties']
+        self.assertNotIn('name', properties)
+        self.assertIn(u'"name"=>"École"', properties['other_tags'])
+        self.assertEqual(properties['full_id'], 'n1')
+        self.assertEqual(len(features['lines']), 2)
+
+    def test_geometry(self):
+        """Test the coordinates in the ways, with geometry="full"."""
+        features = self.parse(file_name='stream_parser_geom.osm')
+        self.assertEqual(len(features['points']), 1)
+
+        # The node outside of the bbox is skipped
+        lines = features['lines']
+        self.assertEqual(len(lines), 1)
+        self.assertListEqual(
+            lines[0]['geometry']['coordinates'],
+            [[3.8, 43.6], [3.81, 43.6]])
+
+        polygons = features['multipolygons']
+        self.assertListEqual(
+            [f['properties']['full_id'] for f in polygons], ['w2', 'r1'])
+        self.assertEqual(
+            len(polygons[1]['geometry']['coordinates'][0][0]), 5)
+
+    def test_center(self):
+        """Test the ways and the relations with geometry="center"."""
+        features = self.parse(file_name='stream_parser_center.osm')
+        points = features['points']
+        self.assertListEqual(
+            [f['properties']['full_id'] for f in points], ['n1', 'w1', 'r1'])
+        self.assertListEqual(
+            [f['properties']['osm_type'] for f in points],
+            ['node', 'way', 'relation'])
+        self.assertListEqual(
+            points[1]['geometry']['coordinates'], [3.805, 43.605])
+
+        # No line nor polygon is built
+        self.assertEqual(len(features['lines']), 0)
+        self.assertEqual(len(features['multipolygons']), 0)
+
+    def test_without_coordinates(self):
+        """Test the elements without coordinates, like with "out tags"."""
+        features = self.parse(file_name='stream_parser_tags.osm')
+        for layer in LAYERS:
+            self.assertEqual(len(features[layer]), 0)
+
+if __name__ == '__main__':
+    suite = unittest.makeSuite(TestOsmStreamParser)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import unittest
+
+# This import is to enable SIP API V2
+# noinspection PyUnresolvedReferences
+import qgis  # pylint: disable=unused-import
+from test.utilities import get_qgis_app, test_data_path
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+from QuickOSM.core.parser.tag_columns import TagColumns
+
+
+class TestTagColumns(unittest.TestCase):
+
+    def test_columns(self):
+        """Test the columns and the sparse rows."""
+        tags = TagColumns(['full_id', 'osm_id', 'osm_type'])
+        tags.add_row({u'name': u'A', u'amenity': u'cafe'})
+        tags.add_row(None, False)
+        tags.add_row({u'amenity': u'bar', u'osm_id': u'1', u'ref': u'2'})
+
+        self.assertEqual(len(tags), 6)
+        self.assertIn(u'ref', tags)
+        self.assertNotIn(u'highway', tags)
+        self.assertListEqual(
+            sorted(tags[3:]), [u'amenity', u'name', u'ref'])
+        self.assertEqual(tags.row_count(), 3)
+        self.assertFalse(tags.is_tagged(1))
+
+        # The first columns are not filled by the tags
+        row = tags.row(2, ['n2', '2', 'node'])
+        self.assertListEqual(row[:3], ['n2', '2', 'node'])
+        self.assertEqual(row[tags.index[u'amenity']], u'bar')
+        self.assertEqual(row[tags.index[u'name']], '')
+
+        row = tags.row(1, ['n1', '1', 'node'])
+        self.assertListEqual(row, ['n1', '1', 'node', '', '', ''])
+
+        tags.clear_rows()
+        self.assertEqual(tags.row_count(), 0)
+        self.assertEqual(len(tags), 6)
+
+    def test_white_list(self):
+        """Test the columns restricted by a white list."""
+        tags = TagColumns(['full_id', 'osm_id', 'osm_type'], 'name,ref')
+        tags.add_row({u'name': u'A', u'amenity': u'cafe', u'ref': u'1'})
+        self.assertListEqual(sorted(tags[3:]), [u'name', u'ref'])
+        row = tags.row(0, ['w1', '1', 'way'])
+        self.assertEqual(row[tags.index[u'name']], u'A')
+        self.assertEqual(row[tags.index[u'ref']], u'1')
+        self.assertEqual(len(row), 5)
+
+    def test_limit(self):
+        """Test the columns capped by frequency and fill rate."""
+        def make():
+            tags = TagColumns(['full_id', 'osm_id', 'osm_type'])
+            for i in range(10):
+                row = {u'name': u'n%s' % i}
+                if i < 5:
+                    row[u'amenity'] = u'cafe'
+                if i == 0:
+                    row[u'wheelchair'] = u'yes'
+                    row[u'note'] = u'a "b"'
+                tags.add_row(row)
+            return tags
+
+        tags = make()
+        self.assertFalse(tags.limit(max_columns=4))
+
+        tags = make()
+        self.assertTrue(tags.limit(max_columns=2))
+        self.assertListEqual(
+            sorted(tags[3:-1]), [u'amenity', u'name'])
+        self.assertEqual(tags[-1], 'other_tags')
+        self.assertNotIn(u'note', tags)
+
+        row = tags.row(0, ['n1', '1', 'node'])
+        self.assertEqual(row[tags.index[u'name']], u'n0')
+        self.assertIn(u'"note"=>"a \\"b\\""', row[-1])
+        self.assertIn(u'"wheelchair"=>"yes"', row[-1])
+        self.assertEqual(tags.row(9, ['n9', '9', 'node'])[-1], '')
+
+        tags = make()
+        self.assertTrue(tags.limit(min_fill_rate=0.5))
+        self.assertListEqual(
+            sorted(tags[3:-1]), [u'amenity', u'name'])
+
+if __name__ == '__main__':
+    suite = unittest.makeSuite(TestTagColumns)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import json
+from os.path import join, isfile
+
+
+class PlaceHistory(object):
+    """
+    Places searched with Nominatim, ranked by frequency and recency.
+
+    Each use of a place counts for 1, halved every HALF_LIFE searches, so
+    a place used often but long ago goes down the list. The history keeps
+    the MAX_SIZE best places.
+    """
+
+    FILE = 'nominatim.json'
+    LEGACY_FILE = 'nominatim.txt'
+    MAX_SIZE = 50
+    HALF_LIFE = 10.0
+    _instance = None
+
+    @staticmethod
+    def get():
+        """
+        The history of the plugin, loaded at the first call
+
+        @rtype: PlaceHistory
+        """
+        if PlaceHistory._instance is None:
+            from QuickOSM.core.utilities.tools import get_QuickOSM_folder
+            folder = get_QuickOSM_folder()
+            history = PlaceHistory(join(folder, PlaceHistory.FILE))
+            if not isfile(history.file_path):
+                history.import_legacy(join(folder, PlaceHistory.LEGACY_FILE))
+            PlaceHistory._instance = history
+        return PlaceHistory._instance
+
+    def __init__(self, file_path=None):
+        self.file_path = file_path
+
+        # Number of searches, used as clock for the recency
+        self.tick = 0
+
+        # Score at the last use and last use, by place
+        self.places = {}
+        self.__ranked = None
+
+        if file_path and isfile(file_path):
+            try:
+                with open(file_path) as f:
+                    data = json.load(f)
+                self.tick = data['tick']
+                self.places = dict(
+                    (place, tuple(value))
+                    for place, value in data['places'].iteritems())
+            except (IOError, ValueError, KeyError):
+                self.tick = 0
+                self.places = {}
+
+    def import_legacy(self, file_path):
+        """
+        Read the list of the last places, the most recent first
+
+        @param file_path: text file with a place per line
+        @type file_path: str
+        """
+        if not isfile(file_path):
+            return
+        with open(file_path) as f:
+            places = [unicode(line.rstrip('\n'), 'utf-8') for line in f]
+        for place in reversed(places):
+            self.add(place, save=False)
+
+    def score(self, place):
+        score, last_use = self.places[place]
+        return score * 0.5 ** ((self.tick - last_use) / self.HALF_LIFE)
+
+    def add(self, place, save=True):
+        """
+        Count a search of a place
+
+        @param place: the place
+        @type place: str
+        @param save: if the history is written in its file
+        @type save: bool
+        """
+        place = place.strip()
+        if not place:
+            return
+
+        self.tick += 1
+        if place in self.places:
+            score = self.score(place)
+        else:
+            score = 0
+            # A new place replaces the worst one, not itself
+            if len(self.places) >= self.MAX_SIZE:
+                del self.places[min(self.places, key=self.score)]
+        self.places[place] = (score + 1, self.tick)
+
+        self.__ranked = None
+        if save:
+            self.save()
+
+    def save(self):
+        if not self.file_path:
+            return
+        data = {'tick': self.tick, 'places': self.places}
+        try:
+            with open(self.file_path, 'w') as f:
+                json.dump(data, f)
+        except (IOError, OSError):
+            pass
+
+    def ranked(self):
+        """
+        Places, the best first
+
+        @rtype: list
+        """
+        if self.__ranked is None:
+            self.__ranked = sorted(
+                self.places, key=lambda place: (-self.score(place), place))
+        return self.__ranked
+
+    def complete(self, prefix, limit=10):
+        """
+        Best places starting with a prefix, case insensitive
+
+        @param prefix: the beginning of the place
+        @type prefix: str
+        @param limit: maximum number of places
+        @type limit: int
+        @rtype: list
+        """
+        prefix = prefix.strip().lower()
+        places = [
+            place for place in self.ranked()
+            if place.lower().startswith(prefix)]
+        return places[:limit]
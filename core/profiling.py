@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import cProfile
+import hashlib
+import logging
+import pstats
+import threading
+from functools import wraps
+from os import environ, makedirs
+from os.path import isdir, join
+from time import strftime
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2 needs the pytracemalloc backport
+    tracemalloc = None
+
+from QuickOSM.core.utilities.tools import get_setting, get_QuickOSM_folder
+
+LOGGER = logging.getLogger('QuickOSM')
+
+# Enable the profiling without QGIS Desktop, like QUICKOSM_PROFILE=1
+PROFILE_ENVIRONMENT = 'QUICKOSM_PROFILE'
+
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+# Nested functions are profiled with the first one
+_LOCAL = threading.local()
+
+
+def is_profile_enabled():
+    """
+    If the runs must be profiled, from the environment or the settings
+
+    @rtype: bool
+    """
+    value = environ.get(PROFILE_ENVIRONMENT)
+    if value is None:
+        value = get_setting('profile')
+    return unicode(value).lower() in ('1', 'true', 'yes')
+
+
+def get_profile_folder():
+    """
+    Get the folder of the profiles, ~/.qgis2/QuickOSM/profiles on linux
+
+    @rtype: str
+    """
+    folder = join(get_QuickOSM_folder(), 'profiles')
+    if not isdir(folder):
+        makedirs(folder)
+    return folder
+
+
+def get_hash(value):
+    """
+    Short hash of a query, used in the name of the files
+
+    @type value: str
+    @rtype: str
+    """
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    return hashlib.sha1(str(value)).hexdigest()[:10]
+
+
+def algorithm_parameters(algorithm, *args):
+    """
+    Key of a processing algorithm for profiled, its parameters
+
+    @rtype: str
+    """
+    return u'\n'.join(
+        u'%s=%s' % (parameter.name, parameter.value)
+        for parameter in algorithm.parameters)
+
+
+def profiled(name, key):
+    """
+    Decorator profiling a function, if the profiling is enabled.
+
+    Without profiling, the function is only called after reading the
+    setting, there is no profiler nor tracing.
+
+    @param name: name of the run, in the name of the files
+    @type name: str
+
+    @param key: function giving the query from the arguments of the
+        decorated function, its hash is in the name of the files
+    @type key: function
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if getattr(_LOCAL, 'active', False) or not is_profile_enabled():
+                return function(*args, **kwargs)
+
+            _LOCAL.active = True
+            try:
+                return profile(
+                    name, key(*args, **kwargs), function, *args, **kwargs)
+            finally:
+                _LOCAL.active = False
+        return wrapper
+    return decorator
+
+
+def profile(name, query, function, *args, **kwargs):
+    """
+    Call a function with cProfile and tracemalloc, then write the reports.
+
+    Files in the profile folder:
+        name_hash_date.prof: the statistics of cProfile
+        name_hash_date.txt: the functions sorted by cumulative time
+        name_hash_date_allocations.txt: the top allocations, if tracemalloc
+            is available
+
+    @return: the result of the function
+    """
+    prefix = join(get_profile_folder(), '%s_%s_%s' % (
+        name, get_hash(query), strftime('%Y%m%d-%H%M%S')))
+
+    tracing = tracemalloc is not None and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(function, *args, **kwargs)
+    finally:
+        snapshot = None
+        peak = None
+        if tracemalloc is not None and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            if tracing:
+                tracemalloc.stop()
+
+        # A report which can't be written must not hide the result
+        try:
+            write_reports(prefix, query, profiler, snapshot, peak)
+            LOGGER.info('Profile of %s written in %s.prof', name, prefix)
+        except (IOError, OSError) as e:
+            LOGGER.warning('Profile of %s not written: %s', name, e)
+
+
+def write_reports(prefix, query, profiler, snapshot=None, peak=None):
+    """
+    Write the reports of a profiled run
+
+    @param prefix: path of the files without extension
+    @type prefix: str
+
+    @param query: the query, written at the top of the text report
+    @type query: str
+
+    @param profiler: the profiler of the run
+    @type profiler: cProfile.Profile
+
+    @param snapshot: tracemalloc snapshot, None if not traced
+    @param peak: peak of the traced memory, in bytes
+    @type peak: int
+    """
+    profiler.dump_stats(prefix + '.prof')
+    if isinstance(query, unicode):
+        query = query.encode('utf-8')
+    with open(prefix + '.txt', 'w') as f:
+        f.write('%s\n\n' % query)
+        stats = pstats.Stats(profiler, stream=f)
+        stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+
+    if snapshot is not None:
+        write_allocations(prefix + '_allocations.txt', snapshot, peak)
+
+
+def write_allocations(path, snapshot, peak):
+    """
+    Write the lines which allocated the most memory
+
+    @param path: path of the report
+    @type path: str
+
+    @param snapshot: tracemalloc snapshot
+    @param peak: peak of the traced memory, in bytes
+    @type peak: int
+    """
+    with open(path, 'w') as f:
+        f.write('Peak: %.1f MB\n\n' % (peak / 1024.0 / 1024.0))
+        for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+            f.write('%s\n' % stat)
@@ -30,10 +30,23 @@ from QuickOSM.core.utilities.tools import tr
 
 class QueryFactory(object):
     """
-    Build a XML query
+    Build a XML or an OQL query
     """
 
     OSM_TYPES = ['node', 'way', 'relation']
+    LANGUAGES = ['xml', 'oql']
+    ORDERS = ['id', 'quadtile']
+    # Geometries printed in the elements, instead of the nodes, with the
+    # value of the geometry attribute in XML
+    GEOMETRIES = {'geom': u'full', 'center': u'center'}
+
+    # Attributes written as a template in the final query
+    TEMPLATES = {
+        'area': u'{{geocodeArea:%s}}',
+        'area_coords': u'{{geocodeCoords:%s}}',
+        'bbox': u'{{bbox}}'}
+
+    INDENT = u'    '
 
     def __init__(
             self,
@@ -46,7 +59,11 @@ class QueryFactory(object):
             osm_objects=OSM_TYPES,
             output='xml',
             timeout=25,
-            print_mode='body'):
+            print_mode='body',
+            language='xml',
+            order=None,
+            skeleton=None,
+            geometry=None):
         """
         Constructor with key=value according to OpenStreetMap
         A bbox or nominatim can be provided
@@ -69,6 +86,17 @@ class QueryFactory(object):
         @type timeout: int
         @param print_mode: print type of the overpass query (read overpass doc)
         @type print_mode: str
+        @param language: language of the query : xml or oql
+        @type language: str
+        @param order: id or quadtile, quadtile by default in OQL
+        @type order: str
+        @param skeleton: print the members which are not in the result
+        without tags, by default in OQL
+        @type skeleton: bool
+        @param geometry: 'geom' to print the coordinates in the ways and
+        the relations, without the nodes, 'center' to print only their
+        center. Only the Python parser reads it.
+        @type geometry: str
         """
         self.__key = key
         self.__value = value
@@ -80,6 +108,16 @@ class QueryFactory(object):
         self.__timeout = timeout
         self.__output = output
         self.__print_mode = print_mode
+        self.__language = language
+
+        if order is None:
+            order = 'quadtile' if language == 'oql' else 'id'
+        self.__order = order
+
+        if skeleton is None:
+            skeleton = language == 'oql'
+        self.__skeleton = skeleton
+        self.__geometry = geometry
 
     def check_parameters(self):
         if self.__nominatim and self.__bbox:
@@ -106,13 +144,79 @@ class QueryFactory(object):
             raise QueryFactoryException(
                 suffix=tr('QuickOSM', 'No nominatim provided with "around".'))
 
+        if self.__language not in QueryFactory.LANGUAGES:
+            raise QueryFactoryException(
+                suffix=tr('QuickOSM', 'wrong query language'))
+
+        if self.__order not in QueryFactory.ORDERS:
+            raise QueryFactoryException(
+                suffix=tr('QuickOSM', 'wrong order'))
+
+        if self.__geometry and self.__geometry not in QueryFactory.GEOMETRIES:
+            raise QueryFactoryException(
+                suffix=tr('QuickOSM', 'wrong geometry'))
+
+    def places(self):
+        """
+        Places from the nominatim parameter, separated by ";"
+
+        @return: list of places or None
+        @rtype: list
+        """
+        if self.__nominatim:
+            return [name.strip() for name in self.__nominatim.split(';')]
+        else:
+            return None
+
+    @staticmethod
+    def escape(value):
+        """Escape an attribute value, like minidom does."""
+        return value.replace(u'&', u'&amp;').replace(u'<', u'&lt;').\
+            replace(u'"', u'&quot;').replace(u'>', u'&gt;')
+
+    @staticmethod
+    def xml_tag(depth, name, attributes=None, empty=True):
+        """
+        An indented start tag, with sorted attributes and templates
+
+        @param depth: level of indentation
+        @type depth: int
+        @param name: name of the element
+        @type name: str
+        @param attributes: attributes of the element
+        @type attributes: dict
+        @param empty: if the element has no child
+        @type empty: bool
+        @return: the line
+        @rtype: str
+        """
+        line = [QueryFactory.INDENT * depth, u'<', name]
+        if attributes:
+            for key in sorted(attributes):
+                value = u'%s' % attributes[key]
+                line.append(u' ')
+                if key in QueryFactory.TEMPLATES:
+                    line.append(
+                        QueryFactory.TEMPLATES[key].replace(u'%s', value))
+                else:
+                    line.append(
+                        u'%s="%s"' % (key, QueryFactory.escape(value)))
+        line.append(u'/>' if empty else u'>')
+        return u''.join(line)
+
     @staticmethod
     def get_pretty_xml(query):
+        """
+        Deprecated, generate_pretty_xml writes the indented XML directly.
+        """
         xml = parseString(query.encode('utf-8'))
         return xml.toprettyxml()
 
     @staticmethod
     def replace_template(query):
+        """
+        Deprecated, the templates are written by xml_tag.
+        """
         query = re.sub(
             r' area_coords="(.*?)"', r' {{geocodeCoords:\1}}', query)
         query = re.sub(
@@ -121,6 +225,11 @@ class QueryFactory(object):
         return query
 
     def generate_xml(self):
+        """
+        Deprecated, the compact XML is not used by make anymore.
+
+        The order and the skeleton are not written in this query.
+        """
         query = u'<osm-script output="%s" timeout="%s">' % \
                 (self.__output, self.__timeout)
 
@@ -161,33 +270,236 @@ class QueryFactory(object):
                 query += u'</query>'
 
         query += u'</union>'
-        query += u'<union>'
-        query += u'<item />'
-        query += u'<recurse type="down"/>'
-        query += u'</union>'
-        query += u'<print mode="%s" />' % self.__print_mode
+        if self.__geometry:
+            query += u'<print geometry="%s" mode="%s" />' % (
+                QueryFactory.GEOMETRIES[self.__geometry], self.__print_mode)
+        else:
+            query += u'<union>'
+            query += u'<item />'
+            query += u'<recurse type="down"/>'
+            query += u'</union>'
+            query += u'<print mode="%s" />' % self.__print_mode
         query += u'</osm-script>'
 
         return query
 
-    def make(self):
+    @staticmethod
+    def xml_set(depth, osm_type, name):
         """
-        Make the query
+        Lines of a query on the objects of a type in a named set
+
+        @param depth: level of indentation
+        @type depth: int
+        @param osm_type: node, way or relation
+        @type osm_type: str
+        @param name: name of the set
+        @type name: str
+        @return: lines
+        @rtype: list
+        """
+        return [
+            QueryFactory.xml_tag(depth, u'query', {'type': osm_type}, False),
+            QueryFactory.xml_tag(depth + 1, u'item', {'set': name}),
+            QueryFactory.INDENT * depth + u'</query>']
+
+    def generate_pretty_xml(self):
+        """
+        Write the indented XML, with templates, line by line
 
         @return: query
         @rtype: str
         """
+        tag = QueryFactory.xml_tag
+        lines = [tag(
+            0,
+            u'osm-script',
+            {'output': self.__output, 'timeout': self.__timeout},
+            False)]
 
-        self.check_parameters()
-        query = self.generate_xml()
+        nominatim = self.places()
 
-        # get_pretty_xml works only with a valid XML, no template {{}}
-        # So we replace fake XML after
-        query = QueryFactory.get_pretty_xml(query)
+        if nominatim and not self.__is_around:
+            for i, one_nominatim in enumerate(nominatim):
+                lines.append(tag(
+                    1,
+                    u'id-query',
+                    {'area': one_nominatim, 'into': u'area_%s' % i}))
 
-        # get_pretty_xml add on XML header, let's remove the first line
-        query = '\n'.join(query.split('\n')[1:])
+        if self.__skeleton and not self.__geometry:
+            lines.append(tag(1, u'union', {'into': u'result'}, False))
+        else:
+            lines.append(tag(1, u'union', empty=False))
 
-        query = QueryFactory.replace_template(query)
-        query = query.replace('	', '    ')
-        return query
+        has_kv = {'k': self.__key}
+        if self.__value:
+            has_kv['v'] = self.__value
+
+        loop = 1 if not nominatim else len(nominatim)
+
+        for osm_object in self.__osm_objects:
+            for i in range(0, loop):
+                lines.append(tag(2, u'query', {'type': osm_object}, False))
+                lines.append(tag(3, u'has-kv', has_kv))
+
+                if self.__nominatim and not self.__is_around:
+                    lines.append(
+                        tag(3, u'area-query', {'from': u'area_%s' % i}))
+
+                elif self.__nominatim and self.__is_around:
+                    lines.append(tag(
+                        3,
+                        u'around',
+                        {'area_coords': nominatim[i],
+                         'radius': self.__distance}))
+
+                elif self.__bbox:
+                    lines.append(tag(3, u'bbox-query', {'bbox': u'custom'}))
+
+                lines.append(u'        </query>')
+
+        lines.append(u'    </union>')
+
+        print_attributes = {'mode': self.__print_mode}
+        if self.__order != 'id':
+            print_attributes['order'] = self.__order
+
+        if self.__geometry:
+            # The geometries are in the elements, no recurse
+            print_attributes['geometry'] = \
+                QueryFactory.GEOMETRIES[self.__geometry]
+            lines.append(tag(1, u'print', print_attributes))
+        elif not self.__skeleton:
+            lines.append(tag(1, u'union', empty=False))
+            lines.append(tag(2, u'item'))
+            lines.append(tag(2, u'recurse', {'type': u'down'}))
+            lines.append(u'    </union>')
+            lines.append(tag(1, u'print', print_attributes))
+        else:
+            skeleton_attributes = dict(print_attributes, mode=u'skeleton')
+            lines.append(tag(
+                1,
+                u'recurse',
+                {'from': u'result', 'into': u'down', 'type': u'down'}))
+
+            # OGR needs the nodes, then the ways and then the relations.
+            for osm_object in QueryFactory.OSM_TYPES:
+                lines.extend(self.xml_set(1, osm_object, u'result'))
+                lines.append(tag(1, u'print', print_attributes))
+                if osm_object != 'relation':
+                    lines.append(tag(1, u'difference', empty=False))
+                    lines.extend(self.xml_set(2, osm_object, u'down'))
+                    lines.extend(self.xml_set(2, osm_object, u'result'))
+                    lines.append(u'    </difference>')
+                    lines.append(tag(1, u'print', skeleton_attributes))
+
+        lines.append(u'</osm-script>')
+        lines.append(u'')
+
+        return u'\n'.join(lines)
+
+    @staticmethod
+    def quote(value):
+        """Quote a string for OQL."""
+        return u'"%s"' % value.replace(u'\\', u'\\\\').replace(u'"', u'\\"')
+
+    def generate_oql(self):
+        """
+        Write the query in Overpass QL
+
+        Every place shares the same area set and all OSM types are queried
+        with a single nwr statement when possible.
+
+        @return: query
+        @rtype: str
+        """
+        lines = [u'[out:%s][timeout:%s];' % (self.__output, self.__timeout)]
+
+        nominatim = self.places()
+
+        if self.__value:
+            has_kv = u'[%s=%s]' % (
+                self.quote(self.__key), self.quote(self.__value))
+        else:
+            has_kv = u'[%s]' % self.quote(self.__key)
+
+        if nominatim and not self.__is_around:
+            areas = [u'{{geocodeArea:%s}}' % place for place in nominatim]
+            if len(areas) == 1:
+                lines.append(u'%s->.searchArea;' % areas[0])
+            else:
+                lines.append(u'(%s;)->.searchArea;' % u'; '.join(areas))
+            filters = [u'(area.searchArea)']
+
+        elif nominatim and self.__is_around:
+            filters = [
+                u'(around:%s,{{geocodeCoords:%s}})' % (self.__distance, place)
+                for place in nominatim]
+
+        elif self.__bbox:
+            filters = [u'({{bbox}})']
+
+        else:
+            filters = [u'']
+
+        if set(self.__osm_objects) == set(QueryFactory.OSM_TYPES):
+            osm_objects = [u'nwr']
+        else:
+            osm_objects = [
+                osm_object for osm_object in QueryFactory.OSM_TYPES
+                if osm_object in self.__osm_objects]
+
+        statements = [
+            u'%s%s%s' % (osm_object, has_kv, osm_filter)
+            for osm_object in osm_objects for osm_filter in filters]
+
+        if len(statements) == 1:
+            lines.append(u'%s->.result;' % statements[0])
+        else:
+            lines.append(u'(')
+            for statement in statements:
+                lines.append(u'%s%s;' % (QueryFactory.INDENT, statement))
+            lines.append(u')->.result;')
+
+        if self.__order == 'quadtile':
+            order = u' qt'
+        else:
+            order = u''
+
+        if self.__skeleton:
+            down_mode = u'skel'
+        else:
+            down_mode = self.__print_mode
+
+        if self.__geometry:
+            # The geometries are in the elements, no recurse
+            lines.append(u'.result out %s %s%s;' % (
+                self.__print_mode, self.__geometry, order))
+            lines.append(u'')
+            return u'\n'.join(lines)
+
+        # OGR needs the nodes, then the ways and then the relations.
+        lines.append(u'.result >->.down;')
+        for osm_object in QueryFactory.OSM_TYPES:
+            lines.append(u'%s.result;' % osm_object)
+            lines.append(u'out %s%s;' % (self.__print_mode, order))
+            if osm_object != 'relation':
+                lines.append(u'(%s.down; - %s.result;);' % (
+                    osm_object, osm_object))
+                lines.append(u'out %s%s;' % (down_mode, order))
+        lines.append(u'')
+
+        return u'\n'.join(lines)
+
+    def make(self):
+        """
+        Make the query
+
+        @return: query
+        @rtype: str
+        """
+
+        self.check_parameters()
+        if self.__language == 'oql':
+            return self.generate_oql()
+        else:
+            return self.generate_pretty_xml()
@@ -27,144 +27,359 @@ from api.nominatim import Nominatim
 from exceptions import QueryNotSupported
 
 
-def is_oql(query):
-    return True if query[-1] == ";" else False
-
-
-def replace_center(extent, query):
-    template = r'{{center}}'
-    if not re.search(template, query):
-        return query
+# Every placeholder of a template, parsed in one scan.
+TEMPLATE_PATTERN = re.compile(
+    r'{{(?:(nominatimArea|geocodeArea|geocodeCoords):([^}]*)|(bbox|center))}}')
+
+# Features of the queries which are not supported by the plugin, with a
+# regular expression and a name.
+NOT_SUPPORTED = [
+    (r'geometry="center"', 'center'),
+    (r'geometry="full"', 'geom'),
+    (r'{{style', '{{style}}'),
+    (r'{{data', '{{data}}'),
+    (r'{{date', '{{date}}'),
+    (r'{{geocodeId:', '{{geocodeId:}}'),
+    (r'{{geocodeBbox:', '{{geocodeBbox:}}'),
+]
+# Every feature in one scan, a group for each one.
+NOT_SUPPORTED_PATTERN = re.compile(
+    '|'.join('(%s)' % pattern for pattern, _ in NOT_SUPPORTED))
+
+# The out statements of OQL with their modes, like "out body center qt;".
+# They are found out of the strings, see OQL_STRING_PATTERN.
+OUT_STATEMENT = r'(?<![\[\w])out\b(?!:)[^;]*'
+OQL_NOT_SUPPORTED = [
+    (r'%s\bcenter\b' % OUT_STATEMENT, 'center'),
+    (r'%s\bgeom\b' % OUT_STATEMENT, 'geom'),
+]
+OQL_NOT_SUPPORTED_PATTERN = re.compile(
+    '|'.join('(%s)' % pattern for pattern, _ in OQL_NOT_SUPPORTED))
+OQL_STRING_PATTERN = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'')
+
+# Names of NOT_SUPPORTED supported by a parser engine, see OsmParser.
+ENGINE_SUPPORTED = {
+    'python': ['center', 'geom'],
+}
+
+END_OQL_PATTERN = re.compile(r';;$')
+
+AREA = 'geocodeArea'
+COORDS = 'geocodeCoords'
+BBOX = 'bbox'
+CENTER = 'center'
+
+
+class QueryTemplate(object):
+    """
+    A query parsed once in literal segments and placeholders.
 
-    y = extent.center().y()
-    x = extent.center().x()
-    if is_oql(query):
-        new_string = '%s,%s' % (y, x)
-    else:
-        new_string = 'lat="%s" lon="%s"' % (y, x)
+    Rendering the template only computes the values of the placeholders, so
+    the same template can be rendered for many extents or places.
+    """
 
-    query = re.sub(template, new_string, query)
-    return query
+    CACHE_SIZE = 64
+    _cache = {}
+
+    @staticmethod
+    def get(query):
+        """Get the template of a query, from the cache if possible.
+
+        @param query: the query, in XML or OQL
+        @type query: str
+
+        @rtype: QueryTemplate
+        """
+        try:
+            return QueryTemplate._cache[query]
+        except KeyError:
+            if len(QueryTemplate._cache) >= QueryTemplate.CACHE_SIZE:
+                QueryTemplate._cache.clear()
+            template = QueryTemplate(query)
+            QueryTemplate._cache[query] = template
+            return template
+
+    def __init__(self, query):
+        self.query = query
+        self.is_oql = is_oql(query)
+        self.segments = []
+        self.kinds = set()
+
+        position = 0
+        for match in TEMPLATE_PATTERN.finditer(query):
+            if match.start() > position:
+                self.segments.append(query[position:match.start()])
+            geocode, search, extent = match.groups()
+            if extent:
+                kind = extent
+            elif geocode == COORDS:
+                kind = COORDS
+            else:
+                kind = AREA
+            self.segments.append((kind, search, match.group(0)))
+            self.kinds.add(kind)
+            position = match.end()
+        if position < len(query):
+            self.segments.append(query[position:])
+
+    def searches(self, nominatim_name=None):
+        """Places to geocode for rendering the template.
+
+        @param nominatim_name: overrides the place of the geocode templates
+        @type nominatim_name: str
+
+        @return: list of (kind, search) without duplicate
+        @rtype: list
+        """
+        searches = []
+        for segment in self.segments:
+            if isinstance(segment, tuple) and segment[0] in (AREA, COORDS):
+                search = (segment[0], nominatim_name or segment[1])
+                if search not in searches:
+                    searches.append(search)
+        return searches
+
+    def render(
+            self, extent=None, nominatim_name=None, kinds=None,
+            geocoded=None):
+        """Replace the placeholders.
+
+        @param extent: the extent for {{bbox}} and {{center}}
+        @type extent: QgsRectangle
+
+        @param nominatim_name: overrides the place of the geocode templates
+        @type nominatim_name: str
+
+        @param kinds: render only these kinds of placeholder, all by default
+        @type kinds: list
+
+        @param geocoded: results already known, keyed by (kind, search)
+        @type geocoded: dict
+
+        @return: the final query
+        @rtype: str
+        """
+        if not self.kinds:
+            return self.query
+
+        if geocoded is None:
+            geocoded = {}
+
+        parts = []
+        for segment in self.segments:
+            if not isinstance(segment, tuple):
+                parts.append(segment)
+                continue
+
+            kind, search, raw = segment
+            if kinds is not None and kind not in kinds:
+                parts.append(raw)
+            elif kind == BBOX:
+                parts.append(self.format_bbox(extent))
+            elif kind == CENTER:
+                parts.append(self.format_center(extent))
+            else:
+                key = (kind, nominatim_name or search)
+                if key not in geocoded:
+                    geocoded[key] = geocode(*key)
+                parts.append(self.format_geocode(kind, geocoded[key]))
+        return ''.join(parts)
+
+    def format_bbox(self, extent):
+        y_min = extent.yMinimum()
+        y_max = extent.yMaximum()
+        x_min = extent.xMinimum()
+        x_max = extent.xMaximum()
+
+        if self.is_oql:
+            return '%s,%s,%s,%s' % (y_min, x_min, y_max, x_max)
+        else:
+            return 'e="%s" n="%s" s="%s" w="%s"' % (
+                x_max, y_max, y_min, x_min)
+
+    def format_center(self, extent):
+        y = extent.center().y()
+        x = extent.center().x()
+        if self.is_oql:
+            return '%s,%s' % (y, x)
+        else:
+            return 'lat="%s" lon="%s"' % (y, x)
+
+    def format_geocode(self, kind, value):
+        if kind == COORDS:
+            lon, lat = value
+            if self.is_oql:
+                return '%s,%s' % (lat, lon)
+            else:
+                return 'lat="%s" lon="%s"' % (lat, lon)
+
+        area = int(value) + 3600000000
+        if self.is_oql:
+            return 'area(%s)' % area
+        else:
+            return 'ref="%s" type="area"' % area
 
 
-def replace_bbox(extent, query):
-    template = r'{{bbox}}'
-    if not re.search(template, query):
-        return query
+def geocode(kind, search):
+    """Geocode a place with Nominatim.
 
-    y_min = extent.yMinimum()
-    y_max = extent.yMaximum()
-    x_min = extent.xMinimum()
-    x_max = extent.xMaximum()
+    @param kind: geocodeArea or geocodeCoords
+    @type kind: str
 
-    if is_oql(query):
-        new_string = '%s,%s,%s,%s' % (y_min, x_min, y_max, x_max)
-    else:
-        new_string = 'e="%s" n="%s" s="%s" w="%s"' % \
-                     (x_max, y_max, y_min, x_min)
-    query = re.sub(template, new_string, query)
-    return query
+    @param search: the place
+    @type search: str
 
+    @return: the OSM id of the relation for an area, (lon, lat) for coords
+    """
+    if kind == COORDS:
+        nominatim = Nominatim()
+        return nominatim.get_first_point_from_query(search)
 
-def replace_geocode_coords(nominatim_name, query):
+    # if the result is already a number, it's a relation ID.
+    # we don't perform a nominatim query
+    if search.isdigit():
+        return search
 
-    def replace(catch, default_nominatim):
+    # We perform a nominatim query
+    nominatim = Nominatim()
+    return nominatim.get_first_polygon_from_query(search)
 
-        if default_nominatim:
-            search = default_nominatim
-        else:
-            search = catch
 
-        nominatim = Nominatim()
-        lon, lat = nominatim.get_first_point_from_query(search)
+def geocode_many(searches):
+    """Geocode several places with concurrent Nominatim queries.
 
-        if is_oql(query):
-            new_string = '%s,%s' % (lat, lon)
-        else:
-            new_string = 'lat="%s" lon="%s"' % (lat, lon)
+    @param searches: list of (kind, search) from QueryTemplate.searches
+    @type searches: list
 
-        return new_string
+    @return: the result of geocode for each (kind, search)
+    @rtype: dict
+    """
+    geocoded = {}
+    places = []
+    for kind, search in searches:
+        if kind == AREA and search.isdigit():
+            geocoded[(kind, search)] = search
+        elif search not in places:
+            places.append(search)
+
+    if places:
+        results = Nominatim().query_many(places)
+        for kind, search in searches:
+            if kind == COORDS:
+                geocoded[(kind, search)] = Nominatim.get_first_point(
+                    results[search])
+            elif (kind, search) not in geocoded:
+                geocoded[(kind, search)] = Nominatim.get_first_polygon(
+                    results[search])
+    return geocoded
 
-    template = r'{{(geocodeCoords):([^}]*)}}'
-    query = re.sub(template, lambda m: replace(
-        m.groups()[1], nominatim_name), query)
-    return query
 
+def is_oql(query):
+    return True if query[-1] == ";" else False
 
-def replace_geocode_area(nominatim_name, query):
 
-    def replace(catch, default_nominatim):
+def replace_center(extent, query):
+    return QueryTemplate.get(query).render(extent=extent, kinds=[CENTER])
 
-        if default_nominatim:
-            search = default_nominatim
-        else:
-            search = catch
 
-        # if the result is already a number, it's a relation ID.
-        # we don't perform a nominatim query
-        if search.isdigit():
-            osm_id = search
-        else:
-            # We perform a nominatim query
-            nominatim = Nominatim()
-            osm_id = nominatim.get_first_polygon_from_query(search)
+def replace_bbox(extent, query):
+    return QueryTemplate.get(query).render(extent=extent, kinds=[BBOX])
 
-        area = int(osm_id) + 3600000000
 
-        if is_oql(query):
-            new_string = 'area(%s)' % area
-        else:
-            new_string = 'ref="%s" type="area"' % area
+def replace_geocode_coords(nominatim_name, query):
+    return QueryTemplate.get(query).render(
+        nominatim_name=nominatim_name, kinds=[COORDS])
 
-        return new_string
 
-    template = r'{{(nominatimArea|geocodeArea):([^}]*)}}'
-    query = re.sub(template, lambda m: replace(
-        m.groups()[1], nominatim_name), query)
-    return query
+def replace_geocode_area(nominatim_name, query):
+    return QueryTemplate.get(query).render(
+        nominatim_name=nominatim_name, kinds=[AREA])
 
 
 def clean_query(query):
     query = query.strip()
 
     # Correction of ; in the OQL at the end
-    query = re.sub(r';;$', ';', query)
+    query = END_OQL_PATTERN.sub(';', query)
     return query
 
 
-def is_compatible(query):
-    template = r'geometry="center"'
-    if re.search(template, query):
-        return False, 'center'
+def add_diff_to_query(query, timestamp):
+    """Turn a prepared query into an augmented diff since a timestamp.
 
-    template = r'out center;'
-    if re.search(template, query):
-        return False, 'center'
+    Coordinates are inlined in the output so that the created and modified
+    ways and relations can be built without the unchanged nodes.
 
-    template = r'{{style'
-    if re.search(template, query):
-        return False, '{{style}}'
+    @param query: the prepared query, in XML or OQL
+    @type query: str
 
-    template = r'{{data'
-    if re.search(template, query):
-        return False, '{{data}}'
+    @param timestamp: the osm_base of the previous result
+    @type timestamp: str
 
-    template = r'{{date'
-    if re.search(template, query):
-        return False, '{{date}}'
+    @return: the diff query
+    @rtype: str
+    """
+    query = re.sub(r'\[a?diff:[^\]]*\]', '', query)
+    if is_oql(query):
+        if query.lstrip().startswith('['):
+            query = re.sub(
+                r'^(\s*\[[^;]*);', r'\1[adiff:"%s"];' % timestamp, query,
+                count=1)
+        else:
+            query = '[adiff:"%s"];\n%s' % (timestamp, query)
 
-    template = r'{{geocodeId:'
-    if re.search(template, query):
-        return False, '{{geocodeId:}}'
+        def inline_geometry(match):
+            statement = match.group(0)
+            if re.search(r'\b(geom|center|bb)\b', statement):
+                return statement
+            return statement[:-1].rstrip() + ' geom;'
 
-    template = r'{{geocodeBbox:'
-    if re.search(template, query):
-        return False, '{{geocodeBbox:}}'
+        query = re.sub(
+            r'(?<![\[\w])out\b(?!:)[^;]*;', inline_geometry, query)
+    else:
+        def augmented(match):
+            tag = re.sub(r' (augmented|from)="[^"]*"', '', match.group(0))
+            return tag.replace(
+                '<osm-script',
+                '<osm-script augmented="deltas" from="%s"' % timestamp, 1)
+
+        query = re.sub(r'<osm-script[^>]*>', augmented, query, count=1)
+        query = re.sub(
+            r'<print(?![^>]*geometry=)', '<print geometry="full"', query)
+    return query
+
+
+def is_compatible(query, engine=None):
+    """Check if the plugin can read the result of a query.
+
+    @param query: the query, in XML or OQL
+    @type query: str
+
+    @param engine: the parser engine, 'ogr' or 'python'
+    @type engine: str
+
+    @return: if the query is supported, the name of the key if it's not
+    @rtype: tuple
+    """
+    found = set(
+        NOT_SUPPORTED[match.lastindex - 1][1]
+        for match in NOT_SUPPORTED_PATTERN.finditer(query))
+    # OQL, maybe with a final new line
+    if not query.lstrip().startswith('<'):
+        code = OQL_STRING_PATTERN.sub('""', query)
+        found.update(
+            OQL_NOT_SUPPORTED[match.lastindex - 1][1]
+            for match in OQL_NOT_SUPPORTED_PATTERN.finditer(code))
+
+    supported = ENGINE_SUPPORTED.get(engine, [])
+    for _, name in OQL_NOT_SUPPORTED + NOT_SUPPORTED:
+        if name in found and name not in supported:
+            return False, name
 
     return True, None
 
 
-def prepare_query(query, extent=None, nominatim_name=None):
+def prepare_query(query, extent=None, nominatim_name=None, engine=None):
     """Prepare the query before sending it to Overpass.
 
     @param query: the query, in XML or OQL
@@ -176,18 +391,63 @@ def prepare_query(query, extent=None, nominatim_name=None):
     @param nominatim_name: the city, town ...
     @type nominatim_name: str
 
+    @param engine: the parser engine of the result, see is_compatible
+    @type engine: str
+
     @return: the final query
     @rtype: str
     """
 
     query = clean_query(query)
-    result = is_compatible(query)
+    result = is_compatible(query, engine)
     if result[0] is not True:
         raise QueryNotSupported(result[1])
 
-    query = replace_geocode_area(nominatim_name, query)
-    query = replace_geocode_coords(nominatim_name, query)
-    query = replace_bbox(extent, query)
-    query = replace_center(extent, query)
+    return QueryTemplate.get(query).render(
+        extent=extent, nominatim_name=nominatim_name)
 
-    return query
+
+def prepare_queries(query, extents=None, nominatim_names=None):
+    """Prepare many variants of the same query.
+
+    The query is parsed once and the places are geocoded once, before the
+    first query is yielded. Extents are read lazily, so it can be a
+    generator over the features of a layer.
+
+    @param query: the query, in XML or OQL
+    @type query: str
+
+    @param extents: the extents in WGS84
+    @type extents: iterable of QgsRectangle
+
+    @param nominatim_names: the places overriding the geocode templates
+    @type nominatim_names: list
+
+    @return: the final queries, for each extent and for each place
+    @rtype: generator
+    """
+    query = clean_query(query)
+    result = is_compatible(query)
+    if result[0] is not True:
+        raise QueryNotSupported(result[1])
+
+    template = QueryTemplate.get(query)
+    if not nominatim_names:
+        nominatim_names = [None]
+
+    searches = []
+    for nominatim_name in nominatim_names:
+        for search in template.searches(nominatim_name):
+            if search not in searches:
+                searches.append(search)
+    geocoded = geocode_many(searches)
+
+    if extents is None:
+        extents = [None]
+
+    for extent in extents:
+        for nominatim_name in nominatim_names:
+            yield template.render(
+                extent=extent,
+                nominatim_name=nominatim_name,
+                geocoded=geocoded)
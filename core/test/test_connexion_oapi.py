@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import unittest
+
+# This import is to enable SIP API V2
+# noinspection PyUnresolvedReferences
+import qgis  # pylint: disable=unused-import
+from test.utilities import get_qgis_app
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+from PyQt4.QtCore import QObject, QByteArray, QTimer, pyqtSignal
+from PyQt4.QtNetwork import QNetworkReply
+
+from QuickOSM.core.api.connexion_oapi import ConnexionOAPI
+
+
+class FakeReply(QObject):
+    """A reply which can be read once, like QNetworkReply."""
+
+    finished = pyqtSignal()
+
+    def __init__(self, data):
+        QObject.__init__(self)
+        self.data = data
+
+    def readAll(self):
+        data, self.data = self.data, ''
+        return QByteArray(data)
+
+    @staticmethod
+    def error():
+        return QNetworkReply.NoError
+
+
+class FakeNetwork(QObject):
+    """One manager for all the requests, like QgsNetworkAccessManager."""
+
+    finished = pyqtSignal(QObject)
+
+    def __init__(self, results):
+        QObject.__init__(self)
+        self.results = list(results)
+        self.reply = None
+
+    def get(self, request):
+        self.reply = FakeReply(self.results.pop(0))
+        QTimer.singleShot(0, self.finish)
+        return self.reply
+
+    def finish(self):
+        self.reply.finished.emit()
+        self.finished.emit(self.reply)
+
+
+class TestConnexionOAPI(unittest.TestCase):
+
+    def test_queries(self):
+        """Test two queries in a row with the same connexion."""
+        results = [
+            '<osm><meta osm_base="2015-10-19T14:46:02Z"/></osm>',
+            '<osm><meta osm_base="2015-10-19T14:47:02Z"/></osm>']
+        connexion = ConnexionOAPI(output='xml')
+        connexion.network = FakeNetwork(results)
+
+        self.assertEqual(str(connexion.query('node(1);out;')), results[0])
+        self.assertEqual(str(connexion.query('node(2);out;')), results[1])
+        self.assertEqual(connexion.osm_base, '2015-10-19T14:47:02Z')
+
+if __name__ == '__main__':
+    suite = unittest.makeSuite(TestConnexionOAPI)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
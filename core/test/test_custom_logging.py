@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import unittest
+import json
+import tempfile
+from os import environ, remove
+
+# This import is to enable SIP API V2
+# noinspection PyUnresolvedReferences
+import qgis  # pylint: disable=unused-import
+from test.utilities import get_qgis_app
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+from QuickOSM.core.custom_logging import (
+    Metrics,
+    measure,
+    measured,
+    span,
+    count,
+    timed,
+    current_metrics)
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_spans(self):
+        """Test nested spans and counters."""
+        metrics = Metrics('query')
+        with metrics.span('download'):
+            pass
+        for _ in range(3):
+            with metrics.span('parse'):
+                with metrics.span('hstore'):
+                    pass
+        metrics.count('features/points', 10)
+        metrics.count('features/points', 5)
+        metrics.stop()
+
+        self.assertListEqual(
+            metrics.spans.keys(), ['download', 'parse/hstore', 'parse'])
+        self.assertEqual(metrics.spans['parse']['calls'], 3)
+        self.assertEqual(metrics.counters['features/points'], 15)
+
+        data = json.loads(metrics.to_json())
+        self.assertEqual(data['name'], 'query')
+        self.assertEqual(data['spans']['parse/hstore']['calls'], 3)
+
+        summary = metrics.summary()
+        self.assertIn('hstore', summary)
+        self.assertIn('features/points: 15', summary)
+
+    def test_run(self):
+        """Test the run of the current thread and its dump."""
+        self.assertIsNone(current_metrics())
+
+        # Without run, nothing is measured
+        function = len
+        self.assertIs(timed('len', function), function)
+        with span('nothing') as metrics:
+            self.assertIsNone(metrics)
+        count('nothing')
+
+        @measured('write')
+        def write():
+            count('features', 2)
+            timed('len', len)('abc')
+            return current_metrics()
+
+        dump = tempfile.NamedTemporaryFile(delete=False)
+        dump.close()
+        environ['QUICKOSM_METRICS'] = dump.name
+        try:
+            with measure('query') as metrics:
+                with span('download'):
+                    count('download_bytes', 1024)
+                self.assertIs(write(), metrics)
+        finally:
+            del environ['QUICKOSM_METRICS']
+
+        self.assertIsNone(current_metrics())
+        self.assertListEqual(
+            sorted(metrics.spans.keys()),
+            ['query', 'query/download', 'query/write', 'query/write/len'])
+        self.assertEqual(metrics.counters['download_bytes'], 1024)
+
+        with open(dump.name) as f:
+            lines = f.readlines()
+        remove(dump.name)
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['counters']['features'], 2)
+
+
+if __name__ == '__main__':
+    suite = unittest.makeSuite(TestMetrics)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
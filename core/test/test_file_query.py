@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import unittest
+import shutil
+import tempfile
+from os import remove, utime
+from os.path import join, dirname, abspath, isfile
+
+# This import is to enable SIP API V2
+# noinspection PyUnresolvedReferences
+import qgis  # pylint: disable=unused-import
+from test.utilities import get_qgis_app
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+from QuickOSM.core.file_query import FileQuery, FileQueryCatalogue
+from QuickOSM.core.file_query_index import FileQueryIndex
+
+
+class TestFileQuery(unittest.TestCase):
+
+    def setUp(self):
+        queries = join(dirname(dirname(dirname(abspath(__file__)))), 'queries')
+        self.folder = join(tempfile.mkdtemp(), 'queries')
+        shutil.copytree(queries, self.folder)
+
+    def tearDown(self):
+        shutil.rmtree(dirname(self.folder))
+
+    def test_catalogue(self):
+        """Test the catalogue of queries."""
+        catalogue = FileQueryCatalogue(self.folder)
+        categories = catalogue.scan()
+        self.assertTrue(
+            isfile(join(self.folder, FileQueryCatalogue.INDEX_FILE)))
+        names = [q.getName() for q in categories['Administrative boundary']]
+        self.assertListEqual(names, [u'Municipalities (8) extent'])
+        count = sum(len(queries) for queries in categories.values())
+
+        # A new catalogue reads the index without parsing the INI files
+        catalogue = FileQueryCatalogue(self.folder)
+        categories = catalogue.scan()
+        query = categories['Administrative boundary'][0]
+        self.assertIsNone(query._FileQuery__sections)
+        self.assertEqual(query.getQueryFile(), join(
+            self.folder, 'admin_level8-bbox.xml'))
+        content = query.getContent()
+        self.assertTrue(content['layers']['multipolygons']['load'])
+
+        # Only the modified file is parsed again
+        utime(join(self.folder, 'ecoles-bbox.ini'), (1, 1))
+        other = catalogue.scan()['Administrative boundary'][0]
+        self.assertIs(other, query)
+
+        # A query without its query file is not valid anymore
+        remove(join(self.folder, 'ecoles-bbox.xml'))
+        categories = catalogue.scan()
+        self.assertEqual(
+            sum(len(queries) for queries in categories.values()), count - 1)
+
+    def test_model(self):
+        """Test the model of a query, read again when a file changed."""
+        query = FileQuery(join(self.folder, 'amenity-montpellier.ini'))
+        self.assertTrue(query.isValid())
+        template = query.isTemplate()
+        self.assertTrue(template['nominatim'])
+        self.assertEqual(template['nominatimDefaultValue'], 'montpellier')
+        self.assertFalse(template['bbox'])
+        self.assertIs(query.isTemplate(), template)
+        self.assertEqual(
+            query.getValue('metadata', 'category'), 'Amenity/shop')
+        self.assertFalse(query.getValue('metadata', 'foo'))
+
+        content = query.getContent()
+        self.assertIs(query.getContent(), content)
+        self.assertIsNone(content['layers']['points']['max_columns'])
+
+        # Limits of the columns
+        query = FileQuery(join(self.folder, 'ecoles-bbox.ini'))
+        with open(query.getFilePath()) as f:
+            ini = f.read()
+        with open(query.getFilePath(), 'w') as f:
+            f.write(ini.replace(
+                '[points]\n',
+                '[points]\nmax_columns=20\nmin_fill_rate=0.05\n'))
+        self.assertTrue(query.isValid())
+        layer = query.getContent()['layers']['points']
+        self.assertEqual(layer['max_columns'], 20)
+        self.assertEqual(layer['min_fill_rate'], 0.05)
+
+        query_file = query.getQueryFile()
+        with open(query_file, 'w') as f:
+            f.write('<osm-script><bbox-query {{bbox}}/></osm-script>')
+        utime(query_file, (1, 1))
+        self.assertTrue(query.isTemplate()['bbox'])
+        self.assertIsNot(query.getContent(), content)
+        self.assertIn('{{bbox}}', query.getContent()['metadata']['query'])
+
+    def test_index(self):
+        """Test searching queries."""
+        catalogue = FileQueryCatalogue(self.folder)
+        index = FileQueryIndex()
+        index.update(catalogue.scan())
+
+        def search(text):
+            return sorted(
+                index.queries[path].getName() for path in index.search(text))
+
+        self.assertIsNone(index.search(u' '))
+        self.assertListEqual(search(u'municipalities'), [
+            u'Municipalities (8) extent'])
+
+        # Part of a word, in the category or in the query
+        self.assertIn(u'Tramway nominatim', search(u'ansport'))
+        self.assertIn(u'School bbox', search(u'amenity school'))
+        self.assertListEqual(search(u'amenity foo'), [])
+
+        # Changes in the catalogue
+        with open(join(self.folder, 'ecoles-bbox.ini'), 'a') as f:
+            f.write('\n')
+        remove(join(self.folder, 'amenity-montpellier.xml'))
+        index.update(catalogue.scan())
+        self.assertNotIn(u'Amenity nominatim', search(u'amenity'))
+        self.assertIn(u'School bbox', search(u'school'))
+
+        # A new session reads the words from the catalogue, not the files
+        catalogue = FileQueryCatalogue(self.folder)
+        index = FileQueryIndex()
+        index.update(catalogue.scan())
+        self.assertTrue(all(
+            query._FileQuery__sections is None
+            for query in index.queries.values()))
+        self.assertIn(u'School bbox', search(u'amenity school'))
+
+        # Only the query file changed
+        with open(join(self.folder, 'ecoles-bbox.xml'), 'a') as f:
+            f.write('<!-- k="kindergarten" -->\n')
+        index.update(catalogue.scan())
+        self.assertListEqual(search(u'kindergarten'), [u'School bbox'])
+
+    def test_query_words(self):
+        """Test the OSM keys and values of an OQL query."""
+        words = FileQueryIndex.OQL_TAGS.findall(
+            u'[out:xml];node["addr:street"="Rue"][shop](area.a);way[!name];')
+        self.assertListEqual(
+            words, [(u'"addr:street"', u'"Rue"'), (u'shop', u''),
+                    (u'name', u'')])
+
+if __name__ == '__main__':
+    suite = unittest.makeSuite(TestFileQuery)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
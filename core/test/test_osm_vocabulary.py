@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import unittest
+import json
+import tempfile
+from os import remove
+from os.path import join, dirname, abspath
+
+# This import is to enable SIP API V2
+# noinspection PyUnresolvedReferences
+import qgis  # pylint: disable=unused-import
+from test.utilities import get_qgis_app
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+from QuickOSM.core.osm_vocabulary import OsmVocabulary, PrefixIndex
+
+
+class TestOsmVocabulary(unittest.TestCase):
+
+    def test_prefix_index(self):
+        """Test the completion of words."""
+        index = PrefixIndex([u'bar', u'bank', u'bbq', u'cafe'])
+        self.assertListEqual(index.complete(u'b'), [u'bank', u'bar', u'bbq'])
+        self.assertListEqual(index.complete(u'ba', 1), [u'bank'])
+        self.assertListEqual(index.complete(u'x'), [])
+
+        # The cached completions are updated with the usage
+        index.add(u'bbq', 2)
+        index.add(u'bar', 1)
+        index.add(u'bakery')
+        self.assertListEqual(
+            index.complete(u'b'), [u'bbq', u'bar', u'bakery', u'bank'])
+        self.assertListEqual(index.complete(u'', None)[:2], [u'bbq', u'bar'])
+        self.assertIn(u'bakery', index)
+
+    def test_vocabulary(self):
+        """Test keys and values from mapFeatures.json and the usage."""
+        map_features = join(
+            dirname(dirname(dirname(abspath(__file__)))), 'mapFeatures.json')
+        usage_file = tempfile.NamedTemporaryFile(delete=False).name
+
+        vocabulary = OsmVocabulary(map_features, usage_file)
+        self.assertIn(u'amenity', vocabulary.complete_key(u'am'))
+        self.assertListEqual(
+            vocabulary.complete_value(u'amenity', u'ba'), [u'bank', u'bar'])
+        self.assertListEqual(vocabulary.complete_value(u'foo'), [])
+
+        vocabulary.record(u'amenity', u'bar')
+        vocabulary.record(u'foo', u'bar')
+        with open(usage_file) as f:
+            self.assertDictEqual(json.load(f), {
+                u'amenity': {u'': 1, u'bar': 1},
+                u'foo': {u'': 1, u'bar': 1}})
+
+        vocabulary = OsmVocabulary(map_features, usage_file)
+        self.assertEqual(vocabulary.complete_key(limit=1), [u'amenity'])
+        self.assertListEqual(
+            vocabulary.complete_value(u'amenity', u'ba'), [u'bar', u'bank'])
+        self.assertListEqual(vocabulary.complete_value(u'foo'), [u'bar'])
+        remove(usage_file)
+
+if __name__ == '__main__':
+    suite = unittest.makeSuite(TestOsmVocabulary)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import unittest
+import tempfile
+from os import remove
+
+# This import is to enable SIP API V2
+# noinspection PyUnresolvedReferences
+import qgis  # pylint: disable=unused-import
+from test.utilities import get_qgis_app
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+from QuickOSM.core.place_history import PlaceHistory
+
+
+class TestPlaceHistory(unittest.TestCase):
+
+    def test_ranking(self):
+        """Test the ranking by frequency and recency."""
+        history = PlaceHistory()
+        for place in [u'Paris', u'Lyon', u'Paris', u' ', u'Montpellier']:
+            history.add(place)
+        self.assertListEqual(
+            history.ranked(), [u'Paris', u'Montpellier', u'Lyon'])
+        self.assertListEqual(history.complete(u'm'), [u'Montpellier'])
+        self.assertListEqual(history.complete(u''), history.ranked())
+
+        # Paris is forgotten after many other searches
+        for i in range(30):
+            history.add(u'Lyon')
+        self.assertEqual(history.ranked()[0], u'Lyon')
+        self.assertLess(history.score(u'Paris'), 1)
+
+    def test_size(self):
+        """Test the eviction of the worst places."""
+        history = PlaceHistory()
+        history.add(u'Paris')
+        history.add(u'Paris')
+        for i in range(PlaceHistory.MAX_SIZE):
+            history.add(u'place %s' % i)
+        self.assertEqual(len(history.places), PlaceHistory.MAX_SIZE)
+        self.assertIn(u'Paris', history.places)
+        self.assertNotIn(u'place 0', history.places)
+
+        # A new place replaces the worst one, even with better scores
+        history.places = dict(
+            (u'place %s' % i, (5.0 + i, history.tick))
+            for i in range(PlaceHistory.MAX_SIZE))
+        history.add(u'Lyon')
+        self.assertNotIn(u'place 0', history.places)
+        self.assertEqual(len(history.places), PlaceHistory.MAX_SIZE)
+        self.assertIn(u'Lyon', history.places)
+
+    def test_file(self):
+        """Test reading and writing the history."""
+        legacy = tempfile.NamedTemporaryFile(delete=False)
+        legacy.write('Paris\nLyon\n')
+        legacy.close()
+        file_path = tempfile.mktemp(suffix='.json')
+
+        history = PlaceHistory(file_path)
+        history.import_legacy(legacy.name)
+        self.assertListEqual(history.ranked(), [u'Paris', u'Lyon'])
+        history.add(u'Montpellier')
+
+        history = PlaceHistory(file_path)
+        self.assertListEqual(
+            history.ranked(), [u'Montpellier', u'Paris', u'Lyon'])
+        remove(legacy.name)
+        remove(file_path)
+
+if __name__ == '__main__':
+    suite = unittest.makeSuite(TestPlaceHistory)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -163,6 +163,137 @@ class TestQueryFactory(unittest.TestCase):
                    u'<print mode="meta" /></osm-script>'
         self.assertEqual(query.generate_xml(), expected)
 
+    def test_pretty_xml_as_before(self):
+        """Test the XML written directly against the minidom one."""
+        queries = [
+            QueryFactory(key='foo', value='bar', nominatim='paris'),
+            QueryFactory(key='foo', bbox=True, timeout=35),
+            QueryFactory(
+                key='foo', nominatim='paris;dubai', osm_objects=['node']),
+            QueryFactory(
+                key='foo',
+                is_around=True,
+                distance=1000,
+                print_mode='meta',
+                nominatim='a'),
+            QueryFactory(key='foo', value='bar', bbox=True, geometry='geom')]
+        for query in queries:
+            expected = QueryFactory.get_pretty_xml(query.generate_xml())
+            expected = '\n'.join(expected.split('\n')[1:])
+            expected = QueryFactory.replace_template(expected)
+            expected = expected.replace('\t', '    ')
+            self.assertEqual(query.generate_pretty_xml(), expected)
+
+    def test_generate_pretty_xml(self):
+        """Test generate XML."""
+        query = QueryFactory(
+            key='foo', value='bar', nominatim='paris', timeout=35)
+        expected = u'<osm-script output="xml" timeout="35">\n    ' \
+                   u'<id-query {{geocodeArea:paris}} into="area_0"/>\n    ' \
+                   u'<union>\n'
+        for osm_type in QueryFactory.OSM_TYPES:
+            expected += u'        <query type="%s">\n' \
+                        u'            <has-kv k="foo" v="bar"/>\n' \
+                        u'            <area-query from="area_0"/>\n' \
+                        u'        </query>\n' % osm_type
+        expected += u'    </union>\n    <union>\n        <item/>\n' \
+                    u'        <recurse type="down"/>\n    </union>\n' \
+                    u'    <print mode="body"/>\n</osm-script>\n'
+        self.assertEqual(query.generate_pretty_xml(), expected)
+
+        # The geometries in the elements, without the recurse
+        for geometry, attribute in [('geom', 'full'), ('center', 'center')]:
+            query = QueryFactory(
+                key='foo', bbox=True, osm_objects=['way'], geometry=geometry)
+            expected = u'<osm-script output="xml" timeout="25">\n    ' \
+                       u'<union>\n        <query type="way">\n' \
+                       u'            <has-kv k="foo"/>\n' \
+                       u'            <bbox-query {{bbox}}/>\n' \
+                       u'        </query>\n    </union>\n' \
+                       u'    <print geometry="%s" mode="body"/>\n' \
+                       u'</osm-script>\n' % attribute
+            self.assertEqual(query.generate_pretty_xml(), expected)
+
+    def test_generate_oql(self):
+        """Test generate OQL."""
+        output = u'.result >->.down;\n' \
+                 u'node.result;\nout %s qt;\n' \
+                 u'(node.down; - node.result;);\nout skel qt;\n' \
+                 u'way.result;\nout %s qt;\n' \
+                 u'(way.down; - way.result;);\nout skel qt;\n' \
+                 u'relation.result;\nout %s qt;\n'
+
+        query = QueryFactory(
+            key='foo', value='bar', nominatim='paris', language='oql')
+        expected = u'[out:xml][timeout:25];\n' \
+                   u'{{geocodeArea:paris}}->.searchArea;\n' \
+                   u'nwr["foo"="bar"](area.searchArea)->.result;\n'
+        expected += output % ('body', 'body', 'body')
+        self.assertEqual(query.make(), expected)
+
+        query = QueryFactory(key='foo', bbox=True, timeout=35, language='oql')
+        expected = u'[out:xml][timeout:35];\n' \
+                   u'nwr["foo"]({{bbox}})->.result;\n'
+        expected += output % ('body', 'body', 'body')
+        self.assertEqual(query.make(), expected)
+
+        query = QueryFactory(
+            key='foo',
+            nominatim='paris;dubai',
+            osm_objects=['node'],
+            language='oql')
+        expected = u'[out:xml][timeout:25];\n' \
+                   u'({{geocodeArea:paris}}; {{geocodeArea:dubai}};)' \
+                   u'->.searchArea;\n' \
+                   u'node["foo"](area.searchArea)->.result;\n'
+        expected += output % ('body', 'body', 'body')
+        self.assertEqual(query.make(), expected)
+
+        query = QueryFactory(
+            key='foo',
+            is_around=True,
+            distance=1000,
+            print_mode='meta',
+            nominatim='a;b',
+            osm_objects=['way', 'node'],
+            language='oql')
+        expected = u'[out:xml][timeout:25];\n(\n' \
+                   u'    node["foo"](around:1000,{{geocodeCoords:a}});\n' \
+                   u'    node["foo"](around:1000,{{geocodeCoords:b}});\n' \
+                   u'    way["foo"](around:1000,{{geocodeCoords:a}});\n' \
+                   u'    way["foo"](around:1000,{{geocodeCoords:b}});\n' \
+                   u')->.result;\n'
+        expected += output % ('meta', 'meta', 'meta')
+        self.assertEqual(query.make(), expected)
+
+        query = QueryFactory(
+            key='foo', language='oql', order='id', skeleton=False)
+        expected = u'[out:xml][timeout:25];\n' \
+                   u'nwr["foo"]->.result;\n' \
+                   u'.result >->.down;\n' \
+                   u'node.result;\nout body;\n' \
+                   u'(node.down; - node.result;);\nout body;\n' \
+                   u'way.result;\nout body;\n' \
+                   u'(way.down; - way.result;);\nout body;\n' \
+                   u'relation.result;\nout body;\n'
+        self.assertEqual(query.make(), expected)
+
+        # The coordinates in the ways, without the nodes
+        query = QueryFactory(
+            key='foo', bbox=True, language='oql', geometry='geom')
+        expected = u'[out:xml][timeout:25];\n' \
+                   u'nwr["foo"]({{bbox}})->.result;\n' \
+                   u'.result out body geom qt;\n'
+        self.assertEqual(query.make(), expected)
+
+        # Only the centers of the ways and the relations
+        query = QueryFactory(
+            key='foo', bbox=True, language='oql', geometry='center')
+        expected = u'[out:xml][timeout:25];\n' \
+                   u'nwr["foo"]({{bbox}})->.result;\n' \
+                   u'.result out body center qt;\n'
+        self.assertEqual(query.make(), expected)
+
     def test_make(self):
         """Test make query."""
         query = QueryFactory('foo', 'bar', True)
@@ -181,6 +312,68 @@ class TestQueryFactory(unittest.TestCase):
                    u'<print mode="body"/>\n</osm-script>\n'
         self.assertEqual(query.make(), expected)
 
+        # Many places, with a value to escape
+        query = QueryFactory(
+            key='a&b', nominatim='paris;lyon', osm_objects=['node'])
+        expected = u'<osm-script output="xml" timeout="25">\n    ' \
+                   u'<id-query {{geocodeArea:paris}} into="area_0"/>\n    ' \
+                   u'<id-query {{geocodeArea:lyon}} into="area_1"/>\n    ' \
+                   u'<union>\n        <query type="node">\n            ' \
+                   u'<has-kv k="a&amp;b"/>\n            ' \
+                   u'<area-query from="area_0"/>\n        </query>\n        ' \
+                   u'<query type="node">\n            ' \
+                   u'<has-kv k="a&amp;b"/>\n            ' \
+                   u'<area-query from="area_1"/>\n        </query>\n    ' \
+                   u'</union>\n    <union>\n        <item/>\n        ' \
+                   u'<recurse type="down"/>\n    </union>\n    ' \
+                   u'<print mode="body"/>\n</osm-script>\n'
+        self.assertEqual(query.make(), expected)
+
+        # Around a place
+        query = QueryFactory(
+            key='foo', nominatim='paris', is_around=True, distance=50,
+            osm_objects=['node'], print_mode='meta')
+        expected = u'<osm-script output="xml" timeout="25">\n    ' \
+                   u'<union>\n        <query type="node">\n            ' \
+                   u'<has-kv k="foo"/>\n            ' \
+                   u'<around {{geocodeCoords:paris}} radius="50"/>\n' \
+                   u'        </query>\n    ' \
+                   u'</union>\n    <union>\n        <item/>\n        ' \
+                   u'<recurse type="down"/>\n    </union>\n    ' \
+                   u'<print mode="meta"/>\n</osm-script>\n'
+        self.assertEqual(query.make(), expected)
+
+        # Sorted by quadtile, with the members as skeleton
+        query = QueryFactory(
+            key='foo', bbox=True, osm_objects=['way'], order='quadtile',
+            skeleton=True)
+        expected = u'<osm-script output="xml" timeout="25">\n    ' \
+                   u'<union into="result">\n        ' \
+                   u'<query type="way">\n            ' \
+                   u'<has-kv k="foo"/>\n            ' \
+                   u'<bbox-query {{bbox}}/>\n        </query>\n    ' \
+                   u'</union>\n    ' \
+                   u'<recurse from="result" into="down" type="down"/>\n'
+        for osm_type in ['node', 'way']:
+            expected += u'    <query type="%s">\n' \
+                        u'        <item set="result"/>\n    </query>\n' \
+                        u'    <print mode="body" order="quadtile"/>\n' \
+                        u'    <difference>\n' \
+                        u'        <query type="%s">\n' \
+                        u'            <item set="down"/>\n' \
+                        u'        </query>\n' \
+                        u'        <query type="%s">\n' \
+                        u'            <item set="result"/>\n' \
+                        u'        </query>\n' \
+                        u'    </difference>\n' \
+                        u'    <print mode="skeleton" order="quadtile"/>\n' \
+                        % (osm_type, osm_type, osm_type)
+        expected += u'    <query type="relation">\n' \
+                    u'        <item set="result"/>\n    </query>\n' \
+                    u'    <print mode="body" order="quadtile"/>\n' \
+                    u'</osm-script>\n'
+        self.assertEqual(query.make(), expected)
+
 if __name__ == '__main__':
     suite = unittest.makeSuite(TestQueryFactory)
     runner = unittest.TextTestRunner(verbosity=2)
@@ -38,7 +38,11 @@ from QuickOSM.core.query_parser import (
     replace_geocode_area,
     replace_geocode_coords,
     clean_query,
-    prepare_query
+    is_compatible,
+    prepare_query,
+    add_diff_to_query,
+    prepare_queries,
+    QueryTemplate
 )
 
 
@@ -55,6 +59,32 @@ class TestQueryParser(unittest.TestCase):
         self.assertTrue(is_oql('out skel qt;'))
         self.assertFalse(is_oql('</osm-script>'))
 
+    def test_is_compatible(self):
+        """Test the queries supported by each parser engine."""
+        query = 'node[shop](1,2,3,4);out center;'
+        self.assertTupleEqual(is_compatible(query), (False, 'center'))
+        self.assertTupleEqual(is_compatible(query, 'python'), (True, None))
+        query = 'node[shop]({{data:sql}});out center;'
+        self.assertTupleEqual(
+            is_compatible(query, 'python'), (False, '{{data}}'))
+
+        query = '[out:json][timeout:25];way[a](1,2,3,4);out body geom qt;'
+        self.assertTupleEqual(is_compatible(query), (False, 'geom'))
+        self.assertTupleEqual(is_compatible(query, 'python'), (True, None))
+        query = '<osm-script><print geometry="full" mode="body"/></osm-script>'
+        self.assertTupleEqual(is_compatible(query), (False, 'geom'))
+        query = '[out:xml][timeout:25];way[a]({{center}});out body qt;'
+        self.assertTupleEqual(is_compatible(query), (True, None))
+
+        # The values of the tags are not statements
+        query = '<osm-script><has-kv k="name" v="out of town geom"/>' \
+                '<print mode="body"/></osm-script>'
+        self.assertTupleEqual(is_compatible(query), (True, None))
+        query = 'node["name"="Take out; center"](1,2,3,4);out body;\n'
+        self.assertTupleEqual(is_compatible(query), (True, None))
+        query = 'node[shop](1,2,3,4);out center;\n'
+        self.assertTupleEqual(is_compatible(query), (False, 'center'))
+
     def test_replace_center(self):
         """Test {{center}}."""
         extent = QgsRectangle(10.00, 0.5, 20.00, 1.5)
@@ -227,6 +257,71 @@ class TestQueryParser(unittest.TestCase):
                    '/osm-script>'
         self.assertEqual(prepare_query(query), expected)
 
+    def test_query_template(self):
+        """Test parsing a template once."""
+        query = 'foo{{bbox}}bar{{geocodeArea:paris}}{{center}};'
+        template = QueryTemplate.get(query)
+        self.assertIs(QueryTemplate.get(query), template)
+        self.assertTrue(template.is_oql)
+        self.assertListEqual(
+            template.segments,
+            ['foo',
+             ('bbox', None, '{{bbox}}'),
+             'bar',
+             ('geocodeArea', 'paris', '{{geocodeArea:paris}}'),
+             ('center', None, '{{center}}'),
+             ';'])
+
+        # Only the placeholders are computed for each extent.
+        extent = QgsRectangle(10.00, 0.5, 20.00, 1.5)
+        expected = 'foo0.5,10.0,1.5,20.0bararea(3600007444)1.0,15.0;'
+        geocoded = {('geocodeArea', 'paris'): 7444}
+        self.assertEqual(
+            template.render(extent=extent, geocoded=geocoded), expected)
+
+        extent = QgsRectangle(0.00, 0.00, 2.00, 2.00)
+        expected = 'foo0.0,0.0,2.0,2.0bararea(3600007444)1.0,1.0;'
+        self.assertEqual(
+            template.render(extent=extent, geocoded=geocoded), expected)
+
+    def test_prepare_queries(self):
+        """Test many queries from the same template."""
+        extents = (
+            QgsRectangle(x, 0.0, x + 1.0, 1.0) for x in range(3))
+        queries = prepare_queries('foo{{bbox}}bar;;', extents=extents)
+        self.assertEqual(next(queries), 'foo0.0,0.0,1.0,1.0bar;')
+        self.assertListEqual(
+            list(queries),
+            ['foo0.0,1.0,1.0,2.0bar;', 'foo0.0,2.0,1.0,3.0bar;'])
+
+    def test_add_diff_to_query(self):
+        """Test augmented diff."""
+        timestamp = '2016-05-01T10:00:00Z'
+
+        # XML
+        query = '<osm-script output="xml" timeout="25"><union><query ' \
+                'type="node"><has-kv k="a" v="b"/><area-query from="area_0"' \
+                '/></query></union><print mode="body"/></osm-script>'
+        expected = '<osm-script augmented="deltas" from="2016-05-01T10:00:' \
+                   '00Z" output="xml" timeout="25"><union><query type="node' \
+                   '"><has-kv k="a" v="b"/><area-query from="area_0"/></que' \
+                   'ry></union><print geometry="full" mode="body"/></osm-sc' \
+                   'ript>'
+        self.assertEqual(add_diff_to_query(query, timestamp), expected)
+
+        # OQL with settings
+        query = '[out:xml][timeout:25];node[a=b](1,2,3,4);out body;>;out ' \
+                'skel qt;'
+        expected = '[out:xml][timeout:25][adiff:"2016-05-01T10:00:00Z"];no' \
+                   'de[a=b](1,2,3,4);out body geom;>;out skel qt geom;'
+        self.assertEqual(add_diff_to_query(query, timestamp), expected)
+
+        # OQL without settings
+        query = 'node[a=b](1,2,3,4);out;'
+        expected = '[adiff:"2016-05-01T10:00:00Z"];\nnode[a=b](1,2,3,4);' \
+                   'out geom;'
+        self.assertEqual(add_diff_to_query(query, timestamp), expected)
+
 if __name__ == '__main__':
     suite = unittest.makeSuite(TestQueryParser)
     runner = unittest.TextTestRunner(verbosity=2)
@@ -17,6 +17,7 @@ try:
 
     from processing.outputs.OutputNumber import OutputNumber
     from processing.outputs.OutputFile import OutputFile
+    from processing.outputs.OutputDirectory import OutputDirectory
     from processing.outputs.OutputTable import OutputTable
     from processing.outputs.OutputVector import OutputVector
     from processing.outputs.OutputString import OutputString
@@ -25,6 +25,7 @@ from PyQt4.QtGui import QIcon
 from processing.core.AlgorithmProvider import AlgorithmProvider
 
 from api.overpass_query import OverpassQueryGeoAlgorithm
+from api.overpass_batch_query import OverpassBatchQueryGeoAlgorithm
 from api.xapi_query import XapiQueryGeoAlgorithm
 from api.nominatim_query import NominatimQueryGeoAlgorithm
 from tools.list_ini_files import ListIniFilesGeoAlgorithm
@@ -50,6 +51,7 @@ class QuickOSMAlgorithmProvider(AlgorithmProvider):
         # Load algorithms
         self.alglist = [
             OverpassQueryGeoAlgorithm(),
+            OverpassBatchQueryGeoAlgorithm(),
             NominatimQueryGeoAlgorithm(),
             OsmParserGeoAlgorithm(),
             XapiQueryGeoAlgorithm(),
@@ -30,6 +30,7 @@ from processing.core.GeoAlgorithm import GeoAlgorithm
 from QuickOSM.quick_osm_processing import *
 from QuickOSM.core.api.nominatim import Nominatim
 from QuickOSM.core.exceptions import NominatimAreaException
+from QuickOSM.core.profiling import profiled, algorithm_parameters
 
 
 class NominatimQueryGeoAlgorithm(GeoAlgorithm):
@@ -80,6 +81,7 @@ class NominatimQueryGeoAlgorithm(GeoAlgorithm):
     def getIcon(self):
         return QIcon(dirname(__file__) + '/../../icon.png')
 
+    @profiled('nominatim_query', algorithm_parameters)
     def processAlgorithm(self, progress):
 
         server = self.getParameterValue(self.SERVER)
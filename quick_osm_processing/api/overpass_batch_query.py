@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QuickOSM
+ A QGIS plugin
+ OSM Overpass API frontend
+                             -------------------
+        begin                : 2014-06-11
+        copyright            : (C) 2014 by 3Liz
+        email                : info at 3liz dot com
+        contributor          : Etienne Trimaille
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from os import makedirs
+from os.path import isfile, isdir, join, basename, dirname, abspath
+
+from PyQt4.QtCore import QSettings
+from PyQt4.QtGui import QIcon
+from qgis.core import (
+    QgsGeometry,
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransform)
+from processing.core.GeoAlgorithm import GeoAlgorithm
+
+from QuickOSM.quick_osm_processing import *
+from QuickOSM.core.api.connexion_oapi import ConnexionOAPI
+from QuickOSM.core.query_parser import prepare_queries
+from QuickOSM.core.profiling import profiled, algorithm_parameters
+
+
+class OverpassBatchQueryGeoAlgorithm(GeoAlgorithm):
+    """
+    Perform the same OverPass query on many extents or places.
+    """
+
+    SERVER = 'SERVER'
+    QUERY_STRING = 'QUERY_STRING'
+    EXTENT_LAYER = 'EXTENT_LAYER'
+    NOMINATIM = 'NOMINATIM'
+    OUTPUT_DIRECTORY = 'OUTPUT_DIRECTORY'
+
+    def defineCharacteristics(self):
+        self.name = "Query overpass API with a string, in batch"
+        self.group = "API"
+
+        self.addParameter(
+            ParameterString(
+                self.SERVER,
+                'Overpass API',
+                'http://overpass-api.de/api/',
+                False,
+                False))
+        self.addParameter(
+            ParameterString(
+                self.QUERY_STRING,
+                'Query (XML or OQL)',
+                '',
+                True,
+                False))
+        self.addParameter(
+            ParameterVector(
+                self.EXTENT_LAYER,
+                'If {{bbox}} in the query, one query per feature\'s extent',
+                [ParameterVector.VECTOR_TYPE_ANY],
+                True))
+        self.addParameter(
+            ParameterString(
+                self.NOMINATIM,
+                'If {{nominatim}} in the query, places separated by ";"',
+                '',
+                False,
+                True))
+
+        self.addOutput(
+            OutputDirectory(self.OUTPUT_DIRECTORY, 'Folder of OSM files'))
+
+    def help(self):
+        locale = QSettings().value("locale/userLocale")[0:2]
+        locale += "."
+
+        current_file = __file__
+        if current_file.endswith('pyc'):
+            current_file = current_file[:-1]
+        current_file = basename(current_file)
+
+        helps = [current_file + locale + ".html", current_file + ".html"]
+
+        doc_path = join(dirname(dirname(dirname(abspath(__file__)))), 'doc')
+        for helpFileName in helps:
+            file_help_path = join(doc_path, helpFileName)
+            if isfile(file_help_path):
+                return False, file_help_path
+
+        return False, None
+
+    def getIcon(self):
+        return QIcon(dirname(__file__) + '/../../icon.png')
+
+    @staticmethod
+    def extents(layer):
+        """
+        Extent of each feature in WGS84, read lazily.
+        """
+        crs_transform = QgsCoordinateTransform(
+            layer.crs(), QgsCoordinateReferenceSystem("EPSG:4326"))
+        for feature in vector.features(layer):
+            geometry = QgsGeometry.fromRect(feature.geometry().boundingBox())
+            geometry.transform(crs_transform)
+            yield geometry.boundingBox()
+
+    @profiled('overpass_batch_query', algorithm_parameters)
+    def processAlgorithm(self, progress):
+        progress.setInfo("Preparing the Overpass queries")
+        progress.setPercentage(0)
+
+        server = self.getParameterValue(self.SERVER)
+        query = self.getParameterValue(self.QUERY_STRING)
+        nominatim = self.getParameterValue(self.NOMINATIM)
+        layer = self.getParameterValue(self.EXTENT_LAYER)
+        output_directory = self.getOutputValue(self.OUTPUT_DIRECTORY)
+
+        if not isdir(output_directory):
+            makedirs(output_directory)
+
+        extents = None
+        total = 1
+        if layer:
+            layer = dataobjects.getObjectFromUri(layer)
+            extents = self.extents(layer)
+            total = len(vector.features(layer))
+
+        nominatim_names = None
+        if nominatim:
+            nominatim_names = [
+                name.strip() for name in nominatim.split(';') if name.strip()]
+            total *= len(nominatim_names)
+
+        overpass_api = ConnexionOAPI(url=server, output="xml")
+        queries = prepare_queries(query, extents, nominatim_names)
+        for i, final_query in enumerate(queries):
+            progress.setInfo("Downloading data from Overpass %s/%s" % (
+                i + 1, total))
+            data = overpass_api.query(final_query)
+            with open(join(output_directory, '%s.osm' % i), 'w') as f:
+                f.write(data)
+            progress.setPercentage(int(100 * (i + 1) / total))
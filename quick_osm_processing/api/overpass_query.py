@@ -36,6 +36,7 @@ from processing.core.GeoAlgorithm import GeoAlgorithm
 from QuickOSM.quick_osm_processing import *
 from QuickOSM.core.api.connexion_oapi import ConnexionOAPI
 from QuickOSM.core.query_parser import prepare_query
+from QuickOSM.core.profiling import profiled, algorithm_parameters
 
 
 class OverpassQueryGeoAlgorithm(GeoAlgorithm):
@@ -104,6 +105,7 @@ class OverpassQueryGeoAlgorithm(GeoAlgorithm):
     def getIcon(self):
         return QIcon(dirname(__file__) + '/../../icon.png')
 
+    @profiled('overpass_query', algorithm_parameters)
     def processAlgorithm(self, progress):
         progress.setInfo("Preparing the Overpass query")
         progress.setPercentage(0)
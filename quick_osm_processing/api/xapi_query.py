@@ -29,6 +29,7 @@ from processing.core.GeoAlgorithm import GeoAlgorithm
 
 from QuickOSM.quick_osm_processing import *
 from QuickOSM.core.api.connexion_xapi import ConnexionXAPI
+from QuickOSM.core.profiling import profiled, algorithm_parameters
 
 
 class XapiQueryGeoAlgorithm(GeoAlgorithm):
@@ -83,6 +84,7 @@ class XapiQueryGeoAlgorithm(GeoAlgorithm):
     def getIcon(self):
         return QIcon(dirname(__file__) + '/../../icon.png')
 
+    @profiled('xapi_query', algorithm_parameters)
     def processAlgorithm(self, progress):
         progress.setInfo("Downloading data from XAPI")
 
@@ -29,6 +29,7 @@ from processing.core.GeoAlgorithm import GeoAlgorithm
 
 from QuickOSM.quick_osm_processing import *
 from QuickOSM.core.parser.osm_member_parser import OsmMemberParser
+from QuickOSM.core.profiling import profiled, algorithm_parameters
 
 
 class OsmMemberParserGeoAlgorithm(GeoAlgorithm):
@@ -76,6 +77,7 @@ class OsmMemberParserGeoAlgorithm(GeoAlgorithm):
     def getIcon(self):
         return QIcon(dirname(__file__) + '/../../icon.png')
 
+    @profiled('osm_member_parser', algorithm_parameters)
     def processAlgorithm(self, progress):
         file_path = self.getParameterValue(self.FILE)
 
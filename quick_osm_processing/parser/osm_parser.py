@@ -31,6 +31,7 @@ from processing.core.GeoAlgorithm import GeoAlgorithm
 
 from QuickOSM.quick_osm_processing import *
 from QuickOSM.core.parser.osm_parser import OsmParser
+from QuickOSM.core.profiling import profiled, algorithm_parameters
 
 
 class OsmParserGeoAlgorithm(GeoAlgorithm):
@@ -96,6 +97,7 @@ class OsmParserGeoAlgorithm(GeoAlgorithm):
     def getIcon(self):
         return QIcon(dirname(__file__) + '/../../icon.png')
 
+    @profiled('osm_parser', algorithm_parameters)
     def processAlgorithm(self, progress):
         self.progress = progress
         self.progress.setPercentage(0)
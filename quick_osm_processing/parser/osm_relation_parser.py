@@ -29,6 +29,7 @@ from processing.core.GeoAlgorithm import GeoAlgorithm
 
 from QuickOSM.quick_osm_processing import *
 from QuickOSM.core.parser.osm_relation_parser import OsmRelationParser
+from QuickOSM.core.profiling import profiled, algorithm_parameters
 
 
 class OsmRelationParserGeoAlgorithm(GeoAlgorithm):
@@ -74,6 +75,7 @@ class OsmRelationParserGeoAlgorithm(GeoAlgorithm):
     def getIcon(self):
         return QIcon(dirname(__file__) + '/../../icon.png')
 
+    @profiled('osm_relation_parser', algorithm_parameters)
     def processAlgorithm(self, progress):
         progress.setPercentage(0)
 
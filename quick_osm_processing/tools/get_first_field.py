@@ -28,6 +28,7 @@ from PyQt4.QtGui import QIcon
 from processing.core.GeoAlgorithm import GeoAlgorithm
 
 from QuickOSM.quick_osm_processing import *
+from QuickOSM.core.profiling import profiled, algorithm_parameters
 
 
 class GetFirstFieldGeoAlgorithm(GeoAlgorithm):
@@ -82,6 +83,7 @@ class GetFirstFieldGeoAlgorithm(GeoAlgorithm):
     def getIcon(self):
         return QIcon(dirname(__file__) + '/../../icon.png')
 
+    @profiled('get_first_field', algorithm_parameters)
     def processAlgorithm(self, progress):
         field = self.getParameterValue(self.FIELD)
         layer = self.getParameterValue(self.VECTOR_LAYER)
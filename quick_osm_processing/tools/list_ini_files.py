@@ -30,6 +30,7 @@ from processing.core.GeoAlgorithm import GeoAlgorithm
 from QuickOSM.quick_osm_processing import *
 from QuickOSM.core.file_query import FileQuery
 from QuickOSM.core.utilities.tools import get_user_query_folder
+from QuickOSM.core.profiling import profiled, algorithm_parameters
 
 
 class ListIniFilesGeoAlgorithm(GeoAlgorithm):
@@ -90,6 +91,7 @@ class ListIniFilesGeoAlgorithm(GeoAlgorithm):
     def getIcon(self):
         return QIcon(dirname(__file__) + '/../../icon.png')
 
+    @profiled('list_ini_files', algorithm_parameters)
     def processAlgorithm(self, progress):
 
         index = self.getParameterValue(self.NAME_FILE)
@@ -29,6 +29,7 @@ from processing.core.GeoAlgorithm import GeoAlgorithm
 
 from QuickOSM.quick_osm_processing import *
 from QuickOSM.core.query_factory import QueryFactory
+from QuickOSM.core.profiling import profiled, algorithm_parameters
 
 
 class QueryFactoryGeoAlgorithm(GeoAlgorithm):
@@ -43,6 +44,7 @@ class QueryFactoryGeoAlgorithm(GeoAlgorithm):
         self.FIELD_NOMINATIM = 'FIELD_NOMINATIM'
         self.FIELD_OSM_OBJECTS = 'FIELD_OSM_OBJECTS'
         self.FIELD_TIMEOUT = 'FIELD_TIMEOUT'
+        self.FIELD_LANGUAGE = 'FIELD_LANGUAGE'
         self.OUTPUT_QUERY = 'OUTPUT_QUERY'
         GeoAlgorithm.__init__(self)
 
@@ -83,6 +85,12 @@ class QueryFactoryGeoAlgorithm(GeoAlgorithm):
                 minValue=20,
                 default=25))
 
+        self.addParameter(
+            ParameterSelection(
+                self.FIELD_LANGUAGE,
+                'Query language',
+                QueryFactory.LANGUAGES))
+
         self.addOutput(OutputString(self.OUTPUT_QUERY, "Query"))
 
     def help(self):
@@ -107,6 +115,7 @@ class QueryFactoryGeoAlgorithm(GeoAlgorithm):
     def getIcon(self):
         return QIcon(dirname(__file__) + '/../../icon.png')
 
+    @profiled('query_factory', algorithm_parameters)
     def processAlgorithm(self, progress):
         key = self.getParameterValue(self.FIELD_KEY)
         value = self.getParameterValue(self.FIELD_VALUE)
@@ -120,6 +129,8 @@ class QueryFactoryGeoAlgorithm(GeoAlgorithm):
             value = None
 
         timeout = self.getParameterValue(self.FIELD_TIMEOUT)
+        language = QueryFactory.LANGUAGES[
+            self.getParameterValue(self.FIELD_LANGUAGE)]
 
         # Missing OSMObjects
         query_factory = QueryFactory(
@@ -127,7 +138,8 @@ class QueryFactoryGeoAlgorithm(GeoAlgorithm):
             value=value,
             nominatim=nominatim,
             bbox=extent,
-            timeout=timeout)
+            timeout=timeout,
+            language=language)
 
         query = query_factory.make()
 
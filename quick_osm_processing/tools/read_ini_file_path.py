@@ -29,6 +29,7 @@ from processing.core.GeoAlgorithm import GeoAlgorithm
 
 from QuickOSM.quick_osm_processing import *
 from QuickOSM.core.file_query import FileQuery
+from QuickOSM.core.profiling import profiled, algorithm_parameters
 
 
 class ReadIniFilePathGeoAlgorithm(GeoAlgorithm):
@@ -87,6 +88,7 @@ class ReadIniFilePathGeoAlgorithm(GeoAlgorithm):
     def getIcon(self):
         return QIcon(dirname(__file__) + '/../../icon.png')
 
+    @profiled('read_ini_file_path', algorithm_parameters)
     def processAlgorithm(self, progress):
         progress.setInfo("Reading the ini file")
 
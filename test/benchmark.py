@@ -0,0 +1,348 @@
+# coding=utf-8
+"""Benchmark of the parse and write pipeline.
+
+Each stage runs in its own process, so the peak RSS is the one of the
+stage. The best time of the repetitions is kept.
+
+    python test/benchmark.py --size medium --save results.json
+    python test/benchmark.py --size medium --compare results.json
+    python test/benchmark.py --size medium --geometry
+
+The geometry option compares the files of "out body" with a recurse down
+and of "out geom", with the coordinates in the ways, on the Python engine.
+
+QGIS is needed for the osm_parser and write_layers stages, they are
+skipped if it can't be imported, like NumPy for the stream_parser stage.
+Any other import error fails the run. QGIS_PREFIX_PATH must be set if
+QGIS is not installed in /usr.
+"""
+
+import argparse
+import json
+import re
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+from os.path import dirname, abspath, join, isfile, getsize
+from shutil import rmtree
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+ROOT = dirname(dirname(abspath(__file__)))
+if dirname(ROOT) not in sys.path:
+    sys.path.insert(0, dirname(ROOT))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from test.osm_generator import (  # NOQA
+    generate_osm, generate_boundaries, generate_hstore)
+from test.utilities import test_data_path  # NOQA
+
+# Parameters of generate_osm, small is the fixture in test/data
+DATASETS = {
+    'small': {'nodes': 1000, 'ways': 100, 'relations': 10},
+    'medium': {'nodes': 20000, 'ways': 2000, 'relations': 200},
+    'large': {'nodes': 200000, 'ways': 20000, 'relations': 2000},
+    'boundaries': {'nodes': 100000, 'ways': 4000, 'relations': 200},
+}
+
+# Datasets made by another generator, like admin-boundary responses
+GENERATORS = {
+    'boundaries': generate_boundaries,
+}
+
+STAGES = [
+    'pghstore', 'relation_parser', 'member_parser', 'osm_parser',
+    'stream_parser', 'write_layers']
+
+LAYERS = ['points', 'lines', 'multilinestrings', 'multipolygons']
+
+# Dependencies which may be missing, the stages needing them are skipped
+OPTIONAL_MODULES = ['qgis', 'PyQt4', 'processing', 'osgeo', 'numpy']
+
+
+def peak_rss():
+    """Peak resident memory of the process in MB, None if unknown."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return rss / 1024.0 / 1024.0
+    return rss / 1024.0
+
+
+def dataset_key(name, skeleton=False, geometry=False):
+    """Name of a variant of a dataset, in the results and the files."""
+    return name + ('_skeleton' if skeleton else '') + (
+        '_geometry' if geometry else '')
+
+
+def get_dataset(name, skeleton, folder, geometry=False):
+    """Path of the OSM file of a dataset, generated if needed."""
+    if name == 'small' and not skeleton and not geometry:
+        return test_data_path('benchmark_small.osm')
+
+    path = join(folder, '%s.osm' % dataset_key(name, skeleton, geometry))
+    if not isfile(path):
+        if geometry:
+            # The other generators don't write the coordinates in the ways
+            generate_osm(
+                path, skeleton=skeleton, geometry=True, **DATASETS[name])
+        else:
+            generator = GENERATORS.get(name, generate_osm)
+            generator(path, skeleton=skeleton, **DATASETS[name])
+    return path
+
+
+def init_qgis():
+    from QuickOSM.controller.cli import init_qgis as init
+    init()
+
+
+def stage_pghstore(osm_file, dataset, output_dir):
+    from QuickOSM.core.parser import pghstore
+
+    values = generate_hstore(sum(dataset.values()))
+    start = time.time()
+    for value in values:
+        pghstore.loads(value)
+    return time.time() - start, len(values)
+
+
+def stage_relation_parser(osm_file, dataset, output_dir):
+    from QuickOSM.core.parser.osm_relation_parser import OsmRelationParser
+
+    start = time.time()
+    features = len(list(OsmRelationParser(osm_file).parse()))
+    return time.time() - start, features
+
+
+def stage_member_parser(osm_file, dataset, output_dir):
+    from QuickOSM.core.parser.osm_member_parser import OsmMemberParser
+
+    start = time.time()
+    features = len(list(OsmMemberParser(osm_file).parse()))
+    return time.time() - start, features
+
+
+def stage_osm_parser(osm_file, dataset, output_dir):
+    init_qgis()
+    from QuickOSM.core.parser.osm_parser import OsmParser
+
+    start = time.time()
+    layers = OsmParser(osm_file, layers=LAYERS).parse()
+    features = sum(layer['featureCount'] for layer in layers.values())
+    return time.time() - start, features
+
+
+def stage_stream_parser(osm_file, dataset, output_dir):
+    init_qgis()
+    from QuickOSM.core.parser.osm_parser import OsmParser
+
+    start = time.time()
+    layers = OsmParser(osm_file, layers=LAYERS, engine='python').parse()
+    features = sum(layer['featureCount'] for layer in layers.values())
+    return time.time() - start, features
+
+
+def stage_write_layers(osm_file, dataset, output_dir):
+    init_qgis()
+    from QuickOSM.controller.process import write_layers
+
+    # The features are the elements of the file, parsed and written
+    start = time.time()
+    write_layers(
+        osm_file=osm_file,
+        output_geom_types=LAYERS,
+        output_format='geojson',
+        output_dir=tempfile.mkdtemp(dir=output_dir))
+    return time.time() - start, sum(dataset.values())
+
+
+def missing_module(error):
+    """Top level module of an ImportError, like qgis for qgis.core."""
+    match = re.match(r'No module named ([\w.]+)', str(error))
+    if match:
+        return match.group(1).split('.')[0]
+    return None
+
+
+def run_stage(args):
+    """Run a stage in a worker process."""
+    stage, osm_file, dataset, output_dir = args
+    try:
+        function = globals()['stage_' + stage]
+        elapsed, features = function(osm_file, dataset, output_dir)
+    except ImportError as e:
+        if missing_module(e) in OPTIONAL_MODULES:
+            return {'skipped': str(e)}
+        return {'error': str(e)}
+    return {'seconds': elapsed, 'features': features, 'rss': peak_rss()}
+
+
+def run_benchmark(names, stages, repeat=3, skeleton=False, geometry=False):
+    """Run the stages on the datasets.
+
+    :param geometry: Use the files with the coordinates in the ways.
+    :type geometry: bool
+
+    :return: Results keyed by dataset then by stage.
+    :rtype: dict
+    """
+    folder = tempfile.mkdtemp(prefix='quickosm_benchmark_')
+    results = {}
+    try:
+        for name in names:
+            osm_file = get_dataset(name, skeleton, folder, geometry)
+            key = dataset_key(name, skeleton, geometry)
+            results[key] = {}
+            for stage in stages:
+                runs = []
+                for _ in range(repeat):
+                    # A new process for each run, to measure its own peak
+                    pool = Pool(1)
+                    runs.append(pool.apply(
+                        run_stage,
+                        ((stage, osm_file, DATASETS[name], folder),)))
+                    pool.close()
+                    pool.join()
+                    if 'skipped' in runs[-1] or 'error' in runs[-1]:
+                        break
+
+                if 'skipped' in runs[-1] or 'error' in runs[-1]:
+                    results[key][stage] = runs[-1]
+                    continue
+
+                best = min(runs, key=lambda r: r['seconds'])
+                seconds = max(best['seconds'], 1e-9)
+                results[key][stage] = {
+                    'seconds': round(best['seconds'], 4),
+                    'features': best['features'],
+                    'features_per_second': round(
+                        best['features'] / seconds, 1),
+                    'rss_mb': max(r['rss'] for r in runs),
+                    'bytes': getsize(osm_file),
+                }
+    finally:
+        rmtree(folder, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Find the stages slower or using more memory than the baseline.
+
+    :param tolerance: Ratio of change allowed, 0.2 for 20%.
+    :type tolerance: float
+
+    :return: List of (dataset, stage, message).
+    :rtype: list
+    """
+    regressions = []
+    for name, stages in results.items():
+        for stage, result in stages.items():
+            base = baseline.get(name, {}).get(stage)
+            if not base or 'seconds' not in result or 'seconds' not in base:
+                continue
+
+            speed = result['features_per_second']
+            base_speed = base['features_per_second']
+            if speed < base_speed * (1 - tolerance):
+                regressions.append((name, stage, '%.0f features/s, %.0f in '
+                                    'the baseline' % (speed, base_speed)))
+
+            rss = result['rss_mb']
+            base_rss = base['rss_mb']
+            if rss and base_rss and rss > base_rss * (1 + tolerance):
+                regressions.append((name, stage, '%.1f MB, %.1f MB in the '
+                                    'baseline' % (rss, base_rss)))
+    return regressions
+
+
+def print_results(results):
+    line = '%-24s %-16s %10s %10s %14s %10s %12s'
+    print line % (
+        'dataset', 'stage', 'features', 'seconds', 'features/s', 'RSS MB',
+        'bytes')
+    for name in sorted(results):
+        for stage in STAGES:
+            result = results[name].get(stage)
+            if result is None:
+                continue
+            if 'skipped' in result or 'error' in result:
+                status = 'skipped' if 'skipped' in result else 'error'
+                print '%-24s %-16s %s: %s' % (
+                    name, stage, status, result[status])
+                continue
+            rss = result['rss_mb']
+            print line % (
+                name, stage, result['features'], '%.3f' % result['seconds'],
+                '%.0f' % result['features_per_second'],
+                '-' if rss is None else '%.1f' % rss,
+                result.get('bytes', '-'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark of the QuickOSM parse and write pipeline.')
+    parser.add_argument(
+        '--size', choices=sorted(DATASETS), action='append',
+        help='dataset, small by default, can be repeated')
+    parser.add_argument(
+        '--stage', choices=STAGES, action='append',
+        help='stage to run, all by default, can be repeated')
+    parser.add_argument(
+        '--skeleton', action='store_true',
+        help='also run on files without tags on members nor metadata, '
+             'like the skeleton mode of the queries')
+    parser.add_argument(
+        '--geometry', action='store_true',
+        help='also run the stream_parser stage on files with the '
+             'coordinates in the ways, like "out geom" queries')
+    parser.add_argument(
+        '--repeat', type=int, default=3, help='runs of each stage')
+    parser.add_argument('--save', help='write the results in a JSON file')
+    parser.add_argument(
+        '--compare', help='JSON file of a previous run, used as baseline')
+    parser.add_argument(
+        '--tolerance', type=float, default=0.2,
+        help='ratio of slowdown or memory growth allowed, 0.2 by default')
+    args = parser.parse_args(argv)
+
+    names = args.size or ['small']
+    stages = args.stage or STAGES
+    results = run_benchmark(names, stages, args.repeat)
+    if args.skeleton:
+        results.update(run_benchmark(names, stages, args.repeat, True))
+    if args.geometry:
+        # OGR needs the nodes of the ways, only the Python engine reads it
+        results.update(run_benchmark(
+            names, ['stream_parser'], args.repeat, geometry=True))
+
+    print_results(results)
+
+    # A stage which can't be imported is a failure, not a skip
+    failed = any(
+        'error' in result
+        for stages in results.values() for result in stages.values())
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, stage, message in regressions:
+            print 'REGRESSION %s %s: %s' % (name, stage, message)
+        if regressions:
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,300 @@
+# coding=utf-8
+"""Generate synthetic OSM XML files for tests and benchmarks."""
+
+import io
+import random
+from xml.sax.saxutils import quoteattr
+
+# Keys and values used for the tags, the first key is always used.
+TAGS = [
+    ('name', None),
+    ('amenity', ['school', 'restaurant', 'bench', 'parking', 'cafe']),
+    ('highway', ['residential', 'primary', 'footway', 'service']),
+    ('building', ['yes', 'house', 'apartments']),
+    ('landuse', ['forest', 'meadow', 'residential']),
+    ('colour', ['red', 'blue', '#00ff00']),
+    ('website', ['http://www.openstreetmap.org']),
+    ('network', ['Tisseo', 'TCL']),
+    ('ref', None),
+    ('addr:street', None),
+    ('addr:housenumber', None),
+    ('source', ['survey', 'cadastre']),
+    ('note', None),
+    ('wikipedia', ['fr:Toulouse', 'fr:Lyon']),
+    ('opening_hours', ['Mo-Fr 08:00-18:00', '24/7']),
+    ('surface', ['asphalt', 'gravel']),
+]
+
+
+def generate_osm(
+        path,
+        nodes=1000,
+        ways=100,
+        relations=10,
+        tag_density=0.5,
+        tags_per_element=4,
+        way_size=8,
+        skeleton=False,
+        geometry=False,
+        seed=0):
+    """Write a synthetic OSM file, ordered by nodes, ways and relations.
+
+    Ways are made of consecutive nodes, one way out of two is closed.
+    Relations are multipolygons of closed ways.
+
+    :param path: Path of the OSM file to write.
+    :type path: str
+
+    :param nodes: Number of nodes.
+    :type nodes: int
+
+    :param ways: Number of ways.
+    :type ways: int
+
+    :param relations: Number of relations.
+    :type relations: int
+
+    :param tag_density: Ratio of nodes with tags. Ways and relations
+        always have tags.
+    :type tag_density: float
+
+    :param tags_per_element: Maximum number of tags of an element.
+    :type tags_per_element: int
+
+    :param way_size: Number of nodes of a way.
+    :type way_size: int
+
+    :param skeleton: Like the skeleton mode of Overpass, the nodes used by
+        ways don't have tags and no element has metadata.
+    :type skeleton: bool
+
+    :param geometry: Like "out geom", the coordinates are in the ways and
+        the members, only the nodes with tags are written.
+    :type geometry: bool
+
+    :param seed: Seed of the random generator, the same file is generated
+        with the same parameters.
+    :type seed: int
+
+    :return: Number of nodes, ways and relations written.
+    :rtype: dict
+    """
+    rand = random.Random(seed)
+    way_size = max(2, min(way_size, nodes))
+    meta = u'' if skeleton else \
+        u' version="1" timestamp="2015-10-19T14:46:02Z" uid="1" user="qgis"'
+
+    def write_tags(f, element_id):
+        count = rand.randint(1, tags_per_element)
+        for key, values in TAGS[:1] + rand.sample(TAGS[1:], count - 1):
+            if values:
+                value = rand.choice(values)
+            else:
+                value = u'%s %s' % (key, element_id)
+            f.write(u'    <tag k=%s v=%s/>\n' % (
+                quoteattr(key), quoteattr(value)))
+
+    side = int(nodes ** 0.5) + 1
+
+    def coordinates(node_id):
+        return (43.5 + (node_id // side) * 0.0001,
+                1.4 + (node_id % side) * 0.0001)
+
+    def way_refs(way_id):
+        first = ((way_id - 1) * way_size) % (nodes - way_size + 1) + 1
+        refs = range(first, first + way_size)
+        if way_id % 2:
+            refs.append(first)
+        return refs
+
+    def write_nds(f, refs, indent):
+        for ref in refs:
+            if geometry:
+                f.write(u'%s<nd ref="%s" lat="%.7f" lon="%.7f"/>\n' % (
+                    (indent, ref) + coordinates(ref)))
+            else:
+                f.write(u'%s<nd ref="%s"/>\n' % (indent, ref))
+
+    with io.open(path, 'w', encoding='utf-8') as f:
+        f.write(u'<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write(u'<osm version="0.6" generator="QuickOSM generator">\n')
+        f.write(u'<meta osm_base="2015-10-19T14:46:02Z"/>\n')
+
+        used = way_size * ways if skeleton else 0
+        for i in range(1, nodes + 1):
+            attributes = u'id="%s" lat="%.7f" lon="%.7f"%s' % (
+                (i, ) + coordinates(i) + (meta, ))
+            if i > used and rand.random() < tag_density:
+                f.write(u'  <node %s>\n' % attributes)
+                write_tags(f, i)
+                f.write(u'  </node>\n')
+            elif not geometry:
+                f.write(u'  <node %s/>\n' % attributes)
+
+        for i in range(1, ways + 1):
+            f.write(u'  <way id="%s"%s>\n' % (i, meta))
+            write_nds(f, way_refs(i), u'    ')
+            write_tags(f, i)
+            f.write(u'  </way>\n')
+
+        closed = range(1, ways + 1, 2)
+        for i in range(1, relations + 1):
+            f.write(u'  <relation id="%s"%s>\n' % (i, meta))
+            if closed:
+                outer = closed[(i - 1) % len(closed)]
+                if geometry:
+                    f.write(u'    <member type="way" ref="%s" '
+                            u'role="outer">\n' % outer)
+                    write_nds(f, way_refs(outer), u'      ')
+                    f.write(u'    </member>\n')
+                else:
+                    f.write(u'    <member type="way" ref="%s" '
+                            u'role="outer"/>\n' % outer)
+            f.write(u'    <tag k="type" v="multipolygon"/>\n')
+            write_tags(f, i)
+            f.write(u'  </relation>\n')
+
+        f.write(u'</osm>\n')
+
+    return {'nodes': nodes, 'ways': ways, 'relations': relations}
+
+
+def generate_boundaries(
+        path,
+        nodes=4000,
+        ways=200,
+        relations=10,
+        skeleton=False,
+        seed=0):
+    """Write a synthetic OSM file of administrative boundaries.
+
+    Each relation is a square split into open ways, reversed one out of
+    three and in a random order, like the boundaries returned by
+    Overpass. With enough ways, a relation also has a square hole.
+
+    :param path: Path of the OSM file to write.
+    :type path: str
+
+    :param nodes: Number of nodes, about.
+    :type nodes: int
+
+    :param ways: Number of ways, about.
+    :type ways: int
+
+    :param relations: Number of relations.
+    :type relations: int
+
+    :param skeleton: If no element has metadata.
+    :type skeleton: bool
+
+    :param seed: Seed of the random generator.
+    :type seed: int
+
+    :return: Number of nodes, ways and relations written.
+    :rtype: dict
+    """
+    rand = random.Random(seed)
+    meta = u'' if skeleton else \
+        u' version="1" timestamp="2015-10-19T14:46:02Z" uid="1" user="qgis"'
+    ways_per_relation = max(ways // relations, 2)
+    if ways_per_relation >= 4:
+        rings = [ways_per_relation - 2, 2]
+    else:
+        rings = [ways_per_relation]
+    segments = max(nodes // relations // ways_per_relation, 1)
+
+    side = int(relations ** 0.5) + 1
+    all_nodes = []
+    all_ways = []
+    all_relations = []
+    for i in range(relations):
+        x = 1.4 + (i % side) * 0.01
+        y = 43.5 + (i // side) * 0.01
+        members = []
+        for ring, ring_ways in enumerate(rings):
+            # The outer square, then a hole half as big
+            margin = 0.001 if ring == 0 else 0.003
+            size = 0.01 - 2 * margin
+            count = ring_ways * segments
+            first = len(all_nodes) + 1
+            for j in range(count):
+                t = 4.0 * j / count
+                side_index = int(t)
+                d = (t - side_index) * size
+                dx, dy = [
+                    (d, 0), (size, d), (size - d, size), (0, size - d)
+                ][side_index]
+                all_nodes.append((x + margin + dx, y + margin + dy))
+
+            for j in range(ring_ways):
+                refs = [
+                    first + (j * segments + k) % count
+                    for k in range(segments + 1)]
+                if len(all_ways) % 3 == 2:
+                    refs.reverse()
+                all_ways.append(refs)
+                members.append((len(all_ways), 'outer' if ring == 0 else
+                                'inner'))
+        rand.shuffle(members)
+        all_relations.append(members)
+
+    with io.open(path, 'w', encoding='utf-8') as f:
+        f.write(u'<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write(u'<osm version="0.6" generator="QuickOSM generator">\n')
+        f.write(u'<meta osm_base="2015-10-19T14:46:02Z"/>\n')
+
+        for i, (lon, lat) in enumerate(all_nodes):
+            f.write(u'  <node id="%s" lat="%.7f" lon="%.7f"%s/>\n' % (
+                i + 1, lat, lon, meta))
+
+        for i, refs in enumerate(all_ways):
+            f.write(u'  <way id="%s"%s>\n' % (i + 1, meta))
+            for ref in refs:
+                f.write(u'    <nd ref="%s"/>\n' % ref)
+            f.write(u'    <tag k="boundary" v="administrative"/>\n')
+            f.write(u'    <tag k="admin_level" v="8"/>\n')
+            f.write(u'  </way>\n')
+
+        for i, members in enumerate(all_relations):
+            f.write(u'  <relation id="%s"%s>\n' % (i + 1, meta))
+            for ref, role in members:
+                f.write(u'    <member type="way" ref="%s" role="%s"/>\n' % (
+                    ref, role))
+            f.write(u'    <tag k="type" v="boundary"/>\n')
+            f.write(u'    <tag k="boundary" v="administrative"/>\n')
+            f.write(u'    <tag k="admin_level" v="8"/>\n')
+            f.write(u'    <tag k="name" v="Commune %s"/>\n' % (i + 1))
+            f.write(u'  </relation>\n')
+        f.write(u'</osm>\n')
+
+    return {
+        'nodes': len(all_nodes),
+        'ways': len(all_ways),
+        'relations': len(all_relations)}
+
+
+def generate_hstore(count, tags_per_element=4, seed=0):
+    """Generate other_tags values, as written by the OGR OSM driver.
+
+    :param count: Number of values.
+    :type count: int
+
+    :param tags_per_element: Maximum number of tags in a value.
+    :type tags_per_element: int
+
+    :param seed: Seed of the random generator.
+    :type seed: int
+
+    :return: The hstore strings.
+    :rtype: list
+    """
+    rand = random.Random(seed)
+    values = []
+    for i in range(count):
+        tags = []
+        for key, choices in rand.sample(
+                TAGS, rand.randint(1, tags_per_element)):
+            value = rand.choice(choices) if choices else '%s "%s"' % (key, i)
+            tags.append('"%s"=>"%s"' % (key, value.replace('"', '\\"')))
+        values.append(','.join(tags))
+    return values
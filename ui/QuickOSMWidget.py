@@ -22,11 +22,16 @@
 """
 
 import logging
-from os.path import split, join, isfile
+from os.path import split
 from sys import exc_info
 
-from PyQt4.QtGui import \
-    QWidget, QFileDialog, QApplication, QDesktopServices, QCompleter
+from PyQt4.QtGui import (
+    QWidget,
+    QFileDialog,
+    QApplication,
+    QDesktopServices,
+    QCompleter,
+    QStringListModel)
 from PyQt4.QtCore import QUrl
 from qgis.utils import iface
 from qgis.gui import QgsMessageBar
@@ -38,18 +43,21 @@ from qgis.core import (
 )
 
 from QuickOSM.core.utilities.utilities_qgis import display_message_bar
-from QuickOSM.core.utilities.tools import tr, get_QuickOSM_folder
-from QuickOSM.core.exceptions import NoLayerException
+from QuickOSM.core.utilities.tools import tr
+from QuickOSM.core.place_history import PlaceHistory
+from QuickOSM.core.exceptions import NoLayerException, QuickOsmException
+from QuickOSM.controller.process import load_layers
+from QuickOSM.controller.progress import QtProgress
+from QuickOSM.controller.worker import QueryWorker
 
 LOGGER = logging.getLogger('QuickOSM')
 
 
 class QuickOSMWidget(QWidget):
     def __init__(self, parent=None):
-        self.last_places = []
-        self.last_nominatim_places_filepath = join(
-            get_QuickOSM_folder(),
-            'nominatim.txt')
+        self.place_history = PlaceHistory.get()
+        self.nominatim_model = None
+        self.worker = None
         QWidget.__init__(self, parent)
 
         registry = QgsMapLayerRegistry.instance()
@@ -57,38 +65,26 @@ class QuickOSMWidget(QWidget):
         registry.layersRemoved.connect(self.activate_extent_layer)
 
     def init_nominatim_autofill(self):
-
-        # Usefull to avoid duplicate if we add a new completer.
-        self.lineEdit_nominatim.setCompleter(None)
-        self.last_places = []
-
-        if isfile(self.last_nominatim_places_filepath):
-            for line in open(self.last_nominatim_places_filepath, 'r'):
-                self.last_places.append(line.rstrip('\n'))
-
-            nominatim_completer = QCompleter(self.last_places)
+        if self.nominatim_model is None:
+            self.nominatim_model = QStringListModel(self)
+            nominatim_completer = QCompleter(self.nominatim_model, self)
             self.lineEdit_nominatim.setCompleter(nominatim_completer)
             self.lineEdit_nominatim.completer().setCompletionMode(
                 QCompleter.PopupCompletion)
-        else:
-            open(self.last_nominatim_places_filepath, 'a').close()
+            self.lineEdit_nominatim.textEdited.connect(self.nominatim_edited)
 
-    @staticmethod
-    def sort_nominatim_places(existing_places, place):
-        if place in existing_places:
-            existing_places.pop(existing_places.index(place))
-        existing_places.insert(0, place)
-        return existing_places[:10]
+        self.nominatim_edited()
+
+    def nominatim_edited(self):
+        """
+        Update the completion of the place with the best places
+        """
+        place = unicode(self.lineEdit_nominatim.text())
+        self.nominatim_model.setStringList(self.place_history.complete(place))
 
     def nominatim_value(self):
         value = unicode(self.lineEdit_nominatim.text())
-        new_list = self.sort_nominatim_places(self.last_places, value)
-
-        f = open(self.last_nominatim_places_filepath, 'w')
-        for item in new_list:
-            f.write("%s\n" % item.encode("UTF-8"))
-        f.close()
-
+        self.place_history.add(value)
         self.init_nominatim_autofill()
 
         return value
@@ -221,6 +217,112 @@ class QuickOSMWidget(QWidget):
         self.progressBar_execution.setValue(100)
         QApplication.processEvents()
 
+    def connect_progress(self, progress=None):
+        """
+        Display the progress sent by a QtProgress in this widget
+
+        @param progress: a new QtProgress by default
+        @type progress: QtProgress
+
+        @return: the progress, to give to the process
+        @rtype: QtProgress
+        """
+        if progress is None:
+            progress = QtProgress()
+        progress.signalText.connect(self.set_progress_text)
+        progress.signalPercentage.connect(self.set_progress_percentage)
+        return progress
+
+    def start_worker(self, function, slot=None, **kwargs):
+        """
+        Run a function of the process in a worker thread.
+
+        The run button can cancel the query while it is running.
+
+        @param function: prepare_layers or a function returning its result
+        @type function: function
+
+        @param slot: called with the result in the main thread,
+            query_finished by default
+        @type slot: function
+        """
+        self.worker = QueryWorker(function, **kwargs)
+        self.connect_progress(self.worker.progress)
+        self.worker.signalFinished.connect(slot or self.query_finished)
+        self.worker.signalError.connect(self.query_error)
+        self.worker.finished.connect(self.query_ended)
+
+        self.pushButton_runQuery.setDisabled(False)
+        self.pushButton_runQuery.setText(tr('QuickOSM', 'Cancel'))
+        self.worker.start()
+
+    def cancel_worker(self):
+        """
+        Cancel the running query, if any
+
+        @return: if a query was running
+        @rtype: bool
+        """
+        if self.worker is None:
+            return False
+
+        self.worker.cancel()
+        self.pushButton_runQuery.setDisabled(True)
+        self.pushButton_runQuery.setText(tr('QuickOSM', 'Cancelling ...'))
+        return True
+
+    def query_finished(self, result):
+        """
+        Slot to load the layers in the main thread, at the end of the query
+
+        @param result: parameters of load_layers
+        @type result: dict
+
+        @return: number of layers loaded
+        @rtype: int
+        """
+        num_layers = load_layers(**result)
+
+        # We can test numLayers to see if there are some results
+        if num_layers:
+            self.label_progress.setText(tr('QuickOSM', u'Successful query !'))
+
+            display_message_bar(
+                tr('QuickOSM', u'Successful query !'),
+                level=QgsMessageBar.INFO,
+                duration=5)
+        else:
+            self.label_progress.setText(tr("QuickOSM", u'No result'))
+
+            display_message_bar(
+                tr('QuickOSM', u'Successful query, but no result.'),
+                level=QgsMessageBar.WARNING,
+                duration=7)
+        return num_layers
+
+    def query_error(self, e):
+        """
+        Slot to display an exception raised in the worker thread
+        """
+        if isinstance(e, QuickOsmException):
+            self.display_geo_algorithm_exception(e)
+        else:
+            print self.worker.traceback
+            LOGGER.debug(self.worker.traceback)
+
+            display_message_bar(
+                tr('QuickOSM',
+                   'Error in the python console, please report it'),
+                level=QgsMessageBar.CRITICAL,
+                duration=5)
+
+    def query_ended(self):
+        """
+        Slot called when the worker thread is finished
+        """
+        self.worker = None
+        self.end_process()
+
     def set_progress_percentage(self, percent):
         """
         Slot to update percentage during process
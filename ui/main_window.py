@@ -168,6 +168,14 @@ class Ui_ui_main_window(object):
         self.radioButton_outputShape.setObjectName(_fromUtf8("radioButton_outputShape"))
         self.verticalLayout_11.addWidget(self.radioButton_outputShape)
         self.verticalLayout_2.addWidget(self.groupBox_7)
+        self.groupBox_9 = QtGui.QGroupBox(self.parameters)
+        self.groupBox_9.setObjectName(_fromUtf8("groupBox_9"))
+        self.verticalLayout_14 = QtGui.QVBoxLayout(self.groupBox_9)
+        self.verticalLayout_14.setObjectName(_fromUtf8("verticalLayout_14"))
+        self.checkBox_profile = QtGui.QCheckBox(self.groupBox_9)
+        self.checkBox_profile.setObjectName(_fromUtf8("checkBox_profile"))
+        self.verticalLayout_14.addWidget(self.checkBox_profile)
+        self.verticalLayout_2.addWidget(self.groupBox_9)
         spacerItem1 = QtGui.QSpacerItem(20, 40, QtGui.QSizePolicy.Minimum, QtGui.QSizePolicy.Expanding)
         self.verticalLayout_2.addItem(spacerItem1)
         self.stackedWidget.addWidget(self.parameters)
@@ -411,6 +419,8 @@ class Ui_ui_main_window(object):
         self.groupBox_7.setTitle(_translate("ui_main_window", "Outputs", None))
         self.radioButton_outputJson.setText(_translate("ui_main_window", "GeoJSON (not editable, column\'s name longer)", None))
         self.radioButton_outputShape.setText(_translate("ui_main_window", "Shapefile (editable, column\'s name shorter)", None))
+        self.groupBox_9.setTitle(_translate("ui_main_window", "Debug", None))
+        self.checkBox_profile.setText(_translate("ui_main_window", "Profile the queries in the QuickOSM folder", None))
         self.pushButton_homeHelp.setText(_translate("ui_main_window", "Home", None))
         self.groupBox_2.setTitle(_translate("ui_main_window", "Realization", None))
         self.groupBox_5.setTitle(_translate("ui_main_window", "Supervision", None))
@@ -29,6 +29,7 @@ from main_window import Ui_ui_main_window
 from QuickOSM.core.api.connexion_oapi import ConnexionOAPI
 from QuickOSM.core.utilities.tools import get_setting, set_setting, tr
 from QuickOSM.core.utilities.tools import get_user_query_folder
+from QuickOSM.core.profiling import is_profile_enabled
 
 
 class MainWindowDialog(QDialog, Ui_ui_main_window):
@@ -66,6 +67,8 @@ class MainWindowDialog(QDialog, Ui_ui_main_window):
             self.restore_default_queries)
         # noinspection PyUnresolvedReferences
         self.radioButton_outputJson.toggled.connect(self.set_output_format)
+        # noinspection PyUnresolvedReferences
+        self.checkBox_profile.toggled.connect(self.set_profile)
 
         # Set settings about the overpass API
         self.defaultServer = get_setting('defaultOAPI')
@@ -86,6 +89,9 @@ class MainWindowDialog(QDialog, Ui_ui_main_window):
             set_setting('outputFormat', 'shape')
             self.radioButton_outputShape.setChecked(True)
 
+        # Set settings about the profiling
+        self.checkBox_profile.setChecked(is_profile_enabled())
+
         # Set minimum width for the menu
         self.listWidget.setMinimumWidth(
             self.listWidget.sizeHintForColumn(0) + 10)
@@ -148,6 +154,12 @@ class MainWindowDialog(QDialog, Ui_ui_main_window):
         else:
             set_setting('outputFormat', 'shape')
 
+    def set_profile(self):
+        """
+        Save if the queries are profiled
+        """
+        set_setting('profile', self.checkBox_profile.isChecked())
+
     def restore_default_queries(self):
         """
         Overwrite all queries
@@ -25,19 +25,26 @@ import re
 from os.path import isdir
 from PyQt4.QtCore import pyqtSignal, QFile, Qt
 from PyQt4.QtGui import \
-    QTreeWidgetItem, QMenu, QAction, QMessageBox, QApplication, QDockWidget
+    QTreeWidgetItem, QMenu, QAction, QMessageBox, QDockWidget
 from qgis.utils import iface
 from qgis.gui import QgsMessageBar
 
 from QuickOSMWidget import QuickOSMWidget
 from my_queries import Ui_ui_my_queries
-from QuickOSM.controller.process import process_query
+from QuickOSM.controller.process import (
+    prepare_layers,
+    prepare_update,
+    apply_update,
+    get_update_queries,
+    get_updatable_layers)
 from QuickOSM.core.exceptions import (
     QuickOsmException,
     OutPutGeomTypesException,
     DirectoryOutPutException,
-    MissingParameterException)
+    MissingParameterException,
+    NoLayerException)
 from QuickOSM.core.file_query import FileQuery
+from QuickOSM.core.file_query_index import FileQueryIndex
 from QuickOSM.core.utilities.utilities_qgis import display_message_bar
 from QuickOSM.core.utilities.tools import tr, get_user_query_folder
 
@@ -55,7 +62,10 @@ class MyQueriesWidget(QuickOSMWidget, Ui_ui_my_queries):
         QuickOSMWidget.__init__(self, parent)
         self.setupUi(self)
         self.current_query = None
+        self.current_query_file = None
         self.config_layer = None
+        self.updated_layers = None
+        self.index = FileQueryIndex()
 
         # Setup UI
         self.label_progress.setText("")
@@ -100,6 +110,7 @@ class MyQueriesWidget(QuickOSMWidget, Ui_ui_my_queries):
         folder = get_user_query_folder()
         categories_files = FileQuery.get_ini_files_from_folder(
             folder, force=force)
+        self.index.update(categories_files)
 
         # Fill all categories
         for cat, files in categories_files.iteritems():
@@ -115,42 +126,26 @@ class MyQueriesWidget(QuickOSMWidget, Ui_ui_my_queries):
         """
         Update the tree according to the search box
         """
-        text = self.lineEdit_search.text().strip(' ').lower()
-        self._filter_item(self.treeQueries.invisibleRootItem(), text)
+        text = self.lineEdit_search.text().strip(' ')
+        matches = self.index.search(text)
+        root = self.treeQueries.invisibleRootItem()
+        for i in xrange(root.childCount()):
+            category_item = root.child(i)
+            show_category = False
+            for j in xrange(category_item.childCount()):
+                item = category_item.child(j)
+                show = matches is None or \
+                    item.query.getFilePath() in matches
+                if item.isHidden() == show:
+                    item.setHidden(not show)
+                show_category = show_category or show
+            category_item.setHidden(not show_category)
+
         if text:
             self.treeQueries.expandAll()
         else:
             self.treeQueries.collapseAll()
 
-    def _filter_item(self, item, text):
-        """
-        search an item in the tree
-
-        @param item: check if the item should be shown
-        @type item: QTreeItem
-
-        @param text: text to search
-        @type text: str
-
-        @return: show or hide the item
-        @rtype: bool
-        """
-        if item.childCount() > 0:
-            show = False
-            for i in xrange(item.childCount()):
-                child = item.child(i)
-                show_child = self._filter_item(child, text)
-                show = show_child or show
-            item.setHidden(not show)
-            return show
-        elif isinstance(item, TreeQueryItem):
-            hide = bool(text) and (text not in item.text(0).lower())
-            item.setHidden(hide)
-            return not hide
-        else:
-            item.setHidden(True)
-            return False
-
     def show_popup_menu(self, point):
         """
         Right click in the tree
@@ -177,6 +172,11 @@ class MyQueriesWidget(QuickOSMWidget, Ui_ui_my_queries):
             # noinspection PyUnresolvedReferences
             show_action.triggered.connect(self.show_query)
             popup_menu.addAction(show_action)
+            update_action = QAction(
+                tr('QuickOSM', 'Update loaded layers'), self.treeQueries)
+            # noinspection PyUnresolvedReferences
+            update_action.triggered.connect(self.update_query)
+            popup_menu.addAction(update_action)
             delete_action = QAction(
                 tr('QuickOSM', 'Delete'), self.treeQueries)
             # noinspection PyUnresolvedReferences
@@ -249,6 +249,7 @@ class MyQueriesWidget(QuickOSMWidget, Ui_ui_my_queries):
             self.lineEdit_csv_multipolygons.setText(
                 self.config_layer['multipolygons']['columns'])
             self.current_query = config['metadata']['query']
+            self.current_query_file = item.query.getFilePath()
             self.pushButton_runQuery.setDisabled(False)
             self.pushButton_showQuery.setDisabled(False)
             self.groupBox.setDisabled(False)
@@ -285,12 +286,12 @@ class MyQueriesWidget(QuickOSMWidget, Ui_ui_my_queries):
         """
         Process for running the query
         """
-        # Block the button and save the initial text
+        if self.cancel_worker():
+            return
 
+        # Block the button and save the initial text
         self.pushButton_browse_output_file.setDisabled(True)
-        QApplication.setOverrideCursor(Qt.WaitCursor)
         self.start_process()
-        QApplication.processEvents()
 
         # Get all values
         query = self.current_query
@@ -323,8 +324,8 @@ class MyQueriesWidget(QuickOSMWidget, Ui_ui_my_queries):
             if not nominatim and geocode_area:
                 raise MissingParameterException(suffix="nominatim field")
 
-            num_layers = process_query(
-                dialog=self,
+            self.start_worker(
+                prepare_layers,
                 query=query,
                 output_dir=output_directory,
                 prefix_file=prefix_file,
@@ -332,32 +333,85 @@ class MyQueriesWidget(QuickOSMWidget, Ui_ui_my_queries):
                 white_list_values=white_list_values,
                 nominatim=nominatim,
                 bbox=bbox,
-                config_outputs=self.config_layer)
-
-            if num_layers:
-                display_message_bar(
-                    tr('QuickOSM', u'Successful query !'),
-                    level=QgsMessageBar.INFO,
-                    duration=5)
-                self.label_progress.setText(
-                    tr('QuickOSM', u'Successful query !'))
-            else:
-                display_message_bar(
-                    tr('QuickOSM', u'Successful query, but no result.'),
-                    level=QgsMessageBar.WARNING,
-                    duration=7)
+                config_outputs=self.config_layer,
+                query_file=self.current_query_file)
 
         except QuickOsmException, e:
             self.display_geo_algorithm_exception(e)
+            self.query_ended()
         except Exception, e:  # pylint: disable=broad-except
             self.display_exception(e)
+            self.query_ended()
+
+    def query_ended(self):
+        """
+        Resetting the button
+        """
+        self.pushButton_browse_output_file.setDisabled(False)
+        self.updated_layers = None
+        QuickOSMWidget.query_ended(self)
+
+    def update_query(self):
+        """
+        Update the layers loaded by the query with the last changes on OSM
+
+        The changes are downloaded and parsed in a worker thread, the layers
+        are edited by update_finished in the main thread.
+        """
+        item = self.treeQueries.currentItem()
+        if not isinstance(item, TreeQueryItem) or self.worker is not None:
+            return
 
-        finally:
-            # Resetting the button
-            self.pushButton_browse_output_file.setDisabled(False)
-            QApplication.restoreOverrideCursor()
-            self.end_process()
-            QApplication.processEvents()
+        self.pushButton_browse_output_file.setDisabled(True)
+        self.start_process()
+
+        try:
+            layers = get_updatable_layers(item.query.getFilePath())
+            if not layers:
+                raise NoLayerException(suffix=item.query.getName())
+
+            self.updated_layers = layers
+            self.start_worker(
+                prepare_update,
+                slot=self.update_finished,
+                queries=get_update_queries(layers))
+
+        except QuickOsmException, e:
+            self.display_geo_algorithm_exception(e)
+            self.query_ended()
+        except Exception, e:  # pylint: disable=broad-except
+            self.display_exception(e)
+            self.query_ended()
+
+    def update_finished(self, result):
+        """
+        Slot to edit the layers in the main thread, at the end of the update
+
+        @param result: parameters of apply_update
+        @type result: dict
+
+        @return: number of deleted and added features
+        @rtype: int
+        """
+        try:
+            num_changes = apply_update(layers=self.updated_layers, **result)
+        except QuickOsmException, e:
+            self.display_geo_algorithm_exception(e)
+            return 0
+
+        if num_changes:
+            display_message_bar(
+                tr('QuickOSM', u'Successful update !'),
+                level=QgsMessageBar.INFO,
+                duration=5)
+            self.label_progress.setText(
+                tr('QuickOSM', u'Successful update !'))
+        else:
+            display_message_bar(
+                tr('QuickOSM', u'Successful update, but no change.'),
+                level=QgsMessageBar.INFO,
+                duration=5)
+        return num_changes
 
     def show_query(self):
         """
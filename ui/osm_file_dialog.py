@@ -172,7 +172,7 @@ class OsmFileWidget(QuickOSMWidget, Ui_ui_osm_file):
 
             else:
                 open_file(
-                    dialog=self,
+                    dialog=self.connect_progress(),
                     osm_file=osm_file,
                     output_geom_types=output_geometry_types,
                     output_dir=output_directory,
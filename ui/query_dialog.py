@@ -29,10 +29,8 @@ from PyQt4.QtGui import (
     QDesktopServices,
     QMenu,
     QAction,
-    QApplication,
     QDialogButtonBox)
 from PyQt4.QtCore import pyqtSignal, Qt, QUrl
-from qgis.gui import QgsMessageBar
 
 from QuickOSM.core.utilities.tools import tr
 from QuickOSM.core.exceptions import (
@@ -40,9 +38,8 @@ from QuickOSM.core.exceptions import (
     DirectoryOutPutException,
     OutPutGeomTypesException,
     MissingParameterException)
-from QuickOSM.core.utilities.utilities_qgis import display_message_bar
 from QuickOSM.core.query_parser import prepare_query
-from QuickOSM.controller.process import process_query
+from QuickOSM.controller.process import prepare_layers
 from XMLHighlighter import XMLHighlighter
 from save_query_dialog import SaveQueryDialog
 from QuickOSMWidget import QuickOSMWidget
@@ -173,13 +170,13 @@ class QueryWidget(QuickOSMWidget, Ui_ui_query):
         """
         Process for running the query
         """
+        if self.cancel_worker():
+            return
 
         # Block the button and save the initial text
         self.pushButton_browse_output_file.setDisabled(True)
         self.pushButton_generateQuery.setDisabled(True)
-        QApplication.setOverrideCursor(Qt.WaitCursor)
         self.start_process()
-        QApplication.processEvents()
 
         # Get all values
         query = unicode(self.textEdit_query.toPlainText())
@@ -216,8 +213,8 @@ class QueryWidget(QuickOSMWidget, Ui_ui_query):
 
                 raise MissingParameterException(suffix="nominatim field")
 
-            num_layers = process_query(
-                dialog=self,
+            self.start_worker(
+                prepare_layers,
                 query=query,
                 output_dir=output_directory,
                 prefix_file=prefix_file,
@@ -226,31 +223,20 @@ class QueryWidget(QuickOSMWidget, Ui_ui_query):
                 nominatim=nominatim,
                 bbox=bbox)
 
-            if num_layers:
-                display_message_bar(
-                    tr('QuickOSM', u'Successful query !'),
-                    level=QgsMessageBar.INFO,
-                    duration=5)
-                self.label_progress.setText(
-                    tr('QuickOSM', u'Successful query !'))
-            else:
-                display_message_bar(
-                    tr('QuickOSM', u'Successful query, but no result.'),
-                    level=QgsMessageBar.WARNING,
-                    duration=7)
-
         except QuickOsmException, e:
             self.display_geo_algorithm_exception(e)
+            self.query_ended()
         except Exception, e:  # pylint: disable=broad-except
             self.display_exception(e)
+            self.query_ended()
 
-        finally:
-            # Resetting the button
-            self.pushButton_browse_output_file.setDisabled(False)
-            self.pushButton_generateQuery.setDisabled(False)
-            QApplication.restoreOverrideCursor()
-            self.end_process()
-            QApplication.processEvents()
+    def query_ended(self):
+        """
+        Resetting the buttons
+        """
+        self.pushButton_browse_output_file.setDisabled(False)
+        self.pushButton_generateQuery.setDisabled(False)
+        QuickOSMWidget.query_ended(self)
 
     def generate_query(self):
         """
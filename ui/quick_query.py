@@ -239,6 +239,27 @@ class Ui_ui_quick_query(object):
         self.lineEdit_filePrefix = QtGui.QLineEdit(self.groupBox)
         self.lineEdit_filePrefix.setObjectName(_fromUtf8("lineEdit_filePrefix"))
         self.formLayout_2.setWidget(2, QtGui.QFormLayout.FieldRole, self.lineEdit_filePrefix)
+        self.label_16 = QtGui.QLabel(self.groupBox)
+        self.label_16.setObjectName(_fromUtf8("label_16"))
+        self.formLayout_2.setWidget(3, QtGui.QFormLayout.LabelRole, self.label_16)
+        self.checkBox_quadtile = QtGui.QCheckBox(self.groupBox)
+        self.checkBox_quadtile.setText(_fromUtf8(""))
+        self.checkBox_quadtile.setObjectName(_fromUtf8("checkBox_quadtile"))
+        self.formLayout_2.setWidget(3, QtGui.QFormLayout.FieldRole, self.checkBox_quadtile)
+        self.label_17 = QtGui.QLabel(self.groupBox)
+        self.label_17.setObjectName(_fromUtf8("label_17"))
+        self.formLayout_2.setWidget(4, QtGui.QFormLayout.LabelRole, self.label_17)
+        self.checkBox_skeleton = QtGui.QCheckBox(self.groupBox)
+        self.checkBox_skeleton.setText(_fromUtf8(""))
+        self.checkBox_skeleton.setObjectName(_fromUtf8("checkBox_skeleton"))
+        self.formLayout_2.setWidget(4, QtGui.QFormLayout.FieldRole, self.checkBox_skeleton)
+        self.label_18 = QtGui.QLabel(self.groupBox)
+        self.label_18.setObjectName(_fromUtf8("label_18"))
+        self.formLayout_2.setWidget(5, QtGui.QFormLayout.LabelRole, self.label_18)
+        self.checkBox_center = QtGui.QCheckBox(self.groupBox)
+        self.checkBox_center.setText(_fromUtf8(""))
+        self.checkBox_center.setObjectName(_fromUtf8("checkBox_center"))
+        self.formLayout_2.setWidget(5, QtGui.QFormLayout.FieldRole, self.checkBox_center)
         self.verticalLayout_2.addLayout(self.formLayout_2)
         self.verticalLayout.addWidget(self.groupBox)
         self.horizontalLayout_2 = QtGui.QHBoxLayout()
@@ -288,6 +309,10 @@ class Ui_ui_quick_query(object):
         self.lineEdit_browseDir.setPlaceholderText(_translate("ui_quick_query", "Save to temporary file", None))
         self.pushButton_browse_output_file.setText(_translate("ui_quick_query", "Browse", None))
         self.label_6.setText(_translate("ui_quick_query", "File prefix", None))
+        self.label_16.setText(_translate("ui_quick_query", "Sort by location", None))
+        self.label_17.setText(_translate("ui_quick_query", "Members without tags", None))
+        self.label_18.setText(_translate("ui_quick_query", "Only the centers", None))
+        self.checkBox_center.setToolTip(_translate("ui_quick_query", "The ways and the relations are points at their center, faster for the points of interest.", None))
         self.pushButton_showQuery.setText(_translate("ui_quick_query", "Show query", None))
         self.pushButton_runQuery.setText(_translate("ui_quick_query", "Run query", None))
 
@@ -21,22 +21,26 @@
  ***************************************************************************/
 """
 
-from json import load
-from os.path import dirname, abspath, join, isfile, isdir
+from os.path import isdir
 
-from PyQt4.QtGui import QDockWidget, QApplication, QCompleter, QDialogButtonBox
+from PyQt4.QtGui import (
+    QDockWidget,
+    QCompleter,
+    QDialogButtonBox,
+    QStringListModel)
 from PyQt4.QtCore import Qt
-from qgis.gui import QgsMessageBar
 
 from QuickOSM.core.exceptions import (
     QuickOsmException,
     OutPutGeomTypesException,
     DirectoryOutPutException,
     OsmObjectsException)
-from QuickOSM.core.utilities.utilities_qgis import display_message_bar
 from QuickOSM.core.utilities.tools import tr
 from QuickOSM.core.query_factory import QueryFactory
-from QuickOSM.controller.process import process_quick_query
+from QuickOSM.core.osm_vocabulary import OsmVocabulary
+from QuickOSM.controller.process import (
+    make_quick_query,
+    prepare_layers)
 from QuickOSMWidget import QuickOSMWidget
 from quick_query import Ui_ui_quick_query
 
@@ -45,6 +49,10 @@ from qgis.utils import iface
 
 
 class QuickQueryWidget(QuickOSMWidget, Ui_ui_quick_query):
+
+    # Maximum number of keys or values in the comboboxes
+    MAX_ITEMS = 500
+
     # noinspection PyUnresolvedReferences
     def __init__(self, parent=None):
         """
@@ -87,18 +95,19 @@ class QuickQueryWidget(QuickOSMWidget, Ui_ui_quick_query):
         self.comboBox_in_around.currentIndexChanged.connect(self.in_or_around)
 
         # Setup auto completion
-        map_features_json_file = join(
-            dirname(dirname(abspath(__file__))), 'mapFeatures.json')
-
-        if isfile(map_features_json_file):
-            self.osmKeys = load(open(map_features_json_file))
-            keys = self.osmKeys.keys()
-            keys.sort()
-            keys_completer = QCompleter(keys)
-            self.comboBox_key.addItems(keys)
-            self.comboBox_key.setCompleter(keys_completer)
-            self.comboBox_key.completer().setCompletionMode(
-                QCompleter.PopupCompletion)
+        self.vocabulary = OsmVocabulary.get()
+        self.query_tags = None
+        self.comboBox_key.addItems(
+            self.vocabulary.complete_key(limit=self.MAX_ITEMS))
+        self.key_model = QStringListModel(self)
+        self.comboBox_key.setCompleter(QCompleter(self.key_model, self))
+        self.comboBox_key.completer().setCompletionMode(
+            QCompleter.PopupCompletion)
+        self.value_model = QStringListModel(self)
+        self.comboBox_value.setCompleter(QCompleter(self.value_model, self))
+        self.comboBox_value.completer().setCompletionMode(
+            QCompleter.PopupCompletion)
+        self.comboBox_value.editTextChanged.connect(self.value_edited)
         self.key_edited()
 
         self.init_nominatim_autofill()
@@ -132,23 +141,25 @@ class QuickQueryWidget(QuickOSMWidget, Ui_ui_quick_query):
             self.pushButton_runQuery.setDisabled(True)
             self.pushButton_showQuery.setDisabled(True)
 
-        self.comboBox_value.clear()
-        self.comboBox_value.setCompleter(None)
+        key = unicode(self.comboBox_key.currentText())
+        self.key_model.setStringList(self.vocabulary.complete_key(key))
 
-        try:
-            current_values = self.osmKeys[
-                unicode(self.comboBox_key.currentText())]
-        except KeyError:
-            return
-        except AttributeError:
+        self.comboBox_value.clear()
+        if key not in self.vocabulary.keys:
             return
 
-        if current_values[0] != "":
-            current_values.insert(0, "")
+        current_values = self.vocabulary.complete_value(
+            key, limit=self.MAX_ITEMS)
+        self.comboBox_value.addItems([u''] + current_values)
 
-        values_completer = QCompleter(current_values)
-        self.comboBox_value.setCompleter(values_completer)
-        self.comboBox_value.addItems(current_values)
+    def value_edited(self):
+        """
+        Update the completion of the value
+        """
+        key = unicode(self.comboBox_key.currentText())
+        value = unicode(self.comboBox_value.currentText())
+        self.value_model.setStringList(
+            self.vocabulary.complete_value(key, value))
 
     def allow_nominatim_or_extent(self):
         """
@@ -201,17 +212,34 @@ class QuickQueryWidget(QuickOSMWidget, Ui_ui_quick_query):
             osm_objects.append('relation')
         return osm_objects
 
+    def _get_output_options(self):
+        """
+        Get the order, the skeleton mode and the geometry from checkbox
+
+        @return: order, skeleton, geometry
+        @rtype: tuple
+        """
+        if self.checkBox_quadtile.isChecked():
+            order = 'quadtile'
+        else:
+            order = 'id'
+        if self.checkBox_center.isChecked():
+            geometry = 'center'
+        else:
+            geometry = None
+        return order, self.checkBox_skeleton.isChecked(), geometry
+
     def run_query(self):
         """
         Process for running the query
         """
+        if self.cancel_worker():
+            return
 
         # Block the button and save the initial text
-        QApplication.setOverrideCursor(Qt.WaitCursor)
         self.pushButton_browse_output_file.setDisabled(True)
         self.pushButton_showQuery.setDisabled(True)
         self.start_process()
-        QApplication.processEvents()
 
         # Get all values
         key = unicode(self.comboBox_key.currentText())
@@ -232,6 +260,14 @@ class QuickQueryWidget(QuickOSMWidget, Ui_ui_quick_query):
         # Which osm objects ?
         osm_objects = self._get_osm_objects()
 
+        order, skeleton, geometry = self._get_output_options()
+
+        # The ways and the relations are points with their center
+        if geometry == 'center':
+            output_geometry_types = [
+                geometry_type for geometry_type in output_geometry_types
+                if geometry_type == 'points']
+
         try:
             # Test values
             if not osm_objects:
@@ -253,8 +289,7 @@ class QuickQueryWidget(QuickOSMWidget, Ui_ui_quick_query):
             if output_directory and not isdir(output_directory):
                 raise DirectoryOutPutException
 
-            num_layers = process_quick_query(
-                dialog=self,
+            query, layer_name = make_quick_query(
                 key=key,
                 value=value,
                 nominatim=nominatim,
@@ -263,39 +298,43 @@ class QuickQueryWidget(QuickOSMWidget, Ui_ui_quick_query):
                 bbox=bbox,
                 osm_objects=osm_objects,
                 timeout=timeout,
-                output_directory=output_directory,
+                order=order,
+                skeleton=skeleton,
+                geometry=geometry)
+            self.query_tags = (key, value)
+
+            self.start_worker(
+                prepare_layers,
+                query=query,
+                nominatim=nominatim,
+                bbox=bbox,
+                output_dir=output_directory,
                 prefix_file=prefix_file,
-                output_geometry_types=output_geometry_types)
-
-            # We can test numLayers to see if there are some results
-            if num_layers:
-                self.label_progress.setText(
-                    tr('QuickOSM', u'Successful query !'))
-
-                display_message_bar(
-                    tr('QuickOSM', u'Successful query !'),
-                    level=QgsMessageBar.INFO,
-                    duration=5)
-            else:
-                self.label_progress.setText(tr("QuickOSM", u'No result'))
-
-                display_message_bar(
-                    tr('QuickOSM', u'Successful query, but no result.'),
-                    level=QgsMessageBar.WARNING,
-                    duration=7)
+                output_geometry_types=output_geometry_types,
+                layer_name=layer_name)
 
         except QuickOsmException, e:
             self.display_geo_algorithm_exception(e)
+            self.query_ended()
         except Exception, e:  # pylint: disable=broad-except
             self.display_exception(e)
+            self.query_ended()
 
-        finally:
-            # Resetting the button
-            self.pushButton_browse_output_file.setDisabled(False)
-            self.pushButton_showQuery.setDisabled(False)
-            QApplication.restoreOverrideCursor()
-            self.end_process()
-            QApplication.processEvents()
+    def query_finished(self, result):
+        """
+        Load the layers and remember the tags of the successful query
+        """
+        num_layers = QuickOSMWidget.query_finished(self, result)
+        self.vocabulary.record(*self.query_tags)
+        return num_layers
+
+    def query_ended(self):
+        """
+        Resetting the buttons
+        """
+        self.pushButton_browse_output_file.setDisabled(False)
+        self.pushButton_showQuery.setDisabled(False)
+        QuickOSMWidget.query_ended(self)
 
     def show_query(self):
         """
@@ -339,6 +378,8 @@ class QuickQueryWidget(QuickOSMWidget, Ui_ui_quick_query):
         # Which osm objects ?
         osm_objects = self._get_osm_objects()
 
+        order, skeleton, geometry = self._get_output_options()
+
         # Which geometry at the end ?
         query_widget.checkBox_points.setChecked(
             self.checkBox_points.isChecked())
@@ -373,7 +414,10 @@ class QuickQueryWidget(QuickOSMWidget, Ui_ui_quick_query):
             nominatim=nominatim,
             is_around=is_around,
             distance=distance,
-            osm_objects=osm_objects)
+            osm_objects=osm_objects,
+            order=order,
+            skeleton=skeleton,
+            geometry=geometry)
         query = query_factory.make()
         query_widget.textEdit_query.setPlainText(query)
         iface.QuickOSM_mainWindowDialog.listWidget.setCurrentRow(